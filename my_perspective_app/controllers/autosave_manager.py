@@ -0,0 +1,173 @@
+# my_perspective_app/controllers/autosave_manager.py
+
+import os
+import time
+import threading
+from PySide6.QtCore import QObject, Signal
+
+from models.param_file_manager import ParamFileManager
+
+class AutosaveManager(QObject):
+    """
+    标注参数的“延迟合并 + 后台写盘”队列 (write-behind)：
+      - schedule(image_item) 只在内存中记录一份 coords/marks 快照，立即返回，
+        不在鼠标事件里做任何磁盘 I/O
+      - 同一个 _verified.txt 在 debounce 时间窗内的多次修改只写最后一次
+      - 真正的写盘在后台线程中进行，经 ParamFileManager.save_all 原子替换
+      - flush() 会把所有待写内容立即写完(关闭程序、同步前调用)，并返回是否全部写成功
+      - 后台写盘失败时发出 save_failed 信号（跨线程，由主线程的槽弹窗提示）
+    """
+    # (verified_path, 错误信息)
+    save_failed = Signal(str, str)
+
+    def __init__(self, resource_manager, debounce_ms=800, max_delay_ms=5000):
+        """
+        :param resource_manager: 写完后用它的 param_cache 更新缓存签名
+        :param debounce_ms: 最后一次修改后等待多久再写
+        :param max_delay_ms: 连续修改时，从第一次修改起最多等待多久必须写一次
+        """
+        super().__init__()
+        self.resource_manager = resource_manager
+        self.debounce = debounce_ms / 1000.0
+        self.max_delay = max_delay_ms / 1000.0
+
+        # verified_path -> [due_time, first_time, image_item, coords, marks]
+        self._pending = {}
+        self._writing = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # 写盘失败、之后还没有写成功的文件：verified_path -> (image_item, exception)
+        self._failed = {}
+
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    # =============================
+    #  对外 API
+    # =============================
+    def schedule(self, image_item, immediate=False):
+        """
+        记录 image_item 当前的 coords + marks，稍后在后台写入 _verified.txt。
+        immediate=True 时不等待 debounce（例如用户手动点“保存”）。
+        """
+        base, _ = os.path.splitext(image_item.image_path)
+        verified_path = base + "_verified.txt"
+        coords = list(image_item.verified_coords)
+        marks = list(image_item.sam2_marks)
+
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                # 已关闭 => 退化为同步写
+                self.resource_manager.save_params(image_item)
+                return
+            image_item.params_dirty = True
+            entry = self._pending.get(verified_path)
+            first_time = entry[1] if entry else now
+            if immediate:
+                due = now
+            else:
+                due = min(now + self.debounce, first_time + self.max_delay)
+            self._pending[verified_path] = [due, first_time, image_item, coords, marks]
+            self._cond.notify_all()
+
+    def flush(self):
+        """
+        立即写出所有待写内容（之前写失败、仍未保存的 item 会按其当前内容重试一次），
+        并阻塞到写盘全部完成。
+        返回 True 表示全部写成功；False 表示仍有文件没写进去（见 failed_paths()）。
+        """
+        with self._cond:
+            retry = [item for item, _ in self._failed.values() if item.params_dirty]
+            self._failed.clear()
+        for image_item in retry:
+            self.schedule(image_item, immediate=True)
+
+        with self._cond:
+            for entry in self._pending.values():
+                entry[0] = 0.0
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                self._cond.wait()
+            return not self._failed
+
+    def close(self, flush=True):
+        """
+        flush 后停止后台线程。之后的 schedule 会直接同步写盘。
+        返回值同 flush()。
+        flush=False：调用方刚 flush() 过（例如失败后已询问用户），不再重试写失败的文件，
+        只等队列中剩下的内容写完；返回值仍表示是否还有没写进去的文件。
+        """
+        ok = self.flush() if flush else None
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if ok is None:
+            with self._cond:
+                ok = not self._failed
+        return ok
+
+    def failed_paths(self):
+        """
+        返回写盘失败、之后还没有写成功的 [(verified_path, 错误信息), ...]
+        """
+        with self._cond:
+            return [(path, str(e)) for path, (_, e) in self._failed.items()]
+
+    def has_pending(self):
+        with self._cond:
+            return bool(self._pending) or self._writing > 0
+
+    # =============================
+    #  后台线程
+    # =============================
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._wait_for_due_entries()
+                if batch is None:
+                    return
+                self._writing += 1
+
+            for verified_path, (_, _, image_item, coords, marks) in batch:
+                try:
+                    ParamFileManager.save_all(verified_path, coords, marks)
+                except Exception as e:
+                    # 保持 params_dirty=True，flush() / 后续同步时会再写一次
+                    with self._cond:
+                        self._failed[verified_path] = (image_item, e)
+                    self.save_failed.emit(verified_path, str(e))
+                    continue
+
+                with self._cond:
+                    self._failed.pop(verified_path, None)
+                    # 若写盘期间又有新的修改排队，则 item 仍然是 dirty
+                    if verified_path not in self._pending:
+                        self.resource_manager.param_cache.store(
+                            image_item.image_path, verified_path, coords, marks
+                        )
+                        image_item.params_dirty = False
+
+            with self._cond:
+                self._writing -= 1
+                self._cond.notify_all()
+
+    def _wait_for_due_entries(self):
+        """
+        在持有 self._cond 的情况下等待，直到有到期的条目；
+        返回 [(verified_path, entry), ...]，关闭且队列已空时返回 None。
+        """
+        while True:
+            if self._closed and not self._pending:
+                return None
+            now = time.monotonic()
+            due_paths = [p for p, e in self._pending.items() if e[0] <= now]
+            if due_paths:
+                return [(p, self._pending.pop(p)) for p in due_paths]
+            if self._pending:
+                timeout = min(e[0] for e in self._pending.values()) - now
+                self._cond.wait(timeout)
+            else:
+                self._cond.wait()
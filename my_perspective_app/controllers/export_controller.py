@@ -0,0 +1,92 @@
+# my_perspective_app/controllers/export_controller.py
+
+import os
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QMessageBox, QInputDialog, QProgressDialog, QApplication
+
+from models.perspective_export import ExportOptions, OUTPUT_FORMATS, jobs_from_items, run_export
+
+
+class ExportController:
+    """
+    “导出透视矫正图片”：把已加载区中每张图按 4 个角点做透视矫正，
+    写到输出文件夹。实际的矫正在 models.perspective_export 的进程池中完成，
+    这里只负责询问参数 + 进度条 + 结果提示。
+    """
+    def __init__(self, parent, max_workers=None):
+        self.parent = parent
+        self.max_workers = max_workers
+        # 最近一次导出的统计（见 run_export 的返回值）
+        self.stats = None
+
+    def export_resources(self, resource_manager, out_folder):
+        """
+        返回 True 表示导出完成（可能有个别失败），False 表示取消或无事可做。
+        """
+        items = resource_manager.get_all_images()
+        if not items:
+            return False
+
+        options = self._ask_options()
+        if options is None:
+            return False
+
+        try:
+            os.makedirs(out_folder, exist_ok=True)
+        except Exception as e:
+            QMessageBox.warning(self.parent, "错误", f"创建输出文件夹时出错：\n{str(e)}")
+            return False
+
+        jobs = jobs_from_items(items, out_folder, options)
+        existing = [job[2] for job in jobs if os.path.exists(job[2])]
+        if existing:
+            ret = QMessageBox.question(
+                self.parent, "提示",
+                f"输出文件夹中已有 {len(existing)} 个同名文件，是否覆盖？",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if ret == QMessageBox.No:
+                return False
+
+        progress = QProgressDialog("正在导出透视矫正图片 ...", "取消", 0, len(jobs), self.parent)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        def on_progress(done, total):
+            progress.setValue(done)
+            QApplication.processEvents()
+            return not progress.wasCanceled()
+
+        try:
+            self.stats = run_export(jobs, self.max_workers, progress_callback=on_progress)
+        finally:
+            progress.close()
+
+        if self.stats["errors"]:
+            errors = self.stats["errors"]
+            details = "\n".join(f"{path}\n{err}" for path, err in errors[:10])
+            if len(errors) > 10:
+                details += f"\n... 共 {len(errors)} 个错误"
+            QMessageBox.warning(self.parent, "部分图片导出失败", details)
+
+        return not self.stats["cancelled"]
+
+    def _ask_options(self):
+        """
+        询问输出格式与长边上限；用户取消返回 None
+        """
+        fmt, ok = QInputDialog.getItem(
+            self.parent, "导出透视矫正图片", "输出格式：", list(OUTPUT_FORMATS), 0, False
+        )
+        if not ok:
+            return None
+        max_side, ok = QInputDialog.getInt(
+            self.parent, "导出透视矫正图片",
+            "输出图片长边上限（像素，0 = 按角点自动计算、不限制）：",
+            0, 0, 100000, 100
+        )
+        if not ok:
+            return None
+        # 超大输出按块矫正
+        return ExportOptions(fmt=fmt, max_side=max_side, tile_size=4096)
@@ -6,9 +6,10 @@ from PySide6.QtWidgets import QFileDialog, QMessageBox
 from controllers.preview_controller import PreviewController
 from controllers.resource_manager import ResourceManager
 from controllers.sync_controller import SyncController
+from controllers.export_controller import ExportController
 from controllers.settings_controller import SettingsController
 from controllers.cache_manager import CacheManager
-from models.param_file_manager import ParamFileManager
+from controllers.autosave_manager import AutosaveManager
 
 class MainController(QObject):
     """
@@ -27,8 +28,15 @@ class MainController(QObject):
 
         # 资源管理器
         self.resource_manager = ResourceManager()
+        # 标注参数的后台自动保存队列
+        self.autosave_manager = AutosaveManager(self.resource_manager)
+        # 后台写盘失败 => 在主线程弹窗提示（同一时间只弹一个）
+        self.autosave_manager.save_failed.connect(self._on_autosave_failed)
+        self._autosave_warning_open = False
         # 预览控制器
-        self.preview_controller = PreviewController(main_window.preview_widget, self.resource_manager)
+        self.preview_controller = PreviewController(
+            main_window.preview_widget, self.resource_manager, self.autosave_manager
+        )
 
         # ========== SettingsController ==========
         # 计算出与 main.py 同目录下的 settings.txt
@@ -56,6 +64,7 @@ class MainController(QObject):
         # ====== 监听 新增的菜单动作 ======
         self.main_window.action_save_to_folder.triggered.connect(self.save_to_target_folder)
         self.main_window.action_force_sync_folder.triggered.connect(self.force_sync_to_target_folder)
+        self.main_window.action_export_rectified.triggered.connect(self.export_rectified_images)
         self.main_window.action_close_program.triggered.connect(self.close_program)
 
         # 新增：点击“加载配置文件”菜单
@@ -204,20 +213,8 @@ class MainController(QObject):
         """
 
         for item in self.resource_manager.get_all_images():
-            if item.verified_coords is None:
-                coords, marks = ParamFileManager.load_all(item.image_path)
-                # 如果 coords是空 => 自定义默认4 corners
-                if not coords:
-                    coords = [
-                        (0.25, 0.25),
-                        (0.75, 0.25),
-                        (0.75, 0.75),
-                        (0.25, 0.75),
-                    ]
-                item.verified_coords = coords
-                item.set_corners_from_coords(coords)
-
-                item.sam2_marks = marks or []
+            # 已加载或有未保存修改的 item 会被跳过；参数文件未变化时走缓存
+            self.resource_manager.load_params(item)
 
     # ===================================================================
     #  “保存到目标文件夹” & “强制同步” 逻辑
@@ -235,17 +232,23 @@ class MainController(QObject):
             QMessageBox.warning(self.main_window, "警告", "尚未选择目标文件夹，请先选择。")
             return
 
-        # 执行同步
-        sync = SyncController(self.main_window)
-        sync.sync_resources_in_pairs(self.resource_manager, self.target_folder)
-        QMessageBox.information(self.main_window, "完成", "已保存并同步到目标文件夹。")
+        # 先把尚未落盘的自动保存写完，再执行同步（同步时会再写一次未保存的标注）
+        self._flush_autosave()
+        sync = SyncController(
+            self.main_window, use_hash=self.settings_controller.get_sync_use_hash())
+        if sync.sync_resources_in_pairs(self.resource_manager, self.target_folder):
+            QMessageBox.information(
+                self.main_window, "完成",
+                f"已保存并同步到目标文件夹。\n"
+                f"复制 {sync.stats['copied']} 个文件，跳过未变化的 {sync.stats['unchanged']} 个文件。"
+            )
 
     def force_sync_to_target_folder(self):
         """
         “强制同步目标文件夹”：
-            => 1) 清空文件夹
-            => 2) 与普通保存相同：逐对复制 + 冲突询问
-            但由于文件夹已空，基本不会出现冲突询问
+            => 1) 先并行复制到与目标文件夹同一文件系统上的临时文件夹（与普通保存相同的成对复制）
+            => 2) 全部成功后再用 rename 替换目标文件夹的内容，旧内容在后台删除
+            由于临时文件夹是空的，基本不会出现冲突询问
         """
         if self.resource_manager.count() == 0:
             QMessageBox.information(self.main_window, "提示", "当前没有已加载的图片。")
@@ -254,11 +257,72 @@ class MainController(QObject):
             QMessageBox.warning(self.main_window, "警告", "尚未选择目标文件夹，请先选择。")
             return
 
-        sync = SyncController(self.main_window)
-        sync.force_sync_resources(self.resource_manager, self.target_folder)
-        QMessageBox.information(self.main_window, "完成", "已强制同步到目标文件夹。")
+        self._flush_autosave()
+        sync = SyncController(
+            self.main_window, use_hash=self.settings_controller.get_sync_use_hash())
+        if sync.force_sync_resources(self.resource_manager, self.target_folder):
+            QMessageBox.information(self.main_window, "完成", "已强制同步到目标文件夹。")
+
+    def export_rectified_images(self):
+        """
+        “导出透视矫正图片”：按每张图当前的 4 个角点做透视矫正，
+        多进程批量写入用户选择的输出文件夹
+        """
+        if self.resource_manager.count() == 0:
+            QMessageBox.information(self.main_window, "提示", "当前没有已加载的图片。")
+            return
+
+        out_folder = QFileDialog.getExistingDirectory(self.main_window, "选择导出文件夹")
+        if not out_folder:
+            return
+
+        # 角点取自内存中的 ImageItem，但仍先落盘，保证导出结果与 _verified.txt 一致
+        self._flush_autosave()
+        exporter = ExportController(self.main_window)
+        if exporter.export_resources(self.resource_manager, out_folder):
+            stats = exporter.stats
+            QMessageBox.information(
+                self.main_window, "完成",
+                f"已导出 {stats['done']} 张图片（失败 {stats['failed']} 张）。\n"
+                f"耗时 {stats['elapsed']:.1f} 秒，{stats['images_per_sec']:.2f} 张/秒。"
+            )
 
 
+    # ===================================================================
+    #  自动保存失败提示
+    # ===================================================================
+    def _on_autosave_failed(self, verified_path, error):
+        """
+        AutosaveManager.save_failed 的槽：告诉用户这次修改没有写进 _verified.txt
+        """
+        if self._autosave_warning_open:
+            return
+        self._autosave_warning_open = True
+        try:
+            QMessageBox.warning(
+                self.main_window, "自动保存失败",
+                f"标注未能写入文件：\n{verified_path}\n{error}\n\n"
+                f"修改仍保留在内存中，保存/同步到目标文件夹时会再次写入。"
+            )
+        finally:
+            self._autosave_warning_open = False
+
+    def _flush_autosave(self):
+        """
+        把自动保存队列写完；有文件没写进去时弹窗列出。返回 True 表示全部写成功。
+        """
+        if self.autosave_manager.flush():
+            return True
+        self._show_autosave_failures()
+        return False
+
+    def _show_autosave_failures(self):
+        failed = self.autosave_manager.failed_paths()
+        details = "\n".join(f"{path}\n{error}" for path, error in failed[:10])
+        if len(failed) > 10:
+            details += f"\n... 共 {len(failed)} 个文件"
+        QMessageBox.warning(self.main_window, "自动保存失败", f"以下标注未能写入文件：\n{details}")
+
     # ===================================================================
     #  关闭流程：弹出 5 个按钮的对话框
     # ===================================================================
@@ -272,6 +336,8 @@ class MainController(QObject):
         if obj == self.main_window and event.type() == QEvent.Close:
             # 如果没有资源，直接让系统关
             if self.resource_manager.count() == 0:
+                if not self._close_autosave(event):
+                    return True
                 return super().eventFilter(obj, event)
 
             # ============ 自定义 5 按钮对话框 ============
@@ -314,8 +380,35 @@ class MainController(QObject):
                     return True
 
             # 循环结束 => 用户做出了终止决定 => 允许关闭
+            # 真正关闭前，把自动保存队列写完并停止后台线程
+            if not self._close_autosave(event):
+                return True
         return super().eventFilter(obj, event)
 
+    def _close_autosave(self, event):
+        """
+        关闭前写完自动保存队列；有标注没写进去时询问是否仍要关闭。
+        返回 False 表示用户取消关闭（event 已 ignore）。
+        """
+        # 已经 flush 过，close 时不再重试，避免失败的文件再写一次、再报一次错
+        if self.autosave_manager.flush():
+            self.autosave_manager.close(flush=False)
+            return True
+        failed = self.autosave_manager.failed_paths()
+        names = "\n".join(path for path, _ in failed[:10])
+        if len(failed) > 10:
+            names += f"\n... 共 {len(failed)} 个文件"
+        reply = QMessageBox.question(
+            self.main_window, "自动保存失败",
+            f"以下标注未能写入文件，关闭后这些修改会丢失：\n{names}\n\n仍要关闭吗？",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            event.ignore()
+            return False
+        self.autosave_manager.close(flush=False)
+        return True
+
 
     ## 目前无实际用途，可能后续添加调用：
     def _save_all_verified(self):
@@ -13,15 +13,17 @@ class PreviewController:
     PreviewController 负责将 ResourceManager 中的图片显示到 PreviewWidget，
     并管理缩略图的交互（点击、右键移除等）。
     """
-    def __init__(self, preview_widget, resource_manager):
+    def __init__(self, preview_widget, resource_manager, autosave_manager):
         """
         :param preview_widget: 预览的 UI 对象 (PreviewWidget)
         :param resource_manager: 全局的资源管理器 (ResourceManager)
+        :param autosave_manager: 后台写盘队列 (AutosaveManager)
         """
         self.current_canvas_height = 600  # 一个默认初始值
 
         self.preview_widget = preview_widget
         self.resource_manager = resource_manager
+        self.autosave_manager = autosave_manager
         
         # 当前在“已加载区”中的索引
         self.current_index = 0
@@ -99,17 +101,10 @@ class PreviewController:
         image_item = image_items[index]
 
         # -----------------------------
-        # 使用 ParamFileManager 统一读取
+        # 参数只在尚未加载时读取一次（经 ParamCache）；
+        # 已加载 / 有未保存修改的 item 直接使用内存中的值
         # -----------------------------
-        from models.param_file_manager import ParamFileManager
-        coords, marks = ParamFileManager.load_all(image_item.image_path)
-
-        # 把 4 corners 存到 image_item
-        image_item.verified_coords = coords
-        image_item.set_corners_from_coords(coords)
-
-        # 把 sam2 marks 存到 image_item
-        image_item.sam2_marks = marks
+        self.resource_manager.load_params(image_item)
 
         # -----------------------------
         # 显示到预览控件
@@ -156,15 +151,11 @@ class PreviewController:
         # 这里可能还会有 sam2_to_persp 等
 
         # ------ 统一写回文件 ------
-        base, _ = os.path.splitext(current_image.image_path)
-        verified_path = base + "_verified.txt"
-
-        # 把内存中的 coords + marks 全部一次性写进去
-        from models.param_file_manager import ParamFileManager
-        ParamFileManager.save_all(
-            verified_path,
-            current_image.verified_coords,
-            current_image.sam2_marks
+        # 交给 AutosaveManager：合并短时间内的多次修改，在后台线程原子写入 _verified.txt
+        # 手动点“保存”时不等待 debounce
+        self.autosave_manager.schedule(
+            current_image,
+            immediate=(overlay_type == "perspective-save")
         )
 
 
@@ -2,14 +2,18 @@
 
 import os
 from models.image_item import ImageItem
+from models.param_cache import ParamCache
+from models.param_file_manager import ParamFileManager
 
 class ResourceManager:
     """
     统一管理‘已加载区’的资源，可多次加载来自不同文件夹、文件或拖拽的图片。
+    同时持有一个 ParamCache，负责各图片参数文件的读取缓存。
     """
     def __init__(self):
         self.loaded_images = []  # 存放 ImageItem 的列表
-    
+        self.param_cache = ParamCache()
+
     def add_images(self, image_paths):
         """
         批量添加图片资源
@@ -18,22 +22,71 @@ class ResourceManager:
             # 确保不重复
             if p and (not any(item.image_path == p for item in self.loaded_images)):
                 self.loaded_images.append(ImageItem(p))
-    
+
     def remove_image(self, index):
         """
         根据索引移除已加载区中的图片
         """
         if 0 <= index < len(self.loaded_images):
-            self.loaded_images.pop(index)
-    
+            item = self.loaded_images.pop(index)
+            self.param_cache.invalidate(item.image_path)
+
     def clear(self):
         """
         清空所有加载资源
         """
         self.loaded_images.clear()
+        self.param_cache.invalidate()
 
     def get_all_images(self):
         return self.loaded_images
 
     def count(self):
-        return len(self.loaded_images)
\ No newline at end of file
+        return len(self.loaded_images)
+
+    # =============================
+    #  参数(coords / marks)的读写
+    # =============================
+    def load_params(self, image_item, refresh=False):
+        """
+        为 image_item 填充 coords / marks：
+          - 若 item 有未保存的修改(params_dirty) => 不动它
+          - 若已加载过且 refresh=False => 直接返回，不做任何文件 I/O
+          - 否则经 ParamCache 读取(文件未变化时不会重新解析)
+        """
+        if image_item.params_dirty:
+            return
+        if image_item.verified_coords is not None and not refresh:
+            return
+
+        coords, marks = self.param_cache.load(image_item.image_path)
+        # 如果 coords是空 => 自定义默认4 corners
+        if not coords:
+            coords = [
+                (0.25, 0.25),
+                (0.75, 0.25),
+                (0.75, 0.75),
+                (0.25, 0.75),
+            ]
+        image_item.set_params(coords, marks or [])
+
+    def save_params(self, image_item):
+        """
+        把 image_item 内存中的 coords + marks 一次性写入 _verified.txt，
+        并同步更新缓存、清除 dirty 标记。
+        """
+        base, _ = os.path.splitext(image_item.image_path)
+        verified_path = base + "_verified.txt"
+
+        ParamFileManager.save_all(
+            verified_path,
+            image_item.verified_coords,
+            image_item.sam2_marks
+        )
+        self.param_cache.store(
+            image_item.image_path,
+            verified_path,
+            image_item.verified_coords,
+            image_item.sam2_marks
+        )
+        image_item.params_dirty = False
@@ -5,7 +5,7 @@ import os
 class SettingsController:
     """
     用于管理 settings.txt 的读取与写入。
-    在这里我们可扩展更多配置项，目前只示例 canvas_height。
+    在这里我们可扩展更多配置项，目前有 canvas_height 与 sync_use_hash。
     """
 
     def __init__(self, settings_path):
@@ -14,9 +14,11 @@ class SettingsController:
         """
         self.settings_path = settings_path
 
-        # 缓存配置的字段。例如：{"canvas_height": 1000}
+        # 缓存配置的字段。例如：{"canvas_height": 1000, "sync_use_hash": False}
         self.config_data = {
-            "canvas_height": 1000
+            "canvas_height": 1000,
+            # 同步时除 size/mtime 外再比较内容 sha1（更准确，但要读全文件）
+            "sync_use_hash": False,
         }
 
         # 初始化时，若文件不存在则自动创建一个默认文件
@@ -29,7 +31,7 @@ class SettingsController:
     def load_from_file(self, path):
         """
         从指定 path 读取配置，并将其写入 self.config_data 中。
-        仅处理“canvas_height=xxx”这种简单形式，后续可扩展。
+        仅处理“canvas_height=xxx”/“sync_use_hash=0|1”这种简单形式，后续可扩展。
         """
         if not os.path.exists(path):
             return  # 不做任何处理
@@ -45,6 +47,9 @@ class SettingsController:
                         self.config_data["canvas_height"] = val
                     except ValueError:
                         pass
+                elif line.startswith('sync_use_hash='):
+                    val_str = line.split('=', 1)[1].strip().lower()
+                    self.config_data["sync_use_hash"] = val_str in ("1", "true", "yes")
 
     def overwrite_local_settings_with(self, external_path):
         """
@@ -60,8 +65,8 @@ class SettingsController:
         将 self.config_data 写回 self.settings_path
         """
         with open(self.settings_path, 'w', encoding='utf-8') as f:
-            # 只写这一个字段示例
             f.write(f"canvas_height={self.config_data['canvas_height']}\n")
+            f.write(f"sync_use_hash={int(self.config_data['sync_use_hash'])}\n")
 
     # =============================
     #  以下提供对外访问的 getter/setter
@@ -74,3 +79,6 @@ class SettingsController:
         self.config_data["canvas_height"] = new_height
         self._write_to_file()
 
+    def get_sync_use_hash(self):
+        return self.config_data.get("sync_use_hash", False)
+
@@ -2,171 +2,555 @@
 
 import os
 import shutil
-from PySide6.QtWidgets import QMessageBox, QInputDialog
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QMessageBox, QInputDialog, QProgressDialog, QApplication, QLineEdit
 
-from models.transform_params import TransformParams
-from models.sam_marks_params import SamMarksParams
+from models.sync_manifest import SyncManifest
+
+# 与图片成对复制的参数文件后缀
+PARAM_SUFFIXES = (".txt", "_verified.txt")
+
+# mtime 的最大截断误差（FAT/部分 NAS 只有 2 秒精度）。
+# 相差在此范围内但不完全相等时，无法区分“精度截断”和“2 秒内的同大小修改”，要比较内容 hash
+MTIME_TOLERANCE_NS = 2_000_000_000
+
+class SyncPair:
+    """
+    一次同步中的一个“pair”：图片 + 它的 .txt / _verified.txt。
+    """
+    def __init__(self, src_image_path, param_files):
+        self.src_image_path = src_image_path
+        base_name = os.path.basename(src_image_path)  # e.g. "idcard01.jpg"
+        self.name_no_ext, self.image_ext = os.path.splitext(base_name)
+        # [(src_path, suffix)], suffix 为 ".txt" 或 "_verified.txt"
+        self.param_files = param_files
+
+        # 与目标文件夹中已有文件同名、内容不同、且不能直接更新的目标文件名
+        self.conflicts = []
+        # 与本次同步中排在前面的 pair 撞名（例如来自不同文件夹的同名图片）
+        self.duplicate = False
+        # 目标中已有且内容相同的文件名 => 不复制
+        self.unchanged = set()
+        # use_hash 时已算出的内容 sha1：目标文件名 -> sha1（写入 .sync_state.json）
+        self.sha1 = {}
+
+    def dst_names(self, name_no_ext=None):
+        """
+        返回该 pair 在目标文件夹中的所有文件名（图片在前）。
+        """
+        name_no_ext = name_no_ext or self.name_no_ext
+        names = [name_no_ext + self.image_ext]
+        for _, suffix in self.param_files:
+            names.append(name_no_ext + suffix)
+        return names
+
+    def src_paths(self):
+        return [self.src_image_path] + [src for src, _ in self.param_files]
+
+    def copy_jobs(self, target_folder):
+        """
+        返回需要复制的 [(src, dst), ...]，跳过目标中内容未变化的文件
+        """
+        return [
+            (src, os.path.normpath(os.path.join(target_folder, name)))
+            for src, name in zip(self.src_paths(), self.dst_names())
+            if name not in self.unchanged
+        ]
 
 class SyncController:
-    def __init__(self, parent):
+    def __init__(self, parent, max_workers=8, use_hash=False):
         """
         parent: 可以是主窗口或一个能弹窗的 widget
+        max_workers: 并行复制的线程数（网络盘上主要受延迟限制，多线程收益明显）
+        use_hash: 判断“文件未变化”时，除 size 外再比较内容 hash（更准确，但要读全文件）
         """
         self.parent = parent
+        self.max_workers = max_workers
+        self.use_hash = use_hash
+        # 本次同步中已算过的源文件 sha1：normcase(path) -> sha1，复制后直接记入 manifest
+        self._src_sha1 = {}
+
+        # 最近一次同步的统计：复制 / 未变化跳过 / 复制失败 的文件数
+        self.stats = {"copied": 0, "unchanged": 0, "errors": 0}
 
     def force_sync_resources(self, resource_manager, target_folder):
         """
-        '强制同步目标文件夹'：
-          1) 清空 target_folder 内所有文件/子文件夹（请谨慎使用！）
-          2) 再调用 sync_resources_in_pairs 做正常的同步复制
+        '强制同步目标文件夹'：让 target_folder 的内容与已加载区完全一致（请谨慎使用！）
+          1) 建一个临时 staging 文件夹，用 sync_resources_in_pairs 把所有 pair 并行复制进去
+          2) 全部复制成功后再交换：target 的旧内容 -> 旧目录，staging -> target
+          3) 旧目录在后台线程中删除
+        复制阶段出错或被取消都不会动 target_folder；破坏性操作只剩 rename。
+
+        staging / 旧目录必须与 target 在同一文件系统上（rename 不能跨设备）：
+          - 一般放在 target 旁边，整目录 rename 交换
+          - target 是挂载点 / 共享或盘符根目录，或其父目录不可写 / 在另一设备上时，
+            放在 target 里面（隐藏目录），逐项 rename 交换
         """
-        # 1) 清空 target_folder
+        target_folder = os.path.normpath(os.path.abspath(target_folder))
+        parent_dir, folder_name = os.path.split(target_folder)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        swap_whole_folder = self._can_swap_whole_folder(target_folder)
+        if swap_whole_folder:
+            staging_folder = os.path.join(parent_dir, f".{folder_name}.staging-{stamp}")
+            old_folder = os.path.join(parent_dir, f".{folder_name}.old-{stamp}")
+        else:
+            staging_folder = os.path.join(target_folder, f".sync-staging-{stamp}")
+            old_folder = os.path.join(target_folder, f".sync-old-{stamp}")
+
+        # 1) 复制到 staging
         try:
-            for item in os.listdir(target_folder):
-                item_path = os.path.join(target_folder, item)
-                item_path = os.path.normpath(item_path)
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                else:
-                    os.remove(item_path)
+            os.makedirs(staging_folder)
         except Exception as e:
-            QMessageBox.warning(self.parent, "错误", f"清空文件夹时出错：\n{str(e)}")
+            QMessageBox.warning(self.parent, "错误", f"创建临时文件夹时出错：\n{str(e)}")
+            return False
+
+        completed = self.sync_resources_in_pairs(resource_manager, staging_folder)
+        if not completed or self.stats["errors"]:
+            # 取消 / 有文件复制失败 => 目标文件夹保持原样
+            self._remove_in_background(staging_folder)
+            return False
+
+        # 2) 交换
+        try:
+            if swap_whole_folder:
+                self._swap_folders(target_folder, staging_folder, old_folder)
+            else:
+                self._swap_entries(target_folder, staging_folder, old_folder,
+                                   skip=(staging_folder, old_folder))
+        except Exception as e:
+            # 交换失败时已回滚，target 保持原样
+            self._remove_in_background(staging_folder)
+            QMessageBox.warning(self.parent, "错误", f"替换目标文件夹时出错：\n{str(e)}")
+            return False
+
+        # 3) 后台删除旧内容
+        self._remove_in_background(old_folder)
+        return True
+
+    @staticmethod
+    def _can_swap_whole_folder(target_folder):
+        """
+        staging / 旧目录能否放在 target 旁边：父目录可写，且与 target 在同一设备上。
+        """
+        parent_dir = os.path.dirname(target_folder)
+        if not parent_dir or parent_dir == target_folder or not os.access(parent_dir, os.W_OK):
+            return False
+        if not os.path.exists(target_folder):
+            return os.path.isdir(parent_dir)
+        if os.path.ismount(target_folder):
+            return False
+        return os.stat(target_folder).st_dev == os.stat(parent_dir).st_dev
+
+    @classmethod
+    def _swap_folders(cls, target_folder, staging_folder, old_folder):
+        """
+        用 staging_folder 替换 target_folder，原内容移到 old_folder（三者同在一个父目录）。
+        优先整目录 rename；若 target_folder 本身无法 rename（被占用等），
+        退化为逐项 os.replace —— 仍然只有 rename，没有复制或删除。
+        """
+        if not os.path.exists(target_folder):
+            os.rename(staging_folder, target_folder)
+            return
+
+        try:
+            os.rename(target_folder, old_folder)
+        except OSError:
+            cls._swap_entries(target_folder, staging_folder, old_folder)
             return
 
-        # 2) 再做“成对”同步
-        self.sync_resources_in_pairs(resource_manager, target_folder)
+        try:
+            os.rename(staging_folder, target_folder)
+        except OSError:
+            # 恢复原目录
+            os.rename(old_folder, target_folder)
+            raise
+
+    @staticmethod
+    def _swap_entries(target_folder, staging_folder, old_folder, skip=()):
+        """
+        逐项交换：target 里的条目(除 skip 外)移进 old_folder，staging 的条目移进 target。
+        任何一步失败都按相反顺序把已移动的条目移回去，再抛出异常，
+        target / staging 恢复原样。
+        """
+        skip = {os.path.normcase(path) for path in skip}
+        created_old = not os.path.exists(old_folder)
+        os.makedirs(old_folder, exist_ok=True)
+        moved = []  # [(原路径, 新路径)]
+        try:
+            with os.scandir(target_folder) as it:
+                entries = [e for e in it if os.path.normcase(e.path) not in skip]
+            for entry in entries:
+                dst = os.path.join(old_folder, entry.name)
+                os.replace(entry.path, dst)
+                moved.append((entry.path, dst))
+            with os.scandir(staging_folder) as it:
+                entries = list(it)
+            for entry in entries:
+                dst = os.path.join(target_folder, entry.name)
+                os.replace(entry.path, dst)
+                moved.append((entry.path, dst))
+        except OSError:
+            for src, dst in reversed(moved):
+                try:
+                    os.replace(dst, src)
+                except OSError as e:
+                    print(f"[ERROR] 回滚失败，{dst} 未能移回 {src}: {e}")
+            if created_old:
+                try:
+                    os.rmdir(old_folder)
+                except OSError:
+                    pass
+            raise
+        os.rmdir(staging_folder)
+
+    @staticmethod
+    def _remove_in_background(folder):
+        """
+        在后台线程中删除 folder（非守护线程：退出程序时会等它删完）
+        """
+        threading.Thread(
+            target=shutil.rmtree,
+            args=(folder,),
+            kwargs={"ignore_errors": True},
+            name="sync-cleanup",
+        ).start()
 
     def sync_resources_in_pairs(self, resource_manager, target_folder):
         """
-        逐个处理 ResourceManager 中的图片，以及它们的 .txt / _verified.txt 文件作为一个整体（pair）。
-        如果有冲突（图片或任意txt同名），则询问用户处理方式：
-          - 改名（对整个pair一起改）
-          - 跳过（不复制这个pair）
-          - 忽略后续（直接结束后续文件的复制）
+        将 ResourceManager 中的图片，连同它们的 .txt / _verified.txt 作为一个整体（pair）复制到 target_folder。
+        差量同步，分两阶段：
+          1) 用一次 os.scandir 快照目标文件夹，逐个文件比较 size + mtime（可选 hash）：
+               - 目标中不存在 => 复制
+               - 内容相同     => 跳过
+               - 内容不同，但属于上次同步写入且未被改动(.sync_state.json)，
+                 或其图片本身相同(只是标注改了) => 直接更新
+               - 其余 => 冲突；只弹一次对话框统一处理（按规则改名 / 全部跳过 / 全部覆盖 / 取消）
+          2) 线程池并行复制需要复制的文件，带进度条，可随时取消；最后更新 .sync_state.json
+
+        返回 True 表示同步完成；False 表示用户取消。
         """
         images = resource_manager.get_all_images()
         if not images:
-            return
+            return True
 
+        # 0) 先把内存中（未保存）的坐标/marks写入本地文件，每个 item 只写一次
+        for image_item in images:
+            self._save_local_params_for_item(resource_manager, image_item)
+
+        # ====== 阶段 1：快照 + 差量比较 + 冲突检测 ======
+        target_entries = self._scan_folder(target_folder)
+        manifest = SyncManifest.load(target_folder)
+        pairs = self._build_sync_pairs(images, target_entries, manifest)
+
+        conflicted = [p for p in pairs if p.conflicts or p.duplicate]
+        if conflicted:
+            user_choice = self._ask_batch_conflict_resolution(conflicted)
+            if user_choice == "cancel":
+                return False
+            elif user_choice == "skip":
+                pairs = [p for p in pairs if not (p.conflicts or p.duplicate)]
+            elif user_choice == "overwrite":
+                # 覆盖目标中已有的文件；本次同步内部撞名的 pair 只保留第一个
+                pairs = [p for p in pairs if not p.duplicate]
+            elif user_choice == "rename":
+                pattern = self._ask_rename_pattern()
+                if not pattern:
+                    return False
+                self._apply_rename_pattern(pairs, pattern, target_entries)
+
+        # ====== 阶段 2：并行复制 ======
+        jobs = [pair.copy_jobs(target_folder) for pair in pairs]
+        jobs = [pair_jobs for pair_jobs in jobs if pair_jobs]
+        copied = []
+        errors = []
+        completed = self._run_parallel_copy(jobs, "正在同步到目标文件夹 ...", copied, errors)
+
+        # 更新同步状态：复制过的 + 确认未变化的
+        for name, st, sha1 in copied:
+            manifest.record(name, st, sha1)
+        unchanged_count = 0
+        for pair in pairs:
+            for name in pair.unchanged:
+                manifest.record(name, target_entries[os.path.normcase(name)].stat(),
+                                pair.sha1.get(name))
+                unchanged_count += 1
+        try:
+            manifest.save()
+        except OSError as e:
+            QMessageBox.warning(self.parent, "错误", f"写入同步状态文件失败：\n{str(e)}")
+
+        self.stats = {"copied": len(copied), "unchanged": unchanged_count, "errors": len(errors)}
+        return completed
+
+    # -------------------------------------------------------------------------
+    # 阶段 1：快照 / 冲突
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def _scan_folder(folder):
+        """
+        一次 os.scandir 读取目标文件夹：{normcase(name): DirEntry}
+        """
+        entries = {}
+        if not os.path.isdir(folder):
+            return entries
+        with os.scandir(folder) as it:
+            for entry in it:
+                entries[os.path.normcase(entry.name)] = entry
+        return entries
+
+    def _build_sync_pairs(self, images, target_entries, manifest):
+        """
+        为每个 image_item 组装 SyncPair，并标记：
+          - unchanged: 目标中已有且内容相同的文件
+          - conflicts: 目标中已有、内容不同、又不能安全更新的文件
+          - duplicate: 与本次排在前面的 pair 撞名
+        """
+        pairs = []
+        planned = set()
         for image_item in images:
             src_image_path = image_item.image_path
-            base_name = os.path.basename(src_image_path)  # e.g. "idcard01.jpg"
-            name_no_ext, image_ext = os.path.splitext(base_name)
+            base_no_ext = os.path.splitext(src_image_path)[0]
+            param_files = []
+            for suffix in PARAM_SUFFIXES:
+                param_src = os.path.normpath(base_no_ext + suffix)
+                if os.path.exists(param_src):
+                    param_files.append((param_src, suffix))
 
-            # ====== 进入冲突检查 / 重命名循环 ======
-            while True:
-                # 1) 首先，我们在最终复制前，先把内存中的坐标/marks写入本地文件
-                #    这样就能覆盖 cache/xxx_verified.txt 或 .txt 为新格式
-                self._save_local_params_for_item(image_item)
-
-                # 2) 根据最新的本地文件，收集 param_file_paths
-                param_file_paths = []
-                # .txt
-                txt_path = os.path.normpath(os.path.splitext(src_image_path)[0] + ".txt")
-                if os.path.exists(txt_path):
-                    param_file_paths.append(txt_path)
-                # _verified.txt
-                verified_path = os.path.normpath(os.path.splitext(src_image_path)[0] + "_verified.txt")
-                if os.path.exists(verified_path):
-                    param_file_paths.append(verified_path)
-
-            # === 执行复制前的冲突检查 ===
-            # 只要其中任意文件在 target_folder 中已存在，就触发冲突对话框
-                conflict_files = []
-                # 先检查图片本身
-                dst_image_name = name_no_ext + image_ext
-                dst_image_path = os.path.normpath(os.path.join(target_folder, dst_image_name))
-
-                if os.path.exists(dst_image_path):
-                    conflict_files.append(dst_image_name)
-
-                # 再检查参数文件
-                # param_file_paths 可能有 0,1,2 个
-                dst_param_pairs = []
-                for param_src in param_file_paths:
-                    _, param_ext = os.path.splitext(param_src)  # ".txt" or "_verified.txt"
-                    dst_param_name = name_no_ext + param_ext
-                    dst_param_path = os.path.normpath(os.path.join(target_folder, dst_param_name))
-                    if os.path.exists(dst_param_path):
-                        conflict_files.append(dst_param_name)
-                    dst_param_pairs.append((param_src, dst_param_path))
-
-                if conflict_files:
-                    # === 有冲突，弹窗询问 ===
-                    user_choice = self._ask_conflict_resolution(", ".join(conflict_files))
-                    if user_choice == "skip":
-                        break  # 跳过此pair，处理下一个
-                    elif user_choice == "ignore":
-                        return  # 直接结束整体复制
-                    elif user_choice == "rename":
-                        # 用户想改名 => 弹框让用户输入新的“基础名字”（不含扩展名）
-                        new_base = self._ask_new_basename(name_no_ext)
-                        if not new_base:
-                            # 用户点取消 => 当做 skip 处理
-                            break
-                        # 替换 name_no_ext
-                        name_no_ext = new_base
-                        # 继续 while True，重新检查冲突
-                        continue
+            pair = SyncPair(src_image_path, param_files)
+            differing = []
+            image_matches_target = False
+            for i, (src, name) in enumerate(zip(pair.src_paths(), pair.dst_names())):
+                key = os.path.normcase(name)
+                if key in planned:
+                    pair.duplicate = True
+                entry = target_entries.get(key)
+                if entry is None:
+                    continue
+                same, sha1 = self._is_same_file(src, entry, manifest.get(name))
+                if sha1 is not None:
+                    pair.sha1[name] = sha1
+                if same:
+                    pair.unchanged.add(name)
+                    if i == 0:
+                        image_matches_target = True
+                elif manifest.matches(name, entry.stat()):
+                    # 上次同步写入、之后没被改动 => 直接更新
+                    if i == 0:
+                        image_matches_target = True
                 else:
-                    # 无冲突 => 可以直接复制
-                    try:
-                        shutil.copy2(src_image_path, dst_image_path)
-                        for param_src, dst_param_path in dst_param_pairs:
-                            shutil.copy2(param_src, dst_param_path)
-                    except Exception as e:
-                        QMessageBox.warning(
-                            self.parent, "错误",
-                            f"复制文件时出错：\n{src_image_path} => {dst_image_path}\n\n{str(e)}"
-                        )
-                    break  # 处理下一个 image_item
+                    differing.append(name)
+
+            if not image_matches_target:
+                pair.conflicts = differing
+            # 否则：图片相同，只是标注变了 => 参数文件直接更新，不算冲突
+
+            if not pair.duplicate:
+                planned.update(os.path.normcase(n) for n in pair.dst_names())
+            pairs.append(pair)
+        return pairs
+
+    def _is_same_file(self, src_path, dst_entry, dst_record):
+        """
+        比较 src 与目标文件是否相同：
+          - 默认：size 相同且 mtime 完全相同（copy2 会保留 mtime）；
+            mtime 不同但相差不超过 MTIME_TOLERANCE_NS 时（粗精度文件系统会截断 mtime），
+            再比较内容 sha1，不会把 2 秒内的同大小修改误判为未变化
+          - use_hash=True：size 相同且内容 sha1 相同
+        返回 (是否相同, 目标文件的 sha1)；没有算 hash 时 sha1 为 None。
+        """
+        src_st = os.stat(src_path)
+        dst_st = dst_entry.stat()
+        if src_st.st_size != dst_st.st_size:
+            return False, None
+        if not self.use_hash:
+            mtime_diff = abs(src_st.st_mtime_ns - dst_st.st_mtime_ns)
+            if mtime_diff == 0:
+                return True, None
+            if mtime_diff > MTIME_TOLERANCE_NS:
+                return False, None
+
+        # 目标文件的 hash 若已记录在 manifest 中且文件没动过，就不必再读一遍
+        if dst_record and dst_record.get("sha1") and dst_record["size"] == dst_st.st_size \
+                and dst_record["mtime_ns"] == dst_st.st_mtime_ns:
+            dst_hash = dst_record["sha1"]
+        else:
+            dst_hash = self._file_sha1(dst_entry.path)
+        return self._src_file_sha1(src_path) == dst_hash, dst_hash
+
+    def _src_file_sha1(self, src_path):
+        """
+        源文件的 sha1，同一次同步中每个源文件只读一遍
+        """
+        key = os.path.normcase(src_path)
+        sha1 = self._src_sha1.get(key)
+        if sha1 is None:
+            sha1 = self._src_sha1[key] = self._file_sha1(src_path)
+        return sha1
+
+    @staticmethod
+    def _file_sha1(path, chunk_size=1024 * 1024):
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _apply_rename_pattern(pairs, pattern, target_entries):
+        """
+        对有冲突的 pair 按 pattern 改名，pattern 中：
+          {name} => 原文件名（不含扩展名）
+          {n}    => 从 1 开始递增的序号，直到与目标及本次其它文件都不冲突
+        """
+        if "{n}" not in pattern:
+            pattern += "_{n}"
+
+        taken = set(target_entries)
+        for pair in pairs:
+            if not (pair.conflicts or pair.duplicate):
+                taken.update(os.path.normcase(n) for n in pair.dst_names())
+
+        for pair in pairs:
+            if not (pair.conflicts or pair.duplicate):
+                continue
+            n = 1
+            while True:
+                new_base = pattern.replace("{name}", pair.name_no_ext).replace("{n}", str(n))
+                keys = [os.path.normcase(name) for name in pair.dst_names(new_base)]
+                if not any(k in taken for k in keys):
+                    break
+                n += 1
+            pair.name_no_ext = new_base
+            pair.conflicts = []
+            pair.duplicate = False
+            pair.unchanged = set()
+            taken.update(keys)
 
     # -------------------------------------------------------------------------
-    # 在复制前，将内存中的 coords (4角点) 与 sam2 marks 写入本地文件
+    # 阶段 2：并行复制
     # -------------------------------------------------------------------------
-    def _save_local_params_for_item(self, image_item):
+    def _run_parallel_copy(self, jobs, label_text, copied=None, errors=None):
         """
-        示例：统一把 corners 存在 `_verified.txt` 文件里，
-        并将 sam2 marks 也写进同一个文件的 <mark> 块。
+        jobs: [[(src, dst), ...], ...]，每个内层列表（一个 pair）由同一个线程顺序复制。
+        显示进度条；用户取消后不再开始新的复制。
+        copied: 若给出，则追加 (目标文件名, 目标 stat, sha1) 记录每个复制成功的文件；
+                sha1 只在 use_hash 时计算（取自源文件），否则为 None。
+        errors: 若给出，则追加 (src, dst, exception) 记录每个复制失败的文件。
+        返回 True 表示全部完成；False 表示被取消。
         """
-        base_no_ext, _ = os.path.splitext(image_item.image_path)
-        verified_path = base_no_ext + "_verified.txt"
+        if not jobs:
+            return True
+
+        cancel_event = threading.Event()
+        if errors is None:
+            errors = []
+
+        def copy_pair(pair_jobs):
+            for src, dst in pair_jobs:
+                if cancel_event.is_set():
+                    return
+                try:
+                    shutil.copy2(src, dst)
+                    if copied is not None:
+                        sha1 = self._src_file_sha1(src) if self.use_hash else None
+                        copied.append((os.path.basename(dst), os.stat(dst), sha1))
+                except Exception as e:
+                    errors.append((src, dst, e))
+
+        progress = QProgressDialog(label_text, "取消", 0, len(jobs), self.parent)
+        progress.setWindowTitle("同步")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(300)
+        progress.setValue(0)
+
+        done_count = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = {executor.submit(copy_pair, pair_jobs) for pair_jobs in jobs}
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                done_count += len(done)
+                progress.setValue(done_count)
+                QApplication.processEvents()
+                if progress.wasCanceled():
+                    cancel_event.set()
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            progress.close()
+
+        if errors:
+            details = "\n".join(f"{src} => {dst}\n{e}" for src, dst, e in errors[:10])
+            if len(errors) > 10:
+                details += f"\n... 共 {len(errors)} 个错误"
+            QMessageBox.warning(self.parent, "错误", f"复制文件时出错：\n{details}")
 
-        # 1) 先写 4 corners
-        TransformParams.save_to_file(verified_path, image_item.verified_coords)
-        # 2) 再写 sam2 marks
-        SamMarksParams.save_to_file(verified_path, image_item.sam2_marks)
+        return not cancel_event.is_set()
 
-    def _ask_conflict_resolution(self, conflict_filenames):
+    # -------------------------------------------------------------------------
+    # 在复制前，将内存中的 coords (4角点) 与 sam2 marks 写入本地文件
+    # -------------------------------------------------------------------------
+    def _save_local_params_for_item(self, resource_manager, image_item):
         """
-        询问用户‘以下文件已存在，是否改名/跳过/忽略后续？’
-        返回 'rename' / 'skip' / 'ignore'。
+        统一把 corners 与 sam2 marks 一次性写进 `_verified.txt`
+        (ParamFileManager.save_all，一次读 + 一次原子写)。
+        只处理内存中有未保存修改(params_dirty)的 item；
+        未修改的 item 直接复制已有的参数文件，不产生任何写入。
+        """
+        if not image_item.params_dirty:
+            return
+        resource_manager.save_params(image_item)
+
+    def _ask_batch_conflict_resolution(self, conflicted_pairs):
         """
+        一次性列出所有冲突，询问用户统一处理方式。
+        返回 'rename' / 'skip' / 'overwrite' / 'cancel'。
+        """
+        names = []
+        for pair in conflicted_pairs:
+            names.extend(pair.conflicts or pair.dst_names()[:1])
+        preview = "\n".join(names[:15])
+        if len(names) > 15:
+            preview += f"\n... 等共 {len(names)} 个文件"
+
         msg = QMessageBox(self.parent)
         msg.setWindowTitle("文件冲突")
-        msg.setText(f"目标文件夹中已存在：\n{conflict_filenames}\n\n请选择操作：")
-        rename_button = msg.addButton("改名", QMessageBox.AcceptRole)
-        skip_button = msg.addButton("跳过", QMessageBox.RejectRole)
-        ignore_button = msg.addButton("忽略后续冲突", QMessageBox.DestructiveRole)
+        msg.setText(
+            f"有 {len(conflicted_pairs)} 组文件与目标文件夹中的文件同名：\n"
+            f"{preview}\n\n请选择对全部冲突的处理方式："
+        )
+        rename_button = msg.addButton("按规则改名", QMessageBox.AcceptRole)
+        skip_button = msg.addButton("全部跳过", QMessageBox.RejectRole)
+        overwrite_button = msg.addButton("全部覆盖", QMessageBox.DestructiveRole)
+        cancel_button = msg.addButton("取消同步", QMessageBox.RejectRole)
 
         msg.exec()
 
-        if msg.clickedButton() == rename_button:
+        clicked = msg.clickedButton()
+        if clicked == rename_button:
             return "rename"
-        elif msg.clickedButton() == ignore_button:
-            return "ignore"
-        else:
+        elif clicked == skip_button:
             return "skip"
+        elif clicked == overwrite_button:
+            return "overwrite"
+        else:
+            return "cancel"
 
-    def _ask_new_basename(self, old_basename):
+    def _ask_rename_pattern(self):
         """
-        弹出输入框让用户填写新的“基础文件名”，不含扩展名。
+        弹出输入框让用户填写改名规则，{name} 为原文件名，{n} 为序号。
         """
-        new_name, ok = QInputDialog.getText(
+        pattern, ok = QInputDialog.getText(
             self.parent,
             "改名",
-            f"原文件名：{old_basename}\n请输入新的文件名（不含扩展名）:"
+            "请输入改名规则（不含扩展名）：\n{name} = 原文件名，{n} = 序号",
+            QLineEdit.Normal,
+            "{name}_{n}"
         )
-        if ok and new_name.strip():
-            return new_name.strip()
+        if ok and pattern.strip():
+            return pattern.strip()
         return None
@@ -10,6 +10,8 @@ class ImageItem:
         # sam2 mask 相关
         self.mask_pixmap = None    # QPixmap or None
         self.mask_visible = False  # 是否显示mask
+        # (低分辨率 mask logits, 原图 (h, w)) or None；缩放后据此按新尺寸重建 mask_pixmap，不必重新推理
+        self.mask_logits = None
 
         # 用来保存最新（在内存中）的 verified 坐标
         # 默认情况下是 None，表示还没加载过
@@ -35,6 +37,10 @@ class ImageItem:
 
         self.sam2_marks = []
 
+        # 内存中的 coords / marks 是否有尚未写回文件的修改
+        # 为 True 时，任何从磁盘的重新加载都不能覆盖它们
+        self.params_dirty = False
+
     def set_corners_from_coords(self, coords):
         """
         coords: [(x1,y1), (x2,y2), (x3,y3), (x4,y4)]，顺序 = label 1,2,3,4
@@ -51,4 +57,13 @@ class ImageItem:
         按 label 升序返回 4 个 (x,y)
         """
         corners_sorted = sorted(self.corners, key=lambda c: c.label)
-        return [(c.x_rel, c.y_rel) for c in corners_sorted]
\ No newline at end of file
+        return [(c.x_rel, c.y_rel) for c in corners_sorted]
+
+    def set_params(self, coords, marks):
+        """
+        从文件(或缓存)加载到的参数写入 item，视为“干净”状态。
+        """
+        self.verified_coords = coords
+        self.set_corners_from_coords(coords)
+        self.sam2_marks = marks
+        self.params_dirty = False
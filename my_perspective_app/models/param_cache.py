@@ -0,0 +1,64 @@
+# my_perspective_app/models/param_cache.py
+import os
+
+from .param_file_manager import ParamFileManager
+
+
+class ParamCache:
+    """
+    缓存 ParamFileManager.load_all 的解析结果，避免重复读盘 / 正则解析。
+
+    每张图片对应一条记录：
+      image_path -> (signature, coords, marks)
+    其中 signature = (txt_path, mtime_ns, size)。
+    只要参数文件的路径、修改时间、大小都没变，就直接返回内存里的结果。
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    @staticmethod
+    def _signature(txt_path):
+        """
+        返回 (txt_path, mtime_ns, size)；文件不存在时返回 ("", 0, 0)。
+        """
+        if not txt_path:
+            return ("", 0, 0)
+        try:
+            st = os.stat(txt_path)
+        except OSError:
+            return ("", 0, 0)
+        return (txt_path, st.st_mtime_ns, st.st_size)
+
+    def load(self, image_path):
+        """
+        与 ParamFileManager.load_all 返回值相同：(coords_list, marks_list)。
+        若签名未变 => 不读文件，直接返回缓存的副本。
+        """
+        txt_path = ParamFileManager.find_param_file(image_path)
+        signature = self._signature(txt_path)
+
+        entry = self._entries.get(image_path)
+        if entry is not None and entry[0] == signature:
+            return list(entry[1]), list(entry[2])
+
+        coords, marks = ParamFileManager.load_all(image_path)
+        self._entries[image_path] = (signature, list(coords), list(marks))
+        return list(coords), list(marks)
+
+    def store(self, image_path, txt_path, coords, marks):
+        """
+        刚把 coords/marks 写入 txt_path 后调用：
+        用新文件的签名更新缓存，下次 load 时就不必再解析一遍。
+        """
+        signature = self._signature(txt_path)
+        self._entries[image_path] = (signature, list(coords), list(marks))
+
+    def invalidate(self, image_path=None):
+        """
+        丢弃某张图片(或全部)的缓存记录。
+        """
+        if image_path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(image_path, None)
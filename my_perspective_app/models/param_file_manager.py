@@ -1,9 +1,10 @@
 # my_perspective_app/models/param_file_manager.py
 import os
-import re
+import shutil
+import tempfile
 
 from .transform_params import TransformParams
-from .sam_marks_params import SamMarksParams
+from .sidecar_format import parse_sidecar, read_sidecar, format_sidecar
 
 class ParamFileManager:
     """
@@ -22,36 +23,34 @@ class ParamFileManager:
         coords_list: [(x1,y1),(x2,y2),(x3,y3),(x4,y4)]
         marks_list : [ (x,y,label), ... ] (label可以是'pos','neg','0_0',...等)
         """
-        base, _ = os.path.splitext(image_path)
-        verified_path = base + "_verified.txt"
-        normal_path = base + ".txt"
-
-        txt_path = ""
-        if os.path.exists(verified_path):
-            txt_path = verified_path
-        elif os.path.exists(normal_path):
-            txt_path = normal_path
-        else:
+        txt_path = ParamFileManager.find_param_file(image_path)
+        if not txt_path:
             # 文件都不存在 => 返回默认(4 corners) + 空mark
             return (TransformParams().coords, [])
 
-        # 读取全文
-        with open(txt_path, "r", encoding="utf-8") as f:
-            full_text = f.read()
-
-        # (1) 提取 4 corners
-        coords = ParamFileManager._parse_coor_block(full_text)
+        # 单遍读取：coords / marks 一次解析完成
+        coords, marks, remaining = read_sidecar(txt_path)
         if coords is None:
-            # 如果没有 <coor>... => 再用 transform_params 旧逻辑试试
-            # 也可以直接返回默认
-            coords_obj = TransformParams.load_from_file(txt_path)
-            coords = coords_obj.coords
-        # (2) 提取 sam2 marks
-        marks_obj = SamMarksParams.load_marks_from_text(full_text)
-        marks = marks_obj
+            # 如果没有 <coor>... => 再用 transform_params 旧逻辑(老式4段)试试
+            coords = TransformParams._parse_old_format(remaining)
 
         return (coords, marks)
 
+    @staticmethod
+    def find_param_file(image_path):
+        """
+        返回 image_path 对应的参数文件路径：
+        优先 _verified.txt，其次 .txt；都不存在则返回 ""。
+        """
+        base, _ = os.path.splitext(image_path)
+        verified_path = base + "_verified.txt"
+        if os.path.exists(verified_path):
+            return verified_path
+        normal_path = base + ".txt"
+        if os.path.exists(normal_path):
+            return normal_path
+        return ""
+
     @staticmethod
     def save_all(txt_path, coords, marks):
         """
@@ -59,6 +58,7 @@ class ParamFileManager:
           - 先读出旧文本
           - 去掉旧的 <coor>...</coor> 与 <mark>...</mark>
           - 在末尾插入新的 <coor> block + <mark> block
+          - 通过临时文件 + os.replace 原子写回
         """
         # 1) 若文件不存在，就建空串
         if os.path.exists(txt_path):
@@ -67,39 +67,36 @@ class ParamFileManager:
         else:
             old_text = ""
 
-        # 2) 去掉 <coor>...</coor> 和 <mark>...</mark>
-        coor_pattern = re.compile(r"<coor>\s*.*?</coor>", re.DOTALL | re.IGNORECASE)
-        mark_pattern = re.compile(r"<mark>\s*.*?<\\mark>", re.DOTALL)
-        cleaned = coor_pattern.sub("", old_text)
-        cleaned = mark_pattern.sub("", cleaned)
-        cleaned = cleaned.strip()
+        # 2) 去掉 <coor>...</coor> 和 <mark>...<\mark>，只保留其余原文
+        _, _, cleaned = parse_sidecar(old_text)
 
-        # 3) 构造新的 <coor> 块
-        coor_lines = []
-        for (x,y) in coords:
-            coor_lines.append(f"({x},{y})")
-        coor_block = "<coor>\n" + "\n".join(coor_lines) + "\n</coor>"
+        # 3) 拼回新的 <coor> + <mark> 块并写回（原子替换，避免写一半留下残缺文件）
+        final_text = format_sidecar(cleaned, coords, marks)
+        ParamFileManager.atomic_write_text(txt_path, final_text)
 
-        # 4) 构造新的 <mark> 块
-        mark_lines = []
-        for (x, y, label) in marks:
-            mark_lines.append(f"({x},{y}),{label}")
-        if mark_lines:
-            mark_block = "<mark>\n" + "\n".join(mark_lines) + "\n<\\mark>"
-        else:
-            # 即使空，也可选择写空 <mark> ... <\mark>，看需求
-            mark_block = "<mark>\n\n<\\mark>"
-
-        # 5) 拼回
-        final_text = cleaned
-        if final_text:
-            final_text += "\n\n" + coor_block + "\n\n" + mark_block + "\n"
-        else:
-            final_text = coor_block + "\n\n" + mark_block + "\n"
-
-        # 6) 写回
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(final_text)
+    @staticmethod
+    def atomic_write_text(txt_path, text):
+        """
+        先写入同目录下的临时文件并 fsync，再用 os.replace 覆盖 txt_path。
+        任意时刻崩溃，txt_path 要么是旧内容，要么是完整的新内容。
+        """
+        folder = os.path.dirname(os.path.abspath(txt_path))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=folder, prefix="." + os.path.basename(txt_path) + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(txt_path):
+                # 保留原文件的权限位（mkstemp 默认只给 0600）
+                shutil.copymode(txt_path, tmp_path)
+            os.replace(tmp_path, txt_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     # --------------------------------------------------------------------
     #   内部解析 <coor> block
@@ -110,22 +107,5 @@ class ParamFileManager:
         从全文中解析 <coor>...\n</coor> => 4行 (x,y)
         若没有找到或解析失败 => 返回 None
         """
-        pattern = re.compile(r"<coor>\s*(.*?)\s*</coor>", re.DOTALL | re.IGNORECASE)
-        match = pattern.search(full_text)
-        if not match:
-            return None
-        block_str = match.group(1).strip()
-        if not block_str:
-            return None
-
-        lines = block_str.splitlines()
-        coords = []
-        for line in lines:
-            line = line.strip("() ")
-            if not line:
-                continue
-            x_str, y_str = line.split(",", 1)
-            coords.append( (float(x_str.strip()), float(y_str.strip())) )
-        if len(coords) != 4:
-            return None
+        coords, _, _ = parse_sidecar(full_text)
         return coords
@@ -0,0 +1,346 @@
+# my_perspective_app/models/perspective_export.py
+"""
+批量透视矫正导出（纯 numpy + PIL，不依赖 Qt，可在子进程中运行）。
+
+角点顺序与 ImageItem.get_coords_in_label_order() 一致：
+    label 1 = 左上, 2 = 右上, 3 = 右下, 4 = 左下；坐标为相对值 (0~1)。
+"""
+import os
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from PIL import Image
+
+from .sidecar_format import read_sidecar
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# 输出格式 => (扩展名, PIL format)
+OUTPUT_FORMATS = {
+    "png": (".png", "PNG"),
+    "jpg": (".jpg", "JPEG"),
+    "tif": (".tif", "TIFF"),
+    "webp": (".webp", "WEBP"),
+}
+
+_RESAMPLE = {
+    "nearest": Image.NEAREST,
+    "bilinear": Image.BILINEAR,
+    "bicubic": Image.BICUBIC,
+}
+
+
+class ExportOptions:
+    """
+    导出参数（会被 pickle 传给子进程，只放简单类型）
+      - fmt       : OUTPUT_FORMATS 的 key
+      - size      : None => 按四边形边长自动计算；(w, h) => 固定输出尺寸
+      - max_side  : 自动尺寸时长边的上限（0 = 不限制）
+      - tile_size : >0 时按 tile_size x tile_size 分块矫正（超大扫描件；只限制输出侧内存，原图仍整张解码）
+      - quality   : jpg / webp 质量
+      - resample  : "nearest" / "bilinear" / "bicubic"
+    """
+    def __init__(self, fmt="png", size=None, max_side=0, tile_size=0,
+                 quality=95, resample="bicubic"):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {fmt}")
+        if resample not in _RESAMPLE:
+            raise ValueError(f"不支持的插值方式: {resample}")
+        self.fmt = fmt
+        self.size = tuple(size) if size else None
+        self.max_side = max_side
+        self.tile_size = tile_size
+        self.quality = quality
+        self.resample = resample
+
+
+# =============================
+#  几何
+# =============================
+def compute_homography(src_pts, dst_pts):
+    """
+    求 3x3 单应矩阵 H，使 H * src ~ dst（4 对点，DLT 直接解 8x8 线性方程）。
+    """
+    a = np.zeros((8, 8), dtype=np.float64)
+    b = np.zeros(8, dtype=np.float64)
+    for i, ((x, y), (u, v)) in enumerate(zip(src_pts, dst_pts)):
+        a[2 * i] = [x, y, 1, 0, 0, 0, -u * x, -u * y]
+        a[2 * i + 1] = [0, 0, 0, x, y, 1, -v * x, -v * y]
+        b[2 * i] = u
+        b[2 * i + 1] = v
+    h = np.linalg.solve(a, b)
+    return np.append(h, 1.0).reshape(3, 3)
+
+
+def auto_output_size(corners_px, max_side=0):
+    """
+    由四边形的边长估计矫正后的尺寸：宽 = 上下边较长者，高 = 左右边较长者。
+    """
+    p = np.asarray(corners_px, dtype=np.float64)
+    width = max(np.linalg.norm(p[1] - p[0]), np.linalg.norm(p[2] - p[3]))
+    height = max(np.linalg.norm(p[3] - p[0]), np.linalg.norm(p[2] - p[1]))
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        width, height = width * scale, height * scale
+    return max(1, int(round(width))), max(1, int(round(height)))
+
+
+def _perspective_coeffs(h):
+    """PIL 的 PERSPECTIVE 系数：输出坐标 => 输入坐标 的矩阵前 8 项"""
+    h = h / h[2, 2]
+    return tuple(h.flatten()[:8])
+
+
+def warp_image(img, coords_rel, out_size=None, max_side=0, tile_size=0,
+               resample="bicubic"):
+    """
+    对 PIL 图像做透视矫正。
+    coords_rel: 4 个相对坐标（label 顺序）；out_size: (w, h) 或 None(自动)。
+    tile_size > 0 时逐块矫正：每块只裁取它在原图中对应的区域再变换，
+    单次 resample 的工作集与块大小成正比，而不是整张输出图。
+    注意只有输出侧是分块的：img 本身仍是整张解码好的原图（第一次 crop 时 PIL 会解码整张），
+    每个子进程的峰值内存至少是一张原图的解码大小。
+    """
+    src_w, src_h = img.size
+    corners_px = [(x * src_w, y * src_h) for (x, y) in coords_rel]
+    if out_size is None:
+        out_size = auto_output_size(corners_px, max_side)
+    out_w, out_h = out_size
+
+    # 输出 => 输入 的映射（PIL 的 transform 需要逆映射）
+    dst_pts = [(0, 0), (out_w, 0), (out_w, out_h), (0, out_h)]
+    h_inv = compute_homography(dst_pts, corners_px)
+    method = _RESAMPLE[resample]
+
+    if not tile_size or (out_w <= tile_size and out_h <= tile_size):
+        return img.transform(out_size, Image.PERSPECTIVE, _perspective_coeffs(h_inv), method)
+
+    out = Image.new(img.mode, out_size)
+    margin = 2  # 给插值留的边
+    for y0 in range(0, out_h, tile_size):
+        y1 = min(out_h, y0 + tile_size)
+        for x0 in range(0, out_w, tile_size):
+            x1 = min(out_w, x0 + tile_size)
+            # 该块四角映射回原图，取包围盒
+            pts = np.array([[x0, y0, 1], [x1, y0, 1], [x1, y1, 1], [x0, y1, 1]], dtype=np.float64)
+            mapped = pts @ h_inv.T
+            mapped = mapped[:, :2] / mapped[:, 2:3]
+            sx0 = max(0, int(np.floor(mapped[:, 0].min())) - margin)
+            sy0 = max(0, int(np.floor(mapped[:, 1].min())) - margin)
+            sx1 = min(src_w, int(np.ceil(mapped[:, 0].max())) + margin)
+            sy1 = min(src_h, int(np.ceil(mapped[:, 1].max())) + margin)
+            if sx1 <= sx0 or sy1 <= sy0:
+                continue  # 整块都落在原图外 => 保持黑色
+
+            # 块坐标 => 输出坐标 => 原图坐标 => 裁剪区域坐标
+            to_out = np.array([[1, 0, x0], [0, 1, y0], [0, 0, 1]], dtype=np.float64)
+            to_crop = np.array([[1, 0, -sx0], [0, 1, -sy0], [0, 0, 1]], dtype=np.float64)
+            h_tile = to_crop @ h_inv @ to_out
+
+            region = img.crop((sx0, sy0, sx1, sy1))
+            tile = region.transform((x1 - x0, y1 - y0), Image.PERSPECTIVE,
+                                    _perspective_coeffs(h_tile), method)
+            out.paste(tile, (x0, y0))
+    return out
+
+
+# =============================
+#  单张导出（子进程入口）
+# =============================
+def export_one(job):
+    """
+    job = (image_path, coords_rel, out_path, options)
+    返回 (out_path, error_str 或 None)。任何异常都转成字符串，不让子进程崩掉整个池。
+    原图总是整张解码（只有 JPEG + 自动尺寸 + max_side 时会用 draft 缩小解码），
+    tile_size 只限制输出侧；内存不足导致子进程被杀时由 run_export 记为错误。
+    """
+    image_path, coords_rel, out_path, options = job
+    # 扫描件可能非常大，只在导出读图时关闭“解压炸弹”检查（不影响 GUI 等其它地方）
+    max_pixels = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        with Image.open(image_path) as img:
+            if options.size is None and options.max_side and img.format == "JPEG":
+                # 输出明显小于原图时，让 JPEG 解码器直接按 1/2、1/4、1/8 缩小解码
+                corners_px = [(x * img.width, y * img.height) for (x, y) in coords_rel]
+                want_w, want_h = auto_output_size(corners_px, options.max_side)
+                full_w, full_h = auto_output_size(corners_px)
+                scale = min(want_w / full_w, want_h / full_h)
+                img.draft(img.mode, (int(img.width * scale) + 1, int(img.height * scale) + 1))
+            if img.mode not in ("RGB", "RGBA", "L"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+            out = warp_image(img, coords_rel, options.size, options.max_side,
+                             options.tile_size, options.resample)
+
+        _, pil_format = OUTPUT_FORMATS[options.fmt]
+        if pil_format == "JPEG" and out.mode != "RGB":
+            out = out.convert("RGB")
+        save_kwargs = {}
+        if pil_format in ("JPEG", "WEBP"):
+            save_kwargs["quality"] = options.quality
+        out.save(out_path, pil_format, **save_kwargs)
+        return out_path, None
+    except Exception as e:
+        return out_path, f"{type(e).__name__}: {e}"
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_pixels
+
+
+# =============================
+#  任务收集
+# =============================
+def _out_path(image_path, out_folder, options, taken):
+    """
+    输出路径 = 原文件名 + 输出格式扩展名。
+    与本次已分配的输出撞名时（如 a.jpg 与 a.png，或不同文件夹中的同名图片），
+    把源扩展名带进文件名（a_png.png），仍冲突再加序号（a_png_2.png）。
+    taken: 本次已分配的 normcase 输出路径集合，会被更新。
+    """
+    name_no_ext, src_ext = os.path.splitext(os.path.basename(image_path))
+    ext, _ = OUTPUT_FORMATS[options.fmt]
+    with_src_ext = f"{name_no_ext}_{src_ext.lstrip('.').lower()}"
+    names = itertools.chain([name_no_ext, with_src_ext],
+                            (f"{with_src_ext}_{n}" for n in itertools.count(2)))
+    for name in names:
+        path = os.path.join(out_folder, name + ext)
+        if os.path.normcase(path) not in taken:
+            taken.add(os.path.normcase(path))
+            return path
+
+
+def jobs_from_items(image_items, out_folder, options):
+    """
+    从 ResourceManager 中的 ImageItem 生成任务（使用内存中的最新角点，含未保存修改）
+    """
+    taken = set()
+    return [
+        (item.image_path, item.get_coords_in_label_order(),
+         _out_path(item.image_path, out_folder, options, taken), options)
+        for item in image_items
+    ]
+
+
+def jobs_from_folder(folder, out_folder, options):
+    """
+    扫描 folder 中的 *_verified.txt，找到同名图片，读取 <coor> 生成任务。
+    没有 <coor> 块或找不到图片的条目会被跳过，返回 (jobs, skipped_paths)。
+    """
+    suffix = "_verified.txt"
+    images = {}
+    sidecars = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            lower = entry.name.lower()
+            if lower.endswith(suffix):
+                sidecars.append(entry)
+            elif lower.endswith(IMAGE_EXTS):
+                images.setdefault(os.path.splitext(lower)[0], entry.path)
+
+    jobs, skipped = [], []
+    taken = set()
+    for entry in sorted(sidecars, key=lambda e: e.name):
+        image_path = images.get(entry.name[:-len(suffix)].lower())
+        coords = None
+        if image_path:
+            try:
+                coords, _, _ = read_sidecar(entry.path)
+            except (OSError, ValueError):
+                coords = None
+        if image_path is None or coords is None:
+            skipped.append(entry.path)
+            continue
+        jobs.append((image_path, coords, _out_path(image_path, out_folder, options, taken), options))
+    return jobs, skipped
+
+
+# =============================
+#  进程池执行
+# =============================
+def run_export(jobs, max_workers=None, max_in_flight=None, progress_callback=None):
+    """
+    用进程池并行导出。
+      - 同时提交的任务数不超过 max_in_flight（默认 2 * max_workers），
+        结果一返回就释放，内存占用与图片总数无关
+      - 每个子进程最多处理 32 张后重启，避免 PIL 的内存碎片累积
+      - progress_callback(done, total) 返回 False 时取消剩余任务
+      - 子进程异常退出（内存不足被杀、解码器崩溃）会让进程池失效（BrokenProcessPool）：
+        当时在处理中的图片都记为错误，换一个新进程池继续导出剩下的图片
+    返回统计 dict：done / failed / errors / elapsed / images_per_sec / cancelled
+    """
+    total = len(jobs)
+    max_workers = max_workers or max(1, min(os.cpu_count() or 1, 8))
+    max_in_flight = max_in_flight or 2 * max_workers
+    errors = []
+    done = 0
+    cancelled = False
+
+    start = time.perf_counter()
+    if total:
+        executor = ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=32)
+        try:
+            pending = set()
+            out_paths = {}  # future => out_path（future 出错时拿不到返回值）
+            next_job = 0
+            while next_job < total or pending:
+                while not cancelled and next_job < total and len(pending) < max_in_flight:
+                    fut = executor.submit(export_one, jobs[next_job])
+                    out_paths[fut] = jobs[next_job][2]
+                    pending.add(fut)
+                    next_job += 1
+                if not pending:
+                    break
+                finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                broken = False
+                for fut in finished:
+                    err, fut_broken = _job_error(fut)
+                    broken = broken or fut_broken
+                    done += 1
+                    if err:
+                        errors.append((out_paths.pop(fut), err))
+                    else:
+                        out_paths.pop(fut)
+                if broken:
+                    # 进程池已失效：等它收尾，剩下的在途任务也都记为错误，再换新池
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    for fut in pending:
+                        err, _ = _job_error(fut)
+                        done += 1
+                        errors.append((out_paths.pop(fut), err))
+                    pending = set()
+                    executor = ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=32)
+                if progress_callback is not None and not cancelled:
+                    if progress_callback(done, total) is False:
+                        cancelled = True
+                        next_job = total
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    elapsed = time.perf_counter() - start
+
+    succeeded = done - len(errors)
+    return {
+        "done": succeeded,
+        "failed": len(errors),
+        "errors": errors,
+        "elapsed": elapsed,
+        "images_per_sec": succeeded / elapsed if elapsed > 0 else 0.0,
+        "cancelled": cancelled,
+    }
+
+
+def _job_error(fut):
+    """
+    返回 (error_str 或 None, 进程池是否已失效)。
+    export_one 自己会把异常转成字符串，这里处理的是子进程本身崩掉的情况。
+    """
+    try:
+        _, err = fut.result()
+        return err, False
+    except BrokenProcessPool as e:
+        return f"{type(e).__name__}: 导出子进程异常退出（可能内存不足），未导出", True
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", False
@@ -2,6 +2,11 @@
 import os
 import re
 
+from .sidecar_format import parse_sidecar
+
+# 写入时用来去掉旧 <mark> 块的正则，模块加载时编译一次
+_MARK_BLOCK_RE = re.compile(r"<mark>\s*.*?\s*<\\mark>", re.DOTALL)
+
 class SamMarksParams:
     """
     专门管理 'sam2分割' 或类似模式下的一系列标记点，
@@ -21,37 +26,8 @@ class SamMarksParams:
         返回 List[(x_float, y_float, label_str)].
         若没找到，则返回空列表 [].
         """
-        # 用正则找出 <mark>...</mark> 内容
-        pattern = re.compile(r"<mark>\s*(.*?)\s*<\\mark>", re.DOTALL)
-        match = pattern.search(full_text)
-        if not match:
-            return []  # 没有 <mark> 块
-
-        marks_str_block = match.group(1).strip()
-        if not marks_str_block:
-            return []  # 块是空的
-
-        lines = marks_str_block.splitlines()
-        results = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            # 形如: (0.1,0.723),pos
-            if not line.startswith("(") or ")" not in line:
-                continue
-            coords_part, label_str = line.rsplit(")", 1)  # 从右边切一次
-            coords_part = coords_part.strip("(")
-            label_str = label_str.strip().strip(",")  # label_str 全当字符串
-
-            # 拆分 x,y
-            x_str, y_str = coords_part.split(",", 1)
-            x_val = float(x_str.strip())
-            y_val = float(y_str.strip())
-            label_val = label_str  # 不转 int，直接当字符串
-
-            results.append( (x_val, y_val, label_val) )
-        return results
+        _, marks, _ = parse_sidecar(full_text)
+        return marks
 
     @staticmethod
     def embed_marks_in_text(orig_text: str, marks):
@@ -62,8 +38,7 @@ class SamMarksParams:
         - 若 marks 为空，也会写一个空的 <mark>\n\n<\mark>.
         """
         # 1) 去掉原本的 <mark>...<\mark>
-        pattern = re.compile(r"<mark>\s*.*?\s*<\\mark>", re.DOTALL)
-        cleaned_text = pattern.sub("", orig_text).strip()
+        cleaned_text = _MARK_BLOCK_RE.sub("", orig_text).strip()
 
         # 2) 构造新的 <mark> 块
         mark_lines = []
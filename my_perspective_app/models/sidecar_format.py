@@ -0,0 +1,137 @@
+# my_perspective_app/models/sidecar_format.py
+import re
+
+# 所有正则在模块加载时编译一次
+# 块标签：<coor> ... </coor> 以及 <mark> ... <\mark>
+_TAG_RE = re.compile(r"(<coor>|</coor>|<mark>|<\\mark>)", re.IGNORECASE)
+_OPEN_TAGS = {"<coor>": "coor", "<mark>": "mark"}
+_CLOSE_TAGS = {"</coor>": "coor", "<\\mark>": "mark"}
+
+
+def parse_sidecar(full_text):
+    """
+    单遍扫描 sidecar 文本，一次性得到：
+      - coords   : 第一个 <coor> 块中的 4 个 (x,y)；没有块 / 解析失败 => None
+      - marks    : 第一个 <mark> 块中的 [(x,y,label), ...]；没有块 => []
+      - remaining: 去掉所有 <coor>/<mark> 块后剩下的原文（已 strip）
+    """
+    return parse_sidecar_lines(full_text.splitlines(keepends=True))
+
+
+def read_sidecar(txt_path):
+    """
+    逐行流式读取 txt_path 并解析，整个文件只读一次。
+    返回值同 parse_sidecar。
+    """
+    with open(txt_path, "r", encoding="utf-8") as f:
+        return parse_sidecar_lines(f)
+
+
+def parse_sidecar_lines(lines):
+    """
+    parse_sidecar / read_sidecar 的核心：lines 可以是任意行迭代器（含换行符）。
+    """
+    remaining = []
+    coords = None
+    marks = []
+    coor_seen = False
+    mark_seen = False
+
+    block_kind = None   # 当前所在块："coor" / "mark" / None
+    block_body = []     # 当前块内的文本
+    block_raw = []      # 当前块原文(含标签)，块未闭合时还原到 remaining
+
+    for line in lines:
+        if "<" not in line:
+            # 快速路径：绝大多数行不含标签
+            if block_kind is None:
+                remaining.append(line)
+            else:
+                block_body.append(line)
+                block_raw.append(line)
+            continue
+
+        for token in _TAG_RE.split(line):
+            if not token:
+                continue
+            tag = token.lower()
+            if block_kind is None:
+                if tag in _OPEN_TAGS:
+                    block_kind = _OPEN_TAGS[tag]
+                    block_body = []
+                    block_raw = [token]
+                else:
+                    remaining.append(token)
+            elif _CLOSE_TAGS.get(tag) == block_kind:
+                # 与正则 search 一致：只解析第一个块
+                if block_kind == "coor" and not coor_seen:
+                    coor_seen = True
+                    coords = _parse_coor_body(block_body)
+                elif block_kind == "mark" and not mark_seen:
+                    mark_seen = True
+                    marks = _parse_mark_body(block_body)
+                block_kind = None
+            else:
+                block_body.append(token)
+                block_raw.append(token)
+
+    if block_kind is not None:
+        # 未闭合的块不算块，原样保留
+        remaining.extend(block_raw)
+
+    return coords, marks, "".join(remaining).strip()
+
+
+def format_sidecar(remaining, coords, marks):
+    """
+    parse_sidecar 的逆操作：remaining 原文 + 新的 <coor> 块 + 新的 <mark> 块。
+    即使 marks 为空，也会写一个空的 <mark>\\n\\n<\\mark>。
+    """
+    coor_lines = [f"({x},{y})" for (x, y) in coords]
+    coor_block = "<coor>\n" + "\n".join(coor_lines) + "\n</coor>"
+
+    mark_lines = [f"({x},{y}),{label}" for (x, y, label) in marks]
+    if mark_lines:
+        mark_block = "<mark>\n" + "\n".join(mark_lines) + "\n<\\mark>"
+    else:
+        mark_block = "<mark>\n\n<\\mark>"
+
+    if remaining:
+        return remaining + "\n\n" + coor_block + "\n\n" + mark_block + "\n"
+    return coor_block + "\n\n" + mark_block + "\n"
+
+
+def _parse_coor_body(body):
+    """
+    <coor> 块内容 => 4 个 (x,y)；行数不为 4 或格式不对 => None
+    """
+    coords = []
+    for line in "".join(body).splitlines():
+        line = line.strip("() \t")
+        if not line:
+            continue
+        x_str, sep, y_str = line.partition(",")
+        if not sep:
+            return None
+        try:
+            coords.append((float(x_str), float(y_str.strip(" )"))))
+        except ValueError:
+            return None
+    if len(coords) != 4:
+        return None
+    return coords
+
+
+def _parse_mark_body(body):
+    """
+    <mark> 块内容 => [(x,y,label)]，每行形如 '(0.1,0.723),pos'，label 一律当字符串
+    """
+    results = []
+    for line in "".join(body).splitlines():
+        line = line.strip()
+        if not line.startswith("(") or ")" not in line:
+            continue
+        coords_part, label_str = line.rsplit(")", 1)  # 从右边切一次
+        x_str, _, y_str = coords_part.strip("(").partition(",")
+        results.append((float(x_str), float(y_str), label_str.strip().strip(",")))
+    return results
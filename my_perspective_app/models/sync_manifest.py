@@ -0,0 +1,80 @@
+# my_perspective_app/models/sync_manifest.py
+import os
+import json
+
+from .param_file_manager import ParamFileManager
+
+MANIFEST_NAME = ".sync_state.json"
+
+
+class SyncManifest:
+    """
+    保存在目标文件夹中的同步状态文件 (.sync_state.json)。
+
+    记录上次同步写入目标文件夹的每个文件：
+      name -> {"size": int, "mtime_ns": int, "sha1": str 或 None}
+    若目标文件当前的 size/mtime 与记录一致，说明它是本程序写入、之后没被别人改过，
+    再次同步时可以直接覆盖更新，而不必当作冲突询问用户。
+    """
+
+    VERSION = 1
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.files = {}
+        self._changed = False
+
+    @classmethod
+    def load(cls, folder):
+        """
+        读取 folder 中的 manifest；不存在或损坏时返回空 manifest。
+        """
+        manifest = cls(folder)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if isinstance(data, dict) and data.get("version") == cls.VERSION:
+            manifest.files = data.get("files", {})
+        return manifest
+
+    def get(self, name):
+        return self.files.get(os.path.normcase(name))
+
+    def matches(self, name, st):
+        """
+        目标文件的当前 stat 是否与上次记录一致
+        """
+        record = self.get(name)
+        return (
+            record is not None
+            and record["size"] == st.st_size
+            and record["mtime_ns"] == st.st_mtime_ns
+        )
+
+    def record(self, name, st, sha1=None):
+        """
+        记录刚写入(或确认相同)的目标文件。若 size/mtime 未变且没有新 hash，保留旧 hash。
+        """
+        key = os.path.normcase(name)
+        old = self.files.get(key)
+        if sha1 is None and old is not None and old["size"] == st.st_size \
+                and old["mtime_ns"] == st.st_mtime_ns:
+            sha1 = old.get("sha1")
+        new = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1}
+        if new != old:
+            self.files[key] = new
+            self._changed = True
+
+    def save(self):
+        """
+        有变化时才写回（原子替换）
+        """
+        if not self._changed:
+            return
+        text = json.dumps({"version": self.VERSION, "files": self.files},
+                          ensure_ascii=False, separators=(",", ":"))
+        ParamFileManager.atomic_write_text(self.path, text)
+        self._changed = False
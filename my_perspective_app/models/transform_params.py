@@ -2,6 +2,11 @@
 import os
 import re
 
+from .sidecar_format import parse_sidecar
+
+# 保存时用来去掉旧 <coor> 块的正则，模块加载时编译一次
+_COOR_BLOCK_RE = re.compile(r"<coor>\s*.*?\s*</coor>", re.DOTALL | re.IGNORECASE)
+
 class TransformParams:
     def __init__(self, coords=None):
         """
@@ -46,32 +51,7 @@ class TransformParams:
         在 full_text 中查找 <coor>...</coor> 块，解析其中的4行 (x,y)。
         若未找到或解析失败 => 返回 None。
         """
-        pattern = re.compile(r"<coor>\s*(.*?)\s*</coor>", re.DOTALL | re.IGNORECASE)
-        match = pattern.search(full_text)
-        if not match:
-            return None
-
-        block_str = match.group(1).strip()
-        if not block_str:
-            return None
-
-        # 逐行拆分
-        lines = block_str.splitlines()
-        coords = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            # e.g. "(0.25,0.25)"
-            line = line.strip("()")
-            if "," not in line:
-                return None
-            x_str, y_str = line.split(",", 1)
-            coords.append((float(x_str.strip()), float(y_str.strip())))
-
-        if len(coords) != 4:
-            return None
-
+        coords, _, _ = parse_sidecar(full_text)
         return coords
 
     @staticmethod
@@ -123,8 +103,7 @@ class TransformParams:
             old_text = ""
 
         # 2) 去掉 <coor>...</coor> 块
-        pattern = re.compile(r"<coor>\s*.*?\s*</coor>", re.DOTALL | re.IGNORECASE)
-        cleaned_text = pattern.sub("", old_text).strip()
+        cleaned_text = _COOR_BLOCK_RE.sub("", old_text).strip()
 
         # （可选）若想一起去掉老式4个坐标段，也可以用更精确的方式处理
 
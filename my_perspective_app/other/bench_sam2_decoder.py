@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# 让脚本可以直接 `python other/bench_sam2_decoder.py` 运行
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, APP_DIR)
+
+import torch
+
+from sam2.build_sam import build_sam2
+from sam2.sam2_image_predictor import SAM2ImagePredictor
+
+
+def set_synthetic_features(predictor, orig_hw=(1024, 1024), seed=0):
+    """
+    跳过图像编码器：直接放入形状正确的随机特征，只测 prompt encoder + mask decoder
+    """
+    gen = torch.Generator().manual_seed(seed)
+    model = predictor.model
+    device = predictor.device
+    embed_h, embed_w = model.sam_prompt_encoder.image_embedding_size
+    dim = model.sam_prompt_encoder.embed_dim
+    image_embed = torch.randn(1, dim, embed_h, embed_w, generator=gen).to(device)
+    high_res_feats = [
+        torch.randn(1, dim // 8, embed_h * 4, embed_w * 4, generator=gen).to(device),
+        torch.randn(1, dim // 4, embed_h * 2, embed_w * 2, generator=gen).to(device),
+    ]
+    predictor.reset_predictor()
+    predictor._features = {"image_embed": image_embed, "high_res_feats": high_res_feats}
+    predictor._orig_hw = [orig_hw]
+    predictor._is_image_set = True
+
+
+def time_clicks(predictor, clicks, uncached):
+    """
+    模拟交互：每次点击 = 一次 predict(单点)。uncached=True 时每次都丢掉 dense PE 缓存，
+    相当于旧实现每次重新计算。返回每次耗时(ms)列表
+    """
+    prompt_encoder = predictor.model.sam_prompt_encoder
+    h, w = predictor._orig_hw[0]
+    rng = np.random.default_rng(0)
+    times = []
+    for _ in range(clicks):
+        point = np.array([[rng.uniform(0, w), rng.uniform(0, h)]], dtype=np.float32)
+        label = np.array([1], dtype=np.int32)
+        if uncached:
+            prompt_encoder._dense_pe = None
+        start = time.perf_counter()
+        predictor.predict(point, label, multimask_output=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def time_dense_pe(prompt_encoder, calls, uncached):
+    start = time.perf_counter()
+    for _ in range(calls):
+        if uncached:
+            prompt_encoder._dense_pe = None
+        prompt_encoder.get_dense_pe()
+    return (time.perf_counter() - start) * 1000 / calls
+
+
+def summarize(name, times):
+    arr = np.asarray(times)
+    print(f"{name:>22}: mean {arr.mean():8.3f} ms   p50 {np.percentile(arr, 50):8.3f} ms"
+          f"   p95 {np.percentile(arr, 95):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2 解码器(不含图像编码器)单次点击延迟测试")
+    parser.add_argument("--config", default=os.path.join(APP_DIR, "sam2/checkpoints/sam2.1_hiera_tiny.yaml"))
+    parser.add_argument("--checkpoint", default=None, help="可选；不给则使用随机权重(只测速度)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--clicks", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=0, help="torch CPU 线程数 (0 = 默认)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = build_sam2(args.config, args.checkpoint, device=args.device)
+    predictor = SAM2ImagePredictor(model)
+    set_synthetic_features(predictor)
+
+    with torch.inference_mode():
+        time_clicks(predictor, args.warmup, uncached=False)
+        print(f"设备 {args.device}，{args.clicks} 次单点点击：")
+        summarize("dense PE 每次重算", time_clicks(predictor, args.clicks, uncached=True))
+        summarize("dense PE 缓存", time_clicks(predictor, args.clicks, uncached=False))
+
+        prompt_encoder = model.sam_prompt_encoder
+        print(f"get_dense_pe 本身：重算 {time_dense_pe(prompt_encoder, 100, True):.3f} ms / 次，"
+              f"缓存 {time_dense_pe(prompt_encoder, 100, False) * 1000:.2f} us / 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+SAM2 交互路径的 CPU 基准测试（全部使用合成输入，不需要权重文件 / 视频 / GPU）。
+
+  python other/bench_sam2_suite.py --out bench_sam2.json
+  python other/bench_sam2_suite.py --only predict,rle --sizes t,s
+
+结果写成 JSON，便于不同版本之间做回归对比。
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+
+import numpy as np
+
+# 让脚本可以直接 `python other/bench_sam2_suite.py` 运行
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, APP_DIR)
+
+import torch
+
+from sam2.build_sam import build_sam2
+from sam2.sam2_image_predictor import SAM2ImagePredictor
+from sam2.utils.amg import mask_to_rle_pytorch, rle_to_mask
+
+from other.bench_sam2_decoder import set_synthetic_features
+
+CONFIGS = {
+    "t": "sam2/configs/sam2.1/sam2.1_hiera_t.yaml",
+    "s": "sam2/configs/sam2.1/sam2.1_hiera_s.yaml",
+    "b+": "sam2/configs/sam2.1/sam2.1_hiera_b+.yaml",
+    "l": "sam2/configs/sam2.1/sam2.1_hiera_l.yaml",
+}
+
+ALL_BENCHES = ["encoder", "predict", "postprocess", "rle", "mask_generator"]
+
+
+# =============================
+#  计时工具
+# =============================
+def measure(fn, repeat, warmup=1):
+    """
+    先 warmup 次，再计时 repeat 次；返回毫秒统计
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    arr = np.asarray(times)
+    return {
+        "repeat": repeat,
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "min_ms": float(arr.min()),
+    }
+
+
+def log(name, params, stats):
+    param_text = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{name:>16} {param_text:<36} mean {stats['mean_ms']:9.3f} ms   p50 {stats['p50_ms']:9.3f} ms")
+
+
+def build_model(size, device):
+    return build_sam2(os.path.join(APP_DIR, CONFIGS[size]), None, device=device)
+
+
+# =============================
+#  各项测试
+# =============================
+def bench_encoder(args, results):
+    """图像编码器 (set_image) 延迟，按模型大小"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(768, 1024, 3), dtype=np.uint8)
+    for size in args.sizes:
+        predictor = SAM2ImagePredictor(build_model(size, args.device))
+        params = {"model": size, "image": "768x1024"}
+        stats = measure(lambda: predictor.set_image(image), args.encoder_repeat)
+        log("encoder", params, stats)
+        results.append({"bench": "encoder", "params": params, **stats})
+
+
+def bench_predict(args, results, model):
+    """_predict 延迟 vs 点数 / 框数（合成特征，只含 prompt encoder + decoder + 上采样）"""
+    predictor = SAM2ImagePredictor(model)
+    orig_hw = (768, 1024)
+    set_synthetic_features(predictor, orig_hw)
+    rng = np.random.default_rng(0)
+    h, w = orig_hw
+
+    for n in args.counts:
+        # 一个目标上的 n 个点
+        coords = torch.as_tensor(rng.uniform(0, [w, h], size=(1, n, 2)), dtype=torch.float32)
+        labels = torch.ones(1, n, dtype=torch.int)
+        coords = predictor._transforms.transform_coords(coords, normalize=True, orig_hw=orig_hw)
+        params = {"prompt": "points", "n": n}
+        stats = measure(lambda: predictor._predict(coords, labels, multimask_output=True), args.repeat)
+        log("predict", params, stats)
+        results.append({"bench": "predict", "params": params, **stats})
+
+        # n 个框 = n 个目标并行
+        xy0 = rng.uniform(0, [w / 2, h / 2], size=(n, 2))
+        boxes = np.concatenate([xy0, xy0 + rng.uniform(10, [w / 2, h / 2], size=(n, 2))], axis=1)
+        boxes = predictor._transforms.transform_boxes(
+            torch.as_tensor(boxes, dtype=torch.float32), normalize=True, orig_hw=orig_hw
+        )
+        params = {"prompt": "boxes", "n": n}
+        stats = measure(lambda: predictor._predict(None, None, boxes, multimask_output=False), args.repeat)
+        log("predict", params, stats)
+        results.append({"bench": "predict", "params": params, **stats})
+
+
+def bench_postprocess(args, results, model):
+    """postprocess_masks：低分辨率 logits 上采样到原图尺寸"""
+    predictor = SAM2ImagePredictor(model)
+    low_res = torch.randn(1, 3, 256, 256)
+    for (h, w) in args.image_sizes:
+        params = {"masks": 3, "orig_hw": f"{h}x{w}"}
+        stats = measure(lambda: predictor._transforms.postprocess_masks(low_res, (h, w)), args.repeat)
+        log("postprocess", params, stats)
+        results.append({"bench": "postprocess", "params": params, **stats})
+
+
+def bench_rle(args, results):
+    """RLE 编码 (mask_to_rle_pytorch) / 解码 (rle_to_mask)"""
+    gen = torch.Generator().manual_seed(0)
+    for (h, w) in args.image_sizes:
+        # 块状前景，更接近真实 mask 的游程分布
+        small = torch.rand(8, h // 16 + 1, w // 16 + 1, generator=gen) > 0.6
+        masks = small.repeat_interleave(16, dim=1).repeat_interleave(16, dim=2)[:, :h, :w].contiguous()
+        rles = mask_to_rle_pytorch(masks)
+
+        params = {"masks": 8, "hw": f"{h}x{w}"}
+        stats = measure(lambda: mask_to_rle_pytorch(masks), args.repeat)
+        log("rle_encode", params, stats)
+        results.append({"bench": "rle_encode", "params": params, **stats})
+
+        stats = measure(lambda: [rle_to_mask(r) for r in rles], args.repeat)
+        log("rle_decode", params, stats)
+        results.append({"bench": "rle_decode", "params": params, **stats})
+
+
+def bench_mask_generator(args, results, model):
+    """
+    fake_mask_generator 端到端（读图 + set_image + predict + RGBA/QPixmap），
+    以及单独的 RGBA/QPixmap 转换
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtGui import QGuiApplication, QImage, QPixmap
+    from PIL import Image
+    import sam2_mask_generator
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+
+    # 直接注入预测器，避免 _init_sam2_model 去加载固定路径的大模型
+    sam2_mask_generator._sam2_predictor = SAM2ImagePredictor(model)
+    sam2_mask_generator._sam2_inited = True
+
+    class _Item:
+        def __init__(self, image_path, marks):
+            self.image_path = image_path
+            self.sam2_marks = marks
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for (h, w) in args.image_sizes:
+            # RGBA + QPixmap 转换
+            mask = rng.random((h, w)) > 0.5
+
+            def to_pixmap():
+                rgba = sam2_mask_generator._build_rgba_mask(mask)
+                qimg = QImage(rgba.data, w, h, QImage.Format_RGBA8888)
+                return QPixmap.fromImage(qimg)
+
+            params = {"hw": f"{h}x{w}"}
+            stats = measure(to_pixmap, args.repeat)
+            log("rgba_qpixmap", params, stats)
+            results.append({"bench": "rgba_qpixmap", "params": params, **stats})
+
+            # 端到端
+            path = os.path.join(tmp_dir, f"img_{h}x{w}.jpg")
+            Image.fromarray(rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)).save(path)
+            item = _Item(path, [(0.4, 0.5, "pos"), (0.6, 0.5, "pos"), (0.1, 0.1, "neg")])
+            params = {"hw": f"{h}x{w}", "points": 3}
+            stats = measure(lambda: sam2_mask_generator.fake_mask_generator(item), args.encoder_repeat)
+            log("mask_generator", params, stats)
+            results.append({"bench": "mask_generator", "params": params, **stats})
+
+            # 预览刷新：mask 直接按显示尺寸(这里取原图的 1/3)生成
+            display_size = (w // 3, h // 3)
+            params = {"hw": f"{h}x{w}", "points": 3, "output": f"{display_size[1]}x{display_size[0]}"}
+            stats = measure(lambda: sam2_mask_generator.fake_mask_generator(item, output_size=display_size),
+                            args.encoder_repeat)
+            log("mask_generator", params, stats)
+            results.append({"bench": "mask_generator", "params": params, **stats})
+    del app
+
+
+# =============================
+#  主程序
+# =============================
+def parse_hw_list(text):
+    sizes = []
+    for part in text.split(","):
+        h, _, w = part.lower().partition("x")
+        sizes.append((int(h), int(w)))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAM2 交互路径 CPU 基准测试（合成输入，输出 JSON）")
+    parser.add_argument("--out", default="bench_sam2.json", help="结果 JSON 路径")
+    parser.add_argument("--only", default=",".join(ALL_BENCHES), help="要运行的测试，逗号分隔")
+    parser.add_argument("--sizes", default="t", help="编码器测试的模型大小：t,s,b+,l")
+    parser.add_argument("--model", default="t", help="其它测试使用的模型大小")
+    parser.add_argument("--counts", default="1,4,16,64", help="predict 测试的点数 / 框数")
+    parser.add_argument("--image-sizes", default="480x640,1080x1920,3000x4000", help="HxW 列表")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--encoder-repeat", type=int, default=3)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--threads", type=int, default=0, help="torch CPU 线程数 (0 = 默认)")
+    args = parser.parse_args()
+
+    args.sizes = [s for s in args.sizes.split(",") if s]
+    args.counts = [int(n) for n in args.counts.split(",")]
+    args.image_sizes = parse_hw_list(args.image_sizes)
+    selected = [b for b in args.only.split(",") if b]
+    unknown = set(selected) - set(ALL_BENCHES)
+    if unknown:
+        parser.error(f"未知的测试: {', '.join(sorted(unknown))}")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    results = []
+    model = None
+    with torch.inference_mode():
+        if "encoder" in selected:
+            bench_encoder(args, results)
+        if {"predict", "postprocess", "mask_generator"} & set(selected):
+            model = build_model(args.model, args.device)
+        if "predict" in selected:
+            bench_predict(args, results, model)
+        if "postprocess" in selected:
+            bench_postprocess(args, results, model)
+        if "rle" in selected:
+            bench_rle(args, results)
+        if "mask_generator" in selected:
+            bench_mask_generator(args, results, model)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "torch": torch.__version__,
+            "device": args.device,
+            "threads": torch.get_num_threads(),
+            "model": args.model,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.out}")
+
+
+if __name__ == "__main__":
+    main()
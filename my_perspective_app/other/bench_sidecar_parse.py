@@ -0,0 +1,89 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# 让脚本可以直接 `python other/bench_sidecar_parse.py` 运行
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.sidecar_format import read_sidecar, format_sidecar
+
+
+def make_sidecar_files(folder, count):
+    """在 folder 中生成 count 个带 <coor> + <mark> 块的 _verified.txt"""
+    rnd = random.Random(0)
+    paths = []
+    for i in range(count):
+        coords = [(rnd.random(), rnd.random()) for _ in range(4)]
+        marks = [(rnd.random(), rnd.random(), rnd.choice(["pos", "neg", "0_0", "0_1"]))
+                 for _ in range(rnd.randint(0, 8))]
+        path = os.path.join(folder, f"img{i:06d}_verified.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(format_sidecar("", coords, marks))
+        paths.append(path)
+    return paths
+
+
+def parse_regex_baseline(txt_path):
+    """
+    旧实现：整文件读入 => 每次现编译 <coor> 正则 => 没有有效 <coor> 时才再读一遍文件(回退逻辑)
+    => 再编译 <mark> 正则。这里保留其 I/O 与正则开销作对比。
+    """
+    with open(txt_path, "r", encoding="utf-8") as f:
+        full_text = f.read()
+    coor_match = re.compile(r"<coor>\s*(.*?)\s*</coor>", re.DOTALL | re.IGNORECASE).search(full_text)
+    coords = []
+    if coor_match:
+        for line in coor_match.group(1).strip().splitlines():
+            x_str, y_str = line.strip("() ").split(",", 1)
+            coords.append((float(x_str), float(y_str)))
+    if len(coords) != 4:
+        with open(txt_path, "r", encoding="utf-8") as f:
+            f.read()
+    marks = []
+    mark_match = re.compile(r"<mark>\s*(.*?)\s*<\\mark>", re.DOTALL).search(full_text)
+    if mark_match:
+        for line in mark_match.group(1).strip().splitlines():
+            line = line.strip()
+            if not line.startswith("("):
+                continue
+            coords_part, label_str = line.rsplit(")", 1)
+            x_str, y_str = coords_part.strip("(").split(",", 1)
+            marks.append((float(x_str), float(y_str), label_str.strip().strip(",")))
+    return coords, marks
+
+
+def run(paths, parse_fn, name):
+    start = time.perf_counter()
+    for p in paths:
+        parse_fn(p)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>16}: {elapsed:8.3f} s  ({len(paths) / elapsed:10.0f} files/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sidecar 解析性能测试")
+    parser.add_argument("--count", type=int, default=100_000, help="生成的 sidecar 文件数量")
+    parser.add_argument("--folder", default="", help="已有的 sidecar 目录(为空则临时生成)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.folder:
+            paths = [os.path.join(args.folder, f) for f in sorted(os.listdir(args.folder))
+                     if f.endswith(".txt")]
+        else:
+            print(f"生成 {args.count} 个 sidecar 文件 ...")
+            paths = make_sidecar_files(tmp_dir, args.count)
+
+        print(f"解析 {len(paths)} 个文件：")
+        old = run(paths, parse_regex_baseline, "regex baseline")
+        new = run(paths, read_sidecar, "single-pass")
+        print(f"加速比: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+对比 SAM2Transforms 的两种预处理（默认的 torchvision float 缩放 vs. fast_uint8_preprocess），
+在真实图片上检查两者的差异是否在容差内。不满足容差时以非 0 退出码结束。
+
+  python other/check_sam2_transforms.py photo1.jpg photo2.png
+  python other/check_sam2_transforms.py photo.jpg --checkpoint sam2/checkpoints/sam2.1_hiera_tiny.pt --model t
+
+容差（按 0~255 灰度级计，逐像素、逐通道）：
+  - 最大差 <= 1.5 级（PIL 与 torchvision 的双线性滤波略有不同，加上 uint8 取整）
+  - 平均差 <= 0.5 级
+给出 --checkpoint 时，再比较中心点击得到的 mask：IoU >= 0.98。
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+from PIL import Image
+
+# 让脚本可以直接 `python other/check_sam2_transforms.py` 运行
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, APP_DIR)
+
+import torch
+
+from sam2.utils.transforms import SAM2Transforms
+
+CONFIGS = {
+    "t": "sam2/configs/sam2.1/sam2.1_hiera_t.yaml",
+    "s": "sam2/configs/sam2.1/sam2.1_hiera_s.yaml",
+    "b+": "sam2/configs/sam2.1/sam2.1_hiera_b+.yaml",
+    "l": "sam2/configs/sam2.1/sam2.1_hiera_l.yaml",
+}
+
+MAX_DIFF_LEVELS = 1.5
+MEAN_DIFF_LEVELS = 0.5
+MIN_MASK_IOU = 0.98
+
+
+def compare_inputs(img, resolution):
+    """
+    返回两种预处理结果的 (最大差, 平均差)，单位为 0~255 灰度级
+    """
+    default = SAM2Transforms(resolution, 0.0)(img)
+    fast = SAM2Transforms(resolution, 0.0, fast_uint8_preprocess=True)(img)
+    std_255 = torch.tensor(SAM2Transforms(resolution, 0.0).std).view(3, 1, 1) * 255.0
+    diff = (default - fast).abs() * std_255
+    return diff.max().item(), diff.mean().item()
+
+
+def compare_masks(model, img):
+    """
+    在图片中心点击一次，返回两种预处理下 mask 的 IoU
+    """
+    from sam2.sam2_image_predictor import SAM2ImagePredictor
+
+    h, w = img.shape[:2]
+    point = np.array([[w / 2, h / 2]], dtype=np.float32)
+    masks = []
+    for fast in (False, True):
+        predictor = SAM2ImagePredictor(model, fast_uint8_preprocess=fast)
+        predictor.set_image(img)
+        mask, _, _ = predictor.predict(point_coords=point, point_labels=np.ones(1),
+                                       multimask_output=False)
+        masks.append(mask[0] > 0)
+    union = np.logical_or(*masks).sum()
+    return 1.0 if union == 0 else np.logical_and(*masks).sum() / union
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比 SAM2Transforms 默认预处理与 fast_uint8_preprocess")
+    parser.add_argument("images", nargs="+", help="真实图片路径")
+    parser.add_argument("--resolution", type=int, default=1024)
+    parser.add_argument("--checkpoint", default="", help="给出时额外比较 mask")
+    parser.add_argument("--model", default="l", help="checkpoint 对应的模型大小：t,s,b+,l")
+    args = parser.parse_args()
+
+    model = None
+    if args.checkpoint:
+        from sam2.build_sam import build_sam2
+        model = build_sam2(CONFIGS[args.model], args.checkpoint, device="cpu")
+
+    failed = False
+    for path in args.images:
+        img = np.array(Image.open(path).convert("RGB"))
+        max_diff, mean_diff = compare_inputs(img, args.resolution)
+        ok = max_diff <= MAX_DIFF_LEVELS and mean_diff <= MEAN_DIFF_LEVELS
+        line = f"{path}: 最大差 {max_diff:.3f} 级, 平均差 {mean_diff:.3f} 级"
+        if model is not None:
+            iou = compare_masks(model, img)
+            ok = ok and iou >= MIN_MASK_IOU
+            line += f", mask IoU {iou:.4f}"
+        print(("OK    " if ok else "FAIL  ") + line)
+        failed = failed or not ok
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import argparse
+
+# 让脚本可以直接 `python other/export_rectified.py` 运行
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.perspective_export import ExportOptions, OUTPUT_FORMATS, jobs_from_folder, run_export
+
+
+def parse_size(text):
+    """'1200x1600' => (1200, 1600)；'auto' / '' => None"""
+    if not text or text == "auto":
+        return None
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按 _verified.txt 中的 <coor> 批量导出透视矫正图片")
+    parser.add_argument("folder", help="包含图片与 _verified.txt 的文件夹")
+    parser.add_argument("out", help="输出文件夹")
+    parser.add_argument("--format", default="png", choices=list(OUTPUT_FORMATS), help="输出格式")
+    parser.add_argument("--size", default="auto", help="输出尺寸 WxH，默认按角点自动计算")
+    parser.add_argument("--max-side", type=int, default=0, help="自动尺寸时长边上限 (0 = 不限制)")
+    parser.add_argument("--tile", type=int, default=0, help="分块矫正的块大小 (0 = 不分块)")
+    parser.add_argument("--quality", type=int, default=95, help="jpg / webp 质量")
+    parser.add_argument("--resample", default="bicubic", choices=["nearest", "bilinear", "bicubic"])
+    parser.add_argument("--workers", type=int, default=0, help="进程数 (0 = 自动)")
+    args = parser.parse_args()
+
+    options = ExportOptions(fmt=args.format, size=parse_size(args.size), max_side=args.max_side,
+                            tile_size=args.tile, quality=args.quality, resample=args.resample)
+    os.makedirs(args.out, exist_ok=True)
+    jobs, skipped = jobs_from_folder(args.folder, args.out, options)
+    for path in skipped:
+        print(f"[WARNING] 跳过(无图片或无 <coor>): {path}")
+
+    last_done = [-1]
+
+    def on_progress(done, total):
+        if done != last_done[0]:
+            last_done[0] = done
+            print(f"\r{done}/{total}", end="", flush=True)
+
+    stats = run_export(jobs, args.workers or None, progress_callback=on_progress)
+    print()
+    for path, err in stats["errors"]:
+        print(f"[ERROR] {path}: {err}")
+    print(f"导出 {stats['done']} 张，失败 {stats['failed']} 张，"
+          f"耗时 {stats['elapsed']:.2f} s，{stats['images_per_sec']:.2f} 张/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+import argparse
+
+# 让脚本可以直接 `python other/export_sam2.py` 运行
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sam2.build_sam import build_sam2
+from sam2.sam2_export import EXPORT_FORMATS, export_sam2_image_model
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="把 SAM2 的图像编码器、prompt encoder + mask decoder 导出成两张独立的图，"
+                    "供 SAM2ExportedPredictor (SAM2_EXPORTED_DIR) 在 CPU 上推理")
+    parser.add_argument("out", help="输出文件夹")
+    parser.add_argument("--config", default="sam2/checkpoints/sam2.1_hiera_large.yaml", help="模型配置 yaml")
+    parser.add_argument("--checkpoint", default="sam2/checkpoints/sam2.1_hiera_large.pt", help="模型权重")
+    parser.add_argument("--format", default="torchscript", choices=list(EXPORT_FORMATS),
+                        help="导出格式 (onnx 需要安装 onnx，推理需要 onnxruntime)")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset 版本")
+    args = parser.parse_args()
+
+    # 导出固定在 CPU 上进行，导出的图也只在 CPU 上推理
+    model = build_sam2(args.config, args.checkpoint, device="cpu")
+    start = time.perf_counter()
+    export_sam2_image_model(model, args.out, export_format=args.format, opset_version=args.opset)
+    print(f"已导出到 {args.out}，耗时 {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
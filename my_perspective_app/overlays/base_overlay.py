@@ -0,0 +1,34 @@
+# my_perspective_app/overlays/base_overlay.py
+
+from PySide6.QtCore import QRect, QRectF
+from PySide6.QtGui import QPainter
+
+
+def draw_scaled_pixmap(painter: QPainter, pixmap, scaled_w: int, scaled_h: int, rect: QRect):
+    """
+    把 pixmap 拉伸到 (0, 0, scaled_w, scaled_h) 绘制，但只画与 rect(脏区域)相交的部分。
+    不再先 scaled() 出整张缩放图：放大几十倍时 label 可能有上万像素宽，
+    这里只对裁剪区域内的像素做插值。
+    """
+    target = rect.intersected(QRect(0, 0, scaled_w, scaled_h))
+    if target.isEmpty() or pixmap is None or pixmap.isNull():
+        return
+    painter.save()
+    painter.setClipRect(target)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+    painter.drawPixmap(QRectF(0, 0, scaled_w, scaled_h), pixmap, QRectF(pixmap.rect()))
+    painter.restore()
+
+
+def markers_rect(points, margin: int) -> QRect:
+    """
+    points: [(x_px, y_px), ...] => 包住所有点、四周再留 margin 像素的 QRect；
+    没有点时返回空 QRect。用于拖动时只重绘变化的区域。
+    """
+    if not points:
+        return QRect()
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    left, top = int(min(xs)) - margin, int(min(ys)) - margin
+    right, bottom = int(max(xs)) + margin + 1, int(max(ys)) + margin + 1
+    return QRect(left, top, right - left, bottom - top)
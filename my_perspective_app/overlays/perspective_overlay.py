@@ -1,10 +1,11 @@
 # my_perspective_app/views/overlays/perspective_overlay.py
 
-from PySide6.QtCore import QObject, Signal, QPointF, Qt
-from PySide6.QtGui import QPainter, QPen, QColor
+from PySide6.QtCore import QObject, Signal, QPointF, Qt, QRect
+from PySide6.QtGui import QPainter, QPen, QColor, QRegion
 from PySide6.QtWidgets import QMenu
 
 from controllers.shape_transform_controller import ShapeTransformController
+from overlays.base_overlay import markers_rect
 
 class PerspectiveOverlay(QObject):
     """
@@ -15,6 +16,8 @@ class PerspectiveOverlay(QObject):
 
     # 与 PreviewWidget 沟通的通用信号：overlay_params_changed_signal(overlay_type, data)
     overlay_params_changed_signal = Signal(str, object)
+    # 拖动过程中角点/中点发生变化（尚未松开鼠标），用于实时预览
+    corners_moved_signal = Signal()
 
     def __init__(self, image_item):
         super().__init__()
@@ -30,9 +33,10 @@ class PerspectiveOverlay(QObject):
         self.image_item = image_item
         self.shape_controller.set_image_item(image_item)
 
-    def paint_overlay(self, painter: QPainter, scaled_w: int, scaled_h: int):
+    def paint_overlay(self, painter: QPainter, scaled_w: int, scaled_h: int, rect: QRect = None):
         """
         在 PreviewLabel.paintEvent 的末尾被调用，用于画 corners/midpoints/连线。
+        rect: 本次重绘的脏区域；图元很少，全部绘制，由 painter 裁剪到脏区域。
         """
         if not self.image_item:
             return
@@ -104,12 +108,58 @@ class PerspectiveOverlay(QObject):
                             # 调用对应回调
                             action_item[1]()
                             label_widget.update()
+                            self.corners_moved_signal.emit()
                             return
 
     def mouse_move_event(self, label_widget, event):
         if event.buttons() & Qt.LeftButton:
+            # 链式移动可能带动其它角点/中点 => 只重绘移动前后发生变化的图元(按绘制尺寸计算)
+            paint_w, paint_h = label_widget.scaled_size()
+            old_items = self._shape_items(paint_w, paint_h)
             self.shape_controller.on_mouse_move(event.pos(), label_widget.width(), label_widget.height())
-            label_widget.update()
+            new_items = self._shape_items(paint_w, paint_h)
+            if len(old_items) != len(new_items):
+                label_widget.update()
+            else:
+                dirty = QRegion()
+                for old, new in zip(old_items, new_items):
+                    if old != new:
+                        dirty = dirty.united(self._item_region(old)).united(self._item_region(new))
+                if not dirty.isEmpty():
+                    label_widget.update(dirty)
+            self.corners_moved_signal.emit()
+
+    def _shape_items(self, w, h):
+        """
+        画面上的各个图元，每个是一组点坐标：每条边 (两端点)、每个中点、每个角点。
+        拖动时比较移动前后的图元，变化的图元在移动前后的外接矩形才需要重绘，
+        边距(32)覆盖十字(半长 6)、中点圆(半径 5)、线宽，以及角点右上方的 label 文字。
+        """
+        if not self.image_item:
+            return []
+        info = self.shape_controller.get_drawing_info(w, h)
+        items = [((x1, y1), (x2, y2)) for (x1, y1, x2, y2) in info["edges"]]
+        items += [((m.x_rel * w, m.y_rel * h),) for m in info["midpoints"]]
+        items += [((c.x_rel * w, c.y_rel * h),) for c in info["corners"]]
+        return items
+
+    @staticmethod
+    def _item_region(points, margin=32, step=48):
+        """
+        图元占据的区域。边(两个端点)按 step 像素分段，每段取外接矩形再合并，
+        斜边只覆盖线附近的窄带，而不是整条边的外接矩形。
+        """
+        if len(points) != 2:
+            return QRegion(markers_rect(points, margin))
+        (x1, y1), (x2, y2) = points
+        n = max(1, int(max(abs(x2 - x1), abs(y2 - y1)) // step) + 1)
+        region = QRegion()
+        for i in range(n):
+            t0, t1 = i / n, (i + 1) / n
+            segment = [(x1 + (x2 - x1) * t0, y1 + (y2 - y1) * t0),
+                       (x1 + (x2 - x1) * t1, y1 + (y2 - y1) * t1)]
+            region = region.united(markers_rect(segment, margin))
+        return region
 
     def mouse_release_event(self, label_widget, event):
         if event.button() == Qt.LeftButton:
@@ -1,9 +1,10 @@
 # my_perspective_app\overlays\sam2_overlay.py
-from PySide6.QtCore import QObject, Signal, Qt, QPoint
+from PySide6.QtCore import QObject, Signal, Qt, QPoint, QRect
 from PySide6.QtGui import QPainter, QPen, QColor
 from PySide6.QtWidgets import QMenu
 
 from controllers.sam2_controller import Sam2Controller
+from overlays.base_overlay import draw_scaled_pixmap, markers_rect
 
 class Sam2Overlay(QObject):
     """
@@ -29,19 +30,19 @@ class Sam2Overlay(QObject):
     # -------------------------------------------------
     #  核心绘制
     # -------------------------------------------------
-    def paint_overlay(self, painter: QPainter, scaled_w: int, scaled_h: int):
+    def paint_overlay(self, painter: QPainter, scaled_w: int, scaled_h: int, rect: QRect = None):
+        """
+        rect: 本次重绘的脏区域(None => 整个图像)。mask 只画脏区域内的部分；
+        点/框数量很少，全部绘制，由 painter 裁剪。
+        """
         if not self.image_item:
             return
+        if rect is None:
+            rect = QRect(0, 0, scaled_w, scaled_h)
         # （0） 若当前 image_item.mask_visible 且有 mask_pixmap，先绘制
         if self.image_item.mask_visible and self.image_item.mask_pixmap:
-            # 将mask图缩放到 scaled_w, scaled_h
-            scaled_mask = self.image_item.mask_pixmap.scaled(
-                scaled_w, scaled_h,
-                Qt.KeepAspectRatio, 
-                Qt.SmoothTransformation
-            )
-            # 在 (0,0) 绘制
-            painter.drawPixmap(0, 0, scaled_mask)
+            # 将mask图拉伸到 scaled_w, scaled_h，在 (0,0) 绘制(只画脏区域)
+            draw_scaled_pixmap(painter, self.image_item.mask_pixmap, scaled_w, scaled_h, rect)
         
         # （1）先绘制“占位mask” （若需要）
         # 例如画一个半透明灰色覆盖
@@ -148,8 +149,31 @@ class Sam2Overlay(QObject):
         w, h = label_widget.width(), label_widget.height()
         x_rel = max(0, min(1, event.x() / w))
         y_rel = max(0, min(1, event.y() / h))
+        # 只重绘被拖动的点(或它所在的框)移动前后覆盖的区域(按绘制尺寸计算)
+        paint_w, paint_h = label_widget.scaled_size()
+        old_rect = self._dragged_marker_rect(paint_w, paint_h)
         self.sam2_ctrl.drag_move(x_rel, y_rel)
-        label_widget.update()
+        dirty_rect = old_rect.united(self._dragged_marker_rect(paint_w, paint_h))
+        if not dirty_rect.isEmpty():
+            label_widget.update(dirty_rect)
+
+    def _dragged_marker_rect(self, w, h):
+        """
+        正在拖动的点在画面上占据的矩形(含圆圈半径和线宽)；
+        若是框角，则是整个框(两条边都会跟着变)。没有在拖动时返回空 QRect。
+        """
+        i = self.sam2_ctrl.dragging_index
+        if i is None or not (0 <= i < len(self.sam2_ctrl.points)):
+            return QRect()
+        pt = self.sam2_ctrl.points[i]
+        if pt.label in ("pos", "neg"):
+            # 圆半径 15 + 线宽
+            return markers_rect([(pt.x_rel * w, pt.y_rel * h)], 15 + 2)
+        box_str = pt.label.split("_")[0]
+        corners = [(p.x_rel * w, p.y_rel * h) for p in self.sam2_ctrl.points
+                   if p.label.startswith(box_str + "_")]
+        # 角点圆半径 6 + 线宽
+        return markers_rect(corners, 6 + 2)
 
     def _on_right_click(self, label_widget, event):
         """
@@ -5,7 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 # Adapted from https://github.com/facebookresearch/segment-anything/blob/main/segment_anything/automatic_mask_generator.py
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import torch
@@ -194,7 +194,126 @@ class SAM2AutomaticMaskGenerator:
 
         # Generate masks
         mask_data = self._generate_masks(image)
+        return self._mask_data_to_anns(mask_data)
 
+    @torch.no_grad()
+    def generate_stream(
+        self, image: np.ndarray, output_mode: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Like `generate`, but yields the mask records one at a time.
+
+        Masks are kept as RLE internally and each record's segmentation is
+        only encoded (e.g. decoded to a binary mask) when that record is
+        yielded, so at most one full-resolution mask is materialized by the
+        generator at a time. Dense mask logits only ever exist for one
+        batch of `points_per_batch` points, which bounds peak memory during
+        prediction.
+
+        Arguments:
+          image (np.ndarray): The image to generate masks for, in HWC uint8 format.
+          output_mode (str or None): Overrides the generator's output_mode for
+            this call, e.g. 'uncompressed_rle' to receive RLEs and decode
+            them later with `rle_to_mask` only when needed.
+
+        Yields:
+          dict(str, any): A mask record in the same format as `generate`.
+        """
+        mask_data = self._generate_masks(image)
+        yield from self._iter_anns(mask_data, output_mode)
+
+    @torch.no_grad()
+    def generate_batch(
+        self, images: List[np.ndarray], crop_batch_size: int = 4
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Generates masks for several images, batching the image encoder.
+
+        The crops of all images are flattened into one list and embedded
+        `crop_batch_size` at a time with `set_image_batch`, so the encoder
+        runs at batch size > 1 even when crop_n_layers == 0. The point grid
+        of every crop is then streamed through the prompt encoder and mask
+        decoder in batches of `points_per_batch`, exactly as in `generate`.
+
+        Arguments:
+          images (list(np.ndarray)): The images to generate masks for, each
+            in HWC uint8 format. Images may have different sizes.
+          crop_batch_size (int): The number of crops embedded per encoder
+            call. Higher numbers use more memory for the cached features.
+
+        Returns:
+          list(list(dict(str, any))): For each input image, the list of mask
+            records in the same format as returned by `generate`.
+        """
+        assert crop_batch_size > 0, "crop_batch_size must be positive."
+
+        # (image index, crop box, layer index) for every crop of every image
+        crop_jobs = []
+        for img_idx, image in enumerate(images):
+            crop_boxes, layer_idxs = generate_crop_boxes(
+                image.shape[:2], self.crop_n_layers, self.crop_overlap_ratio
+            )
+            for crop_box, layer_idx in zip(crop_boxes, layer_idxs):
+                crop_jobs.append((img_idx, crop_box, layer_idx))
+
+        per_image_data = [MaskData() for _ in images]
+        per_image_n_crops = [0 for _ in images]
+        for start in range(0, len(crop_jobs), crop_batch_size):
+            chunk = crop_jobs[start : start + crop_batch_size]
+            cropped_ims = []
+            for img_idx, (x0, y0, x1, y1), _ in chunk:
+                cropped_ims.append(images[img_idx][y0:y1, x0:x1, :])
+            self.predictor.set_image_batch(cropped_ims)
+
+            for batch_idx, (img_idx, crop_box, layer_idx) in enumerate(chunk):
+                crop_data = self._process_crop_points(
+                    cropped_ims[batch_idx].shape[:2],
+                    crop_box,
+                    layer_idx,
+                    images[img_idx].shape[:2],
+                    img_idx=batch_idx,
+                )
+                per_image_data[img_idx].cat(crop_data)
+                per_image_n_crops[img_idx] += 1
+            self.predictor.reset_predictor()
+
+        results = []
+        for data, n_crops in zip(per_image_data, per_image_n_crops):
+            data = self._remove_crop_duplicates(data, n_crops)
+            results.append(self._mask_data_to_anns(data))
+        return results
+
+    def _iter_anns(
+        self, mask_data: MaskData, output_mode: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields mask records, encoding each RLE only when its record is requested.
+        """
+        output_mode = output_mode or self.output_mode
+        assert output_mode in [
+            "binary_mask",
+            "uncompressed_rle",
+            "coco_rle",
+        ], f"Unknown output_mode {output_mode}."
+        for idx in range(len(mask_data["rles"])):
+            rle = mask_data["rles"][idx]
+            if output_mode == "coco_rle":
+                segmentation = coco_encode_rle(rle)
+            elif output_mode == "binary_mask":
+                segmentation = rle_to_mask(rle)
+            else:
+                segmentation = rle
+            yield {
+                "segmentation": segmentation,
+                "area": area_from_rle(rle),
+                "bbox": box_xyxy_to_xywh(mask_data["boxes"][idx]).tolist(),
+                "predicted_iou": mask_data["iou_preds"][idx].item(),
+                "point_coords": [mask_data["points"][idx].tolist()],
+                "stability_score": mask_data["stability_score"][idx].item(),
+                "crop_box": box_xyxy_to_xywh(mask_data["crop_boxes"][idx]).tolist(),
+            }
+
+    def _mask_data_to_anns(self, mask_data: MaskData) -> List[Dict[str, Any]]:
         # Encode masks
         if self.output_mode == "coco_rle":
             mask_data["segmentations"] = [
@@ -233,8 +352,11 @@ class SAM2AutomaticMaskGenerator:
             crop_data = self._process_crop(image, crop_box, layer_idx, orig_size)
             data.cat(crop_data)
 
+        return self._remove_crop_duplicates(data, len(crop_boxes))
+
+    def _remove_crop_duplicates(self, data: MaskData, n_crops: int) -> MaskData:
         # Remove duplicate masks between crops
-        if len(crop_boxes) > 1:
+        if n_crops > 1:
             # Prefer masks from smaller crops
             scores = 1 / box_area(data["crop_boxes"])
             scores = scores.to(data["boxes"].device)
@@ -260,7 +382,25 @@ class SAM2AutomaticMaskGenerator:
         cropped_im = image[y0:y1, x0:x1, :]
         cropped_im_size = cropped_im.shape[:2]
         self.predictor.set_image(cropped_im)
+        data = self._process_crop_points(
+            cropped_im_size, crop_box, crop_layer_idx, orig_size
+        )
+        self.predictor.reset_predictor()
+        return data
 
+    def _process_crop_points(
+        self,
+        cropped_im_size: Tuple[int, ...],
+        crop_box: List[int],
+        crop_layer_idx: int,
+        orig_size: Tuple[int, ...],
+        img_idx: int = -1,
+    ) -> MaskData:
+        """
+        Runs the point grid of one crop through the decoder, using the
+        features already set in the predictor (`img_idx` selects the crop
+        when the predictor holds a batch).
+        """
         # Get points for this crop
         points_scale = np.array(cropped_im_size)[None, ::-1]
         points_for_image = self.point_grids[crop_layer_idx] * points_scale
@@ -269,11 +409,15 @@ class SAM2AutomaticMaskGenerator:
         data = MaskData()
         for (points,) in batch_iterator(self.points_per_batch, points_for_image):
             batch_data = self._process_batch(
-                points, cropped_im_size, crop_box, orig_size, normalize=True
+                points,
+                cropped_im_size,
+                crop_box,
+                orig_size,
+                normalize=True,
+                img_idx=img_idx,
             )
             data.cat(batch_data)
             del batch_data
-        self.predictor.reset_predictor()
 
         # Remove duplicates within this crop.
         keep_by_nms = batched_nms(
@@ -298,6 +442,7 @@ class SAM2AutomaticMaskGenerator:
         crop_box: List[int],
         orig_size: Tuple[int, ...],
         normalize=False,
+        img_idx: int = -1,
     ) -> MaskData:
         orig_h, orig_w = orig_size
 
@@ -316,6 +461,7 @@ class SAM2AutomaticMaskGenerator:
             in_labels[:, None],
             multimask_output=self.multimask_output,
             return_logits=True,
+            img_idx=img_idx,
         )
 
         # Serialize predictions and store in MaskData
@@ -349,7 +495,11 @@ class SAM2AutomaticMaskGenerator:
                 in_points.shape[0], dtype=torch.int, device=in_points.device
             )
             masks, ious = self.refine_with_m2m(
-                in_points, labels, data["low_res_masks"], self.points_per_batch
+                in_points,
+                labels,
+                data["low_res_masks"],
+                self.points_per_batch,
+                img_idx=img_idx,
             )
             data["masks"] = masks.squeeze(1)
             data["iou_preds"] = ious.squeeze(1)
@@ -380,6 +530,9 @@ class SAM2AutomaticMaskGenerator:
         data["masks"] = uncrop_masks(data["masks"], crop_box, orig_h, orig_w)
         data["rles"] = mask_to_rle_pytorch(data["masks"])
         del data["masks"]
+        # Low-res logits are only needed for the m2m refinement above; dropping
+        # them keeps the accumulated MaskData down to RLEs and small tensors.
+        del data["low_res_masks"]
 
         return data
 
@@ -434,7 +587,9 @@ class SAM2AutomaticMaskGenerator:
 
         return mask_data
 
-    def refine_with_m2m(self, points, point_labels, low_res_masks, points_per_batch):
+    def refine_with_m2m(
+        self, points, point_labels, low_res_masks, points_per_batch, img_idx=-1
+    ):
         new_masks = []
         new_iou_preds = []
 
@@ -447,6 +602,7 @@ class SAM2AutomaticMaskGenerator:
                 mask_input=low_res_mask[:, None, :],
                 multimask_output=False,
                 return_logits=True,
+                img_idx=img_idx,
             )
             new_masks.append(best_masks)
             new_iou_preds.append(best_iou_preds)
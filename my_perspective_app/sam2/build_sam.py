@@ -6,6 +6,7 @@
 
 import logging
 import os
+import time
 
 import torch
 from hydra import compose
@@ -68,30 +69,77 @@ HF_MODEL_ID_TO_FILENAMES = {
 }
 
 
+# resolved model configs, keyed by (path, mtime, size) of the yaml file
+_resolved_config_cache = {}
+
+
+def _load_resolved_config(config_file):
+    """Load and resolve a model config yaml, reusing the result while the file is unchanged."""
+    stat = os.stat(config_file)
+    key = (os.path.abspath(config_file), stat.st_mtime_ns, stat.st_size)
+    if key not in _resolved_config_cache:
+        raw_cfg = OmegaConf.load(config_file)
+        OmegaConf.resolve(raw_cfg)
+        _resolved_config_cache[key] = raw_cfg.model if "model" in raw_cfg else raw_cfg
+    # hydra's instantiate works on a deep copy, so the cached node stays untouched
+    return _resolved_config_cache[key]
+
+
 def build_sam2(
     config_file,
     ckpt_path=None,
     device="cuda",
     mode="eval",
+    fast_load=False,
+    timings=None,
     **kwargs,
 ):
-    import os, logging
-    from omegaconf import OmegaConf
-    from hydra.utils import instantiate
+    """
+    Build a SAM 2 model from a config yaml file and an optional checkpoint.
 
+    With `fast_load=True` (requires `ckpt_path`), the model is instantiated on the
+    meta device, so no memory is allocated or randomly initialized for weights that
+    the checkpoint overwrites anyway, and the checkpoint is memory-mapped
+    (`torch.load(mmap=True)`, or safetensors for `.safetensors` files) and assigned
+    to the model as-is instead of being read fully and then copied.
+
+    If `timings` is a dict, it is filled with the duration in seconds of each phase
+    ("config", "instantiate", "load_checkpoint", "to_device"), which are also logged.
+    """
     # 直接 load
     if not os.path.isfile(config_file):
         raise FileNotFoundError(f"config_file {config_file} not found")
+    if fast_load and ckpt_path is None:
+        raise ValueError("fast_load requires a checkpoint")
+    timings = {} if timings is None else timings
 
-    raw_cfg = OmegaConf.load(config_file)
-    OmegaConf.resolve(raw_cfg)
-    model_conf = raw_cfg.model if "model" in raw_cfg else raw_cfg
-    model = instantiate(model_conf, _recursive_=True)
-    _load_checkpoint(model, ckpt_path)
+    start = time.perf_counter()
+    model_conf = _load_resolved_config(config_file)
+    timings["config"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if fast_load:
+        with torch.device("meta"):
+            model = instantiate(model_conf, _recursive_=True)
+    else:
+        model = instantiate(model_conf, _recursive_=True)
+    timings["instantiate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _load_checkpoint(model, ckpt_path, mmap=fast_load)
+    if fast_load:
+        _check_no_meta_tensors(model)
+    timings["load_checkpoint"] = time.perf_counter() - start
 
+    start = time.perf_counter()
     model = model.to(device)
     if mode=="eval":
         model.eval()
+    timings["to_device"] = time.perf_counter() - start
+    logging.info(
+        "Built SAM 2 model: "
+        + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in timings.items())
+    )
     return model
 
 
@@ -159,10 +207,29 @@ def build_sam2_video_predictor_hf(model_id, **kwargs):
     )
 
 
-def _load_checkpoint(model, ckpt_path):
+def _read_state_dict(ckpt_path, mmap=False):
+    if ckpt_path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+
+        # safetensors files are always memory-mapped
+        return load_file(ckpt_path, device="cpu")
+    if mmap:
+        try:
+            return torch.load(
+                ckpt_path, map_location="cpu", weights_only=True, mmap=True
+            )["model"]
+        except RuntimeError:
+            # e.g. checkpoints saved in the legacy (non-zip) format
+            logging.warning(f"Cannot memory-map {ckpt_path}, loading it fully")
+    return torch.load(ckpt_path, map_location="cpu", weights_only=True)["model"]
+
+
+def _load_checkpoint(model, ckpt_path, mmap=False):
     if ckpt_path is not None:
-        sd = torch.load(ckpt_path, map_location="cpu", weights_only=True)["model"]
-        missing_keys, unexpected_keys = model.load_state_dict(sd)
+        sd = _read_state_dict(ckpt_path, mmap=mmap)
+        # with mmap, assign the (memory-mapped) checkpoint tensors to the model
+        # instead of copying them into its parameters
+        missing_keys, unexpected_keys = model.load_state_dict(sd, assign=mmap)
         if missing_keys:
             logging.error(missing_keys)
             raise RuntimeError()
@@ -170,3 +237,21 @@ def _load_checkpoint(model, ckpt_path):
             logging.error(unexpected_keys)
             raise RuntimeError()
         logging.info("Loaded checkpoint sucessfully")
+
+
+def _check_no_meta_tensors(model):
+    """Make sure no tensor of a model built on the meta device was left unloaded."""
+    leftovers = [
+        f"{module_name}.{name}" if module_name else name
+        for module_name, module in model.named_modules()
+        for name, value in vars(module).items()
+        if isinstance(value, torch.Tensor) and value.is_meta
+    ]
+    leftovers += [
+        name
+        for name, value in list(model.named_parameters())
+        + list(model.named_buffers())
+        if value.is_meta
+    ]
+    if leftovers:
+        raise RuntimeError(f"Tensors not loaded from the checkpoint: {leftovers}")
@@ -226,7 +226,7 @@ class Hiera(nn.Module):
         )
 
         dpr = [
-            x.item() for x in torch.linspace(0, drop_path_rate, depth)
+            x.item() for x in torch.linspace(0, drop_path_rate, depth, device="cpu")
         ]  # stochastic depth decay rule
 
         cur_stage = 1
@@ -176,6 +176,6 @@ class MemoryEncoder(nn.Module):
         x = self.fuser(x)
         x = self.out_proj(x)
 
-        pos = self.position_encoding(x).to(x.dtype)
+        pos = self.position_encoding(x, dtype=x.dtype)
 
         return {"vision_features": x, "vision_pos_enc": [pos]}
@@ -42,6 +42,7 @@ class PositionEmbeddingSine(nn.Module):
             scale = 2 * math.pi
         self.scale = scale
 
+        # (H, W, device, dtype) -> 1xCxHxW tensor; returned via expand, never copied
         self.cache = {}
         if warmup_cache and torch.cuda.is_available():
             # Warmup cache for cuda, to help with compilation
@@ -87,20 +88,32 @@ class PositionEmbeddingSine(nn.Module):
         return pos
 
     @torch.no_grad()
-    def _pe(self, B, device, *cache_key):
+    def _pe(self, B, device, *cache_key, dtype=torch.float32):
+        """
+        Returns the Bx(C)xHxW encoding as an expanded view of a cached
+        1x(C)xHxW tensor that already lives on `device` with `dtype`, so
+        repeated calls for the same shape allocate nothing. The result must
+        be treated as read-only.
+        """
         H, W = cache_key
-        if cache_key in self.cache:
-            return self.cache[cache_key].to(device)[None].repeat(B, 1, 1, 1)
-
+        device = torch.device(device)
+        full_key = (H, W, device, dtype)
+        pos = self.cache.get(full_key)
+        if pos is None:
+            pos = self._compute_pe(H, W, device).to(dtype)
+            self.cache[full_key] = pos
+        return pos.expand(B, -1, -1, -1)
+
+    def _compute_pe(self, H, W, device):
         y_embed = (
             torch.arange(1, H + 1, dtype=torch.float32, device=device)
             .view(1, -1, 1)
-            .repeat(B, 1, W)
+            .repeat(1, 1, W)
         )
         x_embed = (
             torch.arange(1, W + 1, dtype=torch.float32, device=device)
             .view(1, 1, -1)
-            .repeat(B, H, 1)
+            .repeat(1, H, 1)
         )
 
         if self.normalize:
@@ -119,15 +132,18 @@ class PositionEmbeddingSine(nn.Module):
         pos_y = torch.stack(
             (pos_y[:, :, :, 0::2].sin(), pos_y[:, :, :, 1::2].cos()), dim=4
         ).flatten(3)
-        pos = torch.cat((pos_y, pos_x), dim=3).permute(0, 3, 1, 2)
-        self.cache[cache_key] = pos[0]
-        return pos
+        return torch.cat((pos_y, pos_x), dim=3).permute(0, 3, 1, 2).contiguous()
 
     @torch.no_grad()
-    def forward(self, x: torch.Tensor):
+    def forward(self, x: torch.Tensor, dtype: Optional[torch.dtype] = None):
+        """
+        Returns the encoding for x's spatial shape, in float32 unless `dtype`
+        is given (callers that cast to x.dtype should pass it to avoid a
+        per-call conversion).
+        """
         B = x.shape[0]
         cache_key = (x.shape[-2], x.shape[-1])
-        return self._pe(B, x.device, *cache_key)
+        return self._pe(B, x.device, *cache_key, dtype=dtype or torch.float32)
 
 
 class PositionEmbeddingRandom(nn.Module):
@@ -206,7 +206,8 @@ class MaskDecoder(nn.Module):
         assert (
             image_pe.size(0) == 1
         ), "image_pe should have size 1 in batch dim (from `get_dense_pe()`)"
-        pos_src = torch.repeat_interleave(image_pe, tokens.shape[0], dim=0)
+        # image_pe is constant across prompts: broadcast instead of copying it
+        pos_src = image_pe.expand(tokens.shape[0], -1, -1, -1)
         b, c, h, w = src.shape
 
         # Run the transformer
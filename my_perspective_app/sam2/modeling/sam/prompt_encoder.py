@@ -65,16 +65,39 @@ class PromptEncoder(nn.Module):
         )
         self.no_mask_embed = nn.Embedding(1, embed_dim)
 
+        # get_dense_pe() result, recomputed only when the gaussian matrix
+        # moves to another device/dtype or a state dict is loaded
+        self._dense_pe = None
+        self._dense_pe_key = None
+
+    def _load_from_state_dict(self, *args, **kwargs):
+        # Loading weights may overwrite pe_layer's gaussian matrix in place
+        self._dense_pe = None
+        super()._load_from_state_dict(*args, **kwargs)
+
     def get_dense_pe(self) -> torch.Tensor:
         """
         Returns the positional encoding used to encode point prompts,
         applied to a dense set of points the shape of the image encoding.
+        The tensor is cached on the model's device and must be treated as
+        read-only.
 
         Returns:
           torch.Tensor: Positional encoding with shape
             1x(embed_dim)x(embedding_h)x(embedding_w)
         """
-        return self.pe_layer(self.image_embedding_size).unsqueeze(0)
+        matrix = self.pe_layer.positional_encoding_gaussian_matrix
+        key = (
+            matrix.device,
+            matrix.dtype,
+            matrix.data_ptr(),
+            tuple(self.image_embedding_size),
+        )
+        if self._dense_pe is None or self._dense_pe_key != key:
+            with torch.no_grad():
+                self._dense_pe = self.pe_layer(self.image_embedding_size).unsqueeze(0)
+            self._dense_pe_key = key
+        return self._dense_pe
 
     def _embed_points(
         self,
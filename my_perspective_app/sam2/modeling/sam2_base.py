@@ -568,8 +568,8 @@ class SAM2Base(torch.nn.Module):
                 t_pos_and_prevs.append((t_pos, out))
 
             for t_pos, prev in t_pos_and_prevs:
-                if prev is None:
-                    continue  # skip padding frames
+                if prev is None or prev["maskmem_features"] is None:
+                    continue  # skip padding frames (and frames with pruned memory)
                 # "maskmem_features" might have been offloaded to CPU in demo use cases,
                 # so we load it back to GPU (it's a no-op if it's already on GPU).
                 feats = prev["maskmem_features"].to(device, non_blocking=True)
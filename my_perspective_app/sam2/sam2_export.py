@@ -0,0 +1,226 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+
+# This source code is licensed under the license found in the
+# LICENSE file in the root directory of this source tree.
+
+import json
+import logging
+import os
+
+import torch
+import torch.nn as nn
+
+from sam2.modeling.sam2_base import SAM2Base
+
+EXPORT_META_FILE_NAME = "sam2_export.json"
+EXPORT_FORMATS = ("torchscript", "onnx")
+# file names of the two exported graphs, per format
+EXPORT_FILE_NAMES = {
+    "torchscript": ("image_encoder.pt", "mask_decoder.pt"),
+    "onnx": ("image_encoder.onnx", "mask_decoder.onnx"),
+}
+
+
+class SAM2ImageEncoderExport(nn.Module):
+    """
+    The image encoder part of `SAM2ImagePredictor.set_image` as a standalone graph.
+
+    Takes a normalized 1x3xSxS image (S = model.image_size) and returns the image
+    embedding and the two high resolution feature maps, in the layout that
+    `SAM2ImagePredictor._features` stores them.
+    """
+
+    def __init__(self, model: SAM2Base):
+        super().__init__()
+        self.model = model
+        self.bb_feat_sizes = [
+            (model.image_size // 4, model.image_size // 4),
+            (model.image_size // 8, model.image_size // 8),
+            (model.image_size // 16, model.image_size // 16),
+        ]
+
+    def forward(self, image: torch.Tensor):
+        backbone_out = self.model.forward_image(image)
+        _, vision_feats, _, _ = self.model._prepare_backbone_features(backbone_out)
+        if self.model.directly_add_no_mem_embed:
+            vision_feats[-1] = vision_feats[-1] + self.model.no_mem_embed
+        feats = [
+            feat.permute(1, 2, 0).reshape(1, -1, *feat_size)
+            for feat, feat_size in zip(vision_feats, self.bb_feat_sizes)
+        ]
+        return feats[2], feats[0], feats[1]
+
+
+class SAM2MaskDecoderExport(nn.Module):
+    """
+    The prompt encoder and mask decoder part of `SAM2ImagePredictor._predict` as a
+    standalone graph.
+
+    Boxes are passed as two points with labels 2 and 3 (as `_predict` does), and the
+    mask input is gated by `has_mask_input` so that one graph covers both cases. The
+    outputs hold all mask tokens: channel 0 is the single mask output (including the
+    fallback to the best multimask output on low stability scores), channels 1~3
+    are the multimask outputs.
+    """
+
+    def __init__(self, model: SAM2Base):
+        super().__init__()
+        self.prompt_encoder = model.sam_prompt_encoder
+        self.mask_decoder = model.sam_mask_decoder
+        # the dense positional encoding is constant for a given model
+        self.register_buffer(
+            "image_pe", self.prompt_encoder.get_dense_pe().clone(), persistent=False
+        )
+
+    def forward(
+        self,
+        image_embed: torch.Tensor,
+        high_res_feat_0: torch.Tensor,
+        high_res_feat_1: torch.Tensor,
+        point_coords: torch.Tensor,
+        point_labels: torch.Tensor,
+        mask_input: torch.Tensor,
+        has_mask_input: torch.Tensor,
+    ):
+        sparse_embeddings = self.prompt_encoder._embed_points(
+            point_coords, point_labels, pad=True
+        )
+        mask_embedding = self.prompt_encoder._embed_masks(mask_input)
+        no_mask_embedding = self.prompt_encoder.no_mask_embed.weight.reshape(
+            1, -1, 1, 1
+        )
+        dense_embeddings = (
+            has_mask_input * mask_embedding + (1 - has_mask_input) * no_mask_embedding
+        )
+        masks, iou_pred, _, _ = self.mask_decoder.predict_masks(
+            image_embeddings=image_embed,
+            image_pe=self.image_pe,
+            sparse_prompt_embeddings=sparse_embeddings,
+            dense_prompt_embeddings=dense_embeddings,
+            repeat_image=True,
+            high_res_features=[high_res_feat_0, high_res_feat_1],
+        )
+        if self.mask_decoder.dynamic_multimask_via_stability:
+            single_masks, single_iou = self.mask_decoder._dynamic_multimask_via_stability(
+                masks, iou_pred
+            )
+        else:
+            single_masks, single_iou = masks[:, 0:1], iou_pred[:, 0:1]
+        masks = torch.cat([single_masks, masks[:, 1:]], dim=1)
+        iou_pred = torch.cat([single_iou, iou_pred[:, 1:]], dim=1)
+        return masks, iou_pred
+
+
+def _example_inputs(model: SAM2Base):
+    """Example inputs for tracing, on the model's device."""
+    device = model.device
+    size = model.image_size
+    mask_size = 4 * model.sam_image_embedding_size
+    with torch.no_grad():
+        image = torch.zeros(1, 3, size, size, device=device)
+        image_embed, high_res_feat_0, high_res_feat_1 = SAM2ImageEncoderExport(model)(
+            image
+        )
+    decoder_inputs = (
+        image_embed,
+        high_res_feat_0,
+        high_res_feat_1,
+        torch.full((1, 2, 2), size / 2, device=device),
+        torch.ones(1, 2, dtype=torch.int, device=device),
+        torch.zeros(1, 1, mask_size, mask_size, device=device),
+        torch.zeros(1, device=device),
+    )
+    return (image,), decoder_inputs
+
+
+@torch.no_grad()
+def export_sam2_image_model(
+    model: SAM2Base,
+    output_dir: str,
+    export_format: str = "torchscript",
+    opset_version: int = 17,
+):
+    """
+    Export a SAM 2 model for `SAM2ExportedPredictor`: the image encoder and the
+    prompt encoder + mask decoder as two standalone graphs, plus a small json file
+    with the metadata the predictor needs.
+
+    Arguments:
+      model (SAM2Base): The model to export, e.g. from `build_sam2`.
+      output_dir (str): The directory to write the exported files to.
+      export_format (str): "torchscript" (traced with `torch.jit.trace`) or "onnx"
+        (requires the `onnx` package).
+      opset_version (int): The ONNX opset to export with.
+
+    Returns:
+      (str): The path of the written metadata file.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"export_format must be one of {EXPORT_FORMATS}, got {export_format}"
+        )
+    if not model.use_high_res_features_in_sam:
+        raise NotImplementedError(
+            "Exporting models without high resolution features is not supported"
+        )
+    model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+    encoder_file, decoder_file = EXPORT_FILE_NAMES[export_format]
+    encoder = SAM2ImageEncoderExport(model).eval()
+    decoder = SAM2MaskDecoderExport(model).eval()
+    encoder_inputs, decoder_inputs = _example_inputs(model)
+
+    logging.info(f"Exporting the image encoder and mask decoder to {output_dir}...")
+    if export_format == "torchscript":
+        traced_encoder = torch.jit.trace(encoder, encoder_inputs, check_trace=False)
+        traced_encoder.save(os.path.join(output_dir, encoder_file))
+        traced_decoder = torch.jit.trace(decoder, decoder_inputs, check_trace=False)
+        traced_decoder.save(os.path.join(output_dir, decoder_file))
+    else:
+        torch.onnx.export(
+            encoder,
+            encoder_inputs,
+            os.path.join(output_dir, encoder_file),
+            input_names=["image"],
+            output_names=["image_embed", "high_res_feat_0", "high_res_feat_1"],
+            opset_version=opset_version,
+            dynamo=False,
+        )
+        torch.onnx.export(
+            decoder,
+            decoder_inputs,
+            os.path.join(output_dir, decoder_file),
+            input_names=[
+                "image_embed",
+                "high_res_feat_0",
+                "high_res_feat_1",
+                "point_coords",
+                "point_labels",
+                "mask_input",
+                "has_mask_input",
+            ],
+            output_names=["masks", "iou_predictions"],
+            dynamic_axes={
+                "point_coords": {0: "num_objects", 1: "num_points"},
+                "point_labels": {0: "num_objects", 1: "num_points"},
+                "mask_input": {0: "num_masks"},
+                "masks": {0: "num_objects"},
+                "iou_predictions": {0: "num_objects"},
+            },
+            opset_version=opset_version,
+            dynamo=False,
+        )
+
+    meta = {
+        "format": export_format,
+        "image_size": model.image_size,
+        "mask_input_size": 4 * model.sam_image_embedding_size,
+        "image_encoder": encoder_file,
+        "mask_decoder": decoder_file,
+    }
+    meta_path = os.path.join(output_dir, EXPORT_META_FILE_NAME)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    logging.info("Export done.")
+    return meta_path
@@ -0,0 +1,263 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+
+# This source code is licensed under the license found in the
+# LICENSE file in the root directory of this source tree.
+
+import json
+import logging
+import os
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import torch
+from PIL.Image import Image
+
+from sam2.sam2_export import EXPORT_META_FILE_NAME
+from sam2.utils.transforms import SAM2Transforms
+
+
+class _TorchScriptRunner:
+    """Runs the exported TorchScript graphs."""
+
+    def __init__(self, encoder_path, decoder_path, num_threads, optimize):
+        if num_threads:
+            # TorchScript runs on the global intra-op thread pool
+            torch.set_num_threads(num_threads)
+        self.encoder = torch.jit.load(encoder_path, map_location="cpu").eval()
+        self.decoder = torch.jit.load(decoder_path, map_location="cpu").eval()
+        if optimize:
+            self.encoder = torch.jit.optimize_for_inference(self.encoder)
+            self.decoder = torch.jit.optimize_for_inference(self.decoder)
+
+    def run_encoder(self, image):
+        with torch.inference_mode():
+            return self.encoder(image)
+
+    def run_decoder(self, *inputs):
+        with torch.inference_mode():
+            return self.decoder(*inputs)
+
+
+class _OnnxRuntimeRunner:
+    """Runs the exported ONNX graphs with onnxruntime on CPU."""
+
+    def __init__(self, encoder_path, decoder_path, num_threads, optimize):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if optimize
+            else ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+        )
+        providers = ["CPUExecutionProvider"]
+        self.encoder = ort.InferenceSession(encoder_path, options, providers=providers)
+        self.decoder = ort.InferenceSession(decoder_path, options, providers=providers)
+
+    @staticmethod
+    def _run(session, inputs):
+        feed = {
+            arg.name: x.cpu().numpy() for arg, x in zip(session.get_inputs(), inputs)
+        }
+        return tuple(torch.from_numpy(x) for x in session.run(None, feed))
+
+    def run_encoder(self, image):
+        return self._run(self.encoder, (image,))
+
+    def run_decoder(self, *inputs):
+        return self._run(self.decoder, inputs)
+
+
+class SAM2ExportedPredictor:
+    def __init__(
+        self,
+        export_dir: str,
+        num_threads: Optional[int] = None,
+        optimize: bool = False,
+        mask_threshold=0.0,
+        fast_uint8_preprocess=False,
+    ) -> None:
+        """
+        A CPU drop-in for `SAM2ImagePredictor` (set_image / predict) that runs the
+        graphs written by `export_sam2_image_model` instead of the PyTorch model, so
+        no model needs to be built from its config and checkpoint.
+
+        Arguments:
+          export_dir (str): The directory written by `export_sam2_image_model`.
+          num_threads (int or None): The number of CPU threads for inference. For
+            TorchScript this sets torch's global thread count; for ONNX it only
+            applies to the onnxruntime sessions. None keeps the runtime default.
+          optimize (bool): Whether to let the runtime optimize the graphs on load
+            (`torch.jit.optimize_for_inference` / onnxruntime's full graph
+            optimizations).
+          mask_threshold (float): The threshold to use when converting mask logits
+            to binary masks. Masks are thresholded at 0 by default.
+          fast_uint8_preprocess (bool): See `SAM2ImagePredictor`.
+        """
+        with open(os.path.join(export_dir, EXPORT_META_FILE_NAME)) as f:
+            meta = json.load(f)
+        runner_cls = {
+            "torchscript": _TorchScriptRunner,
+            "onnx": _OnnxRuntimeRunner,
+        }[meta["format"]]
+        self._runner = runner_cls(
+            os.path.join(export_dir, meta["image_encoder"]),
+            os.path.join(export_dir, meta["mask_decoder"]),
+            num_threads,
+            optimize,
+        )
+        self.image_size = meta["image_size"]
+        self.mask_input_size = meta["mask_input_size"]
+        self._transforms = SAM2Transforms(
+            resolution=self.image_size,
+            mask_threshold=mask_threshold,
+            fast_uint8_preprocess=fast_uint8_preprocess,
+        )
+        self.mask_threshold = mask_threshold
+
+        # Predictor state
+        self._is_image_set = False
+        self._features = None
+        self._orig_hw = None
+
+    def set_image(self, image: Union[np.ndarray, Image]) -> None:
+        """
+        Calculates the image embeddings for the provided image, allowing
+        masks to be predicted with the 'predict' method.
+
+        Arguments:
+          image (np.ndarray or PIL Image): The input image to embed in RGB format,
+            in HWC format if np.ndarray, with pixel values in [0, 255].
+        """
+        self.reset_predictor()
+        if isinstance(image, np.ndarray):
+            self._orig_hw = [image.shape[:2]]
+        elif isinstance(image, Image):
+            w, h = image.size
+            self._orig_hw = [(h, w)]
+        else:
+            raise NotImplementedError("Image format not supported")
+
+        input_image = self._transforms(image)[None, ...]
+        logging.info("Computing image embeddings for the provided image...")
+        image_embed, high_res_feat_0, high_res_feat_1 = self._runner.run_encoder(
+            input_image
+        )
+        self._features = {
+            "image_embed": image_embed,
+            "high_res_feats": [high_res_feat_0, high_res_feat_1],
+        }
+        self._is_image_set = True
+        logging.info("Image embeddings computed.")
+
+    def predict(
+        self,
+        point_coords: Optional[np.ndarray] = None,
+        point_labels: Optional[np.ndarray] = None,
+        box: Optional[np.ndarray] = None,
+        mask_input: Optional[np.ndarray] = None,
+        multimask_output: bool = True,
+        return_logits: bool = False,
+        normalize_coords=True,
+        output_hw: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Predict masks for the given input prompts, using the currently set image.
+        Takes the same arguments and returns the same outputs as
+        `SAM2ImagePredictor.predict`.
+        """
+        if not self._is_image_set:
+            raise RuntimeError(
+                "An image must be set with .set_image(...) before mask prediction."
+            )
+        orig_hw = self._orig_hw[-1]
+
+        coords, labels = None, None
+        if point_coords is not None:
+            assert (
+                point_labels is not None
+            ), "point_labels must be supplied if point_coords is supplied."
+            coords = self._transforms.transform_coords(
+                torch.as_tensor(point_coords, dtype=torch.float),
+                normalize=normalize_coords,
+                orig_hw=orig_hw,
+            )
+            labels = torch.as_tensor(point_labels, dtype=torch.int)
+            if len(coords.shape) == 2:
+                coords, labels = coords[None, ...], labels[None, ...]
+        if box is not None:
+            # boxes go in as two points with labels 2 and 3, before any other points
+            box_coords = self._transforms.transform_boxes(
+                torch.as_tensor(box, dtype=torch.float),
+                normalize=normalize_coords,
+                orig_hw=orig_hw,
+            )
+            box_labels = torch.tensor([[2, 3]], dtype=torch.int).repeat(
+                box_coords.size(0), 1
+            )
+            if coords is not None:
+                coords = torch.cat([box_coords, coords], dim=1)
+                labels = torch.cat([box_labels, labels], dim=1)
+            else:
+                coords, labels = box_coords, box_labels
+        if coords is None:
+            raise ValueError("The exported decoder requires a point or box prompt.")
+
+        if mask_input is not None:
+            mask_input = torch.as_tensor(mask_input, dtype=torch.float)
+            if len(mask_input.shape) == 3:
+                mask_input = mask_input[None, :, :, :]
+            has_mask_input = torch.ones(1)
+        else:
+            mask_input = torch.zeros(1, 1, self.mask_input_size, self.mask_input_size)
+            has_mask_input = torch.zeros(1)
+
+        low_res_masks, iou_predictions = self._runner.run_decoder(
+            self._features["image_embed"],
+            *self._features["high_res_feats"],
+            coords,
+            labels,
+            mask_input,
+            has_mask_input,
+        )
+        if multimask_output:
+            low_res_masks, iou_predictions = low_res_masks[:, 1:], iou_predictions[:, 1:]
+        else:
+            low_res_masks = low_res_masks[:, 0:1]
+            iou_predictions = iou_predictions[:, 0:1]
+
+        if output_hw is None:
+            output_hw = orig_hw
+        masks = self._transforms.postprocess_masks(low_res_masks, tuple(output_hw))
+        low_res_masks = torch.clamp(low_res_masks, -32.0, 32.0)
+        if not return_logits:
+            masks = masks > self.mask_threshold
+
+        masks_np = masks.squeeze(0).float().numpy()
+        iou_predictions_np = iou_predictions.squeeze(0).float().numpy()
+        low_res_masks_np = low_res_masks.squeeze(0).float().numpy()
+        return masks_np, iou_predictions_np, low_res_masks_np
+
+    def get_image_embedding(self) -> torch.Tensor:
+        """
+        Returns the image embeddings for the currently set image, with
+        shape 1xCxHxW.
+        """
+        if not self._is_image_set:
+            raise RuntimeError(
+                "An image must be set with .set_image(...) to generate an embedding."
+            )
+        return self._features["image_embed"]
+
+    def reset_predictor(self) -> None:
+        """
+        Resets the image embeddings and other state variables.
+        """
+        self._is_image_set = False
+        self._features = None
+        self._orig_hw = None
@@ -5,6 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 import logging
+import os
 
 from typing import List, Optional, Tuple, Union
 
@@ -24,6 +25,7 @@ class SAM2ImagePredictor:
         mask_threshold=0.0,
         max_hole_area=0.0,
         max_sprinkle_area=0.0,
+        fast_uint8_preprocess=False,
         **kwargs,
     ) -> None:
         """
@@ -38,6 +40,9 @@ class SAM2ImagePredictor:
             the maximum area of max_hole_area in low_res_masks.
           max_sprinkle_area (int): If max_sprinkle_area > 0, we remove small sprinkles up to
             the maximum area of max_sprinkle_area in low_res_masks.
+          fast_uint8_preprocess (bool): If True, 8-bit RGB images are resized in uint8
+            before normalization (faster, but not bit-identical to the default
+            preprocessing; see `SAM2Transforms`).
         """
         super().__init__()
         self.model = sam_model
@@ -46,6 +51,7 @@ class SAM2ImagePredictor:
             mask_threshold=mask_threshold,
             max_hole_area=max_hole_area,
             max_sprinkle_area=max_sprinkle_area,
+            fast_uint8_preprocess=fast_uint8_preprocess,
         )
 
         # Predictor state
@@ -82,6 +88,89 @@ class SAM2ImagePredictor:
         sam_model = build_sam2_hf(model_id, **kwargs)
         return cls(sam_model, **kwargs)
 
+    def compile_model(self, cache_dir=None, warmup=True, mode="default"):
+        """
+        Opt-in `torch.compile` of the image encoder, prompt encoder and mask decoder.
+
+        Unlike `SAM2VideoPredictorVOS` (which uses "max-autotune", aimed at GPUs), the
+        defaults here also suit CPU inference: the default inductor mode, with weight
+        freezing on CPU. The image encoder always sees a fixed input size, so it is
+        compiled with static shapes; the prompt encoder and mask decoder get automatic
+        dynamic shapes, since their inputs depend on the number of prompts.
+
+        Arguments:
+          cache_dir (str or None): If given, inductor's compiled artifacts are cached
+            in this directory and reused across processes, so that later launches
+            skip most of the compilation. (The cache directory is process-wide, as
+            it is set through TORCHINDUCTOR_CACHE_DIR.)
+          warmup (bool): Whether to compile right away on a dummy image and the common
+            prompt shapes (one click, two clicks, a box) instead of on first use.
+          mode (str): The `torch.compile` mode.
+
+        The inductor settings (weight freezing, the FX graph cache) are passed as
+        per-function compile options, which inductor applies with `config.patch`
+        whenever these functions are (re)compiled, so the global inductor config
+        is left untouched.
+        """
+        import torch._inductor
+
+        options = {}
+        artifacts_path = None
+        if cache_dir is not None:
+            cache_dir = os.path.abspath(cache_dir)
+            os.makedirs(cache_dir, exist_ok=True)
+            os.environ["TORCHINDUCTOR_CACHE_DIR"] = cache_dir
+            options["fx_graph_cache"] = True
+            artifacts_path = os.path.join(cache_dir, "sam2_compile_artifacts.bin")
+            if os.path.exists(artifacts_path) and hasattr(
+                torch.compiler, "load_cache_artifacts"
+            ):
+                with open(artifacts_path, "rb") as f:
+                    torch.compiler.load_cache_artifacts(f.read())
+        if self.device.type == "cpu":
+            # treat the weights as constants, which lets inductor fold and prepack
+            # them for the CPU kernels
+            options["freezing"] = True
+        if options:
+            # `mode` and `options` can't both be given, so expand the mode's options
+            compile_kwargs = {"options": {**torch._inductor.list_mode_options(mode), **options}}
+        else:
+            compile_kwargs = {"mode": mode}
+
+        model = self.model
+        model.image_encoder.forward = torch.compile(
+            model.image_encoder.forward, dynamic=False, **compile_kwargs
+        )
+        model.sam_prompt_encoder.forward = torch.compile(
+            model.sam_prompt_encoder.forward, **compile_kwargs
+        )
+        model.sam_mask_decoder.forward = torch.compile(
+            model.sam_mask_decoder.forward, **compile_kwargs
+        )
+        if not warmup:
+            return
+
+        logging.info("Compiling the model on a dummy image and prompts...")
+        size = model.image_size
+        self.set_image(np.zeros((size, size, 3), dtype=np.uint8))
+        for num_points in [1, 2]:
+            self.predict(
+                point_coords=np.full((num_points, 2), size / 2, dtype=np.float32),
+                point_labels=np.ones(num_points, dtype=np.int32),
+                multimask_output=False,
+            )
+        self.predict(
+            box=np.array([0, 0, size / 2, size / 2], dtype=np.float32),
+            multimask_output=False,
+        )
+        self.reset_predictor()
+        if artifacts_path is not None and hasattr(torch.compiler, "save_cache_artifacts"):
+            artifacts = torch.compiler.save_cache_artifacts()
+            if artifacts is not None:
+                with open(artifacts_path, "wb") as f:
+                    f.write(artifacts[0])
+        logging.info("Model compiled.")
+
     @torch.no_grad()
     def set_image(
         self,
@@ -181,9 +270,11 @@ class SAM2ImagePredictor:
         multimask_output: bool = True,
         return_logits: bool = False,
         normalize_coords=True,
+        output_hw: Optional[Tuple[int, int]] = None,
     ) -> Tuple[List[np.ndarray], List[np.ndarray], List[np.ndarray]]:
         """This function is very similar to predict(...), however it is used for batched mode, when the model is expected to generate predictions on multiple images.
         It returns a tuple of lists of masks, ious, and low_res_masks_logits.
+        `output_hw` (see predict) applies to every image of the batch.
         """
         assert self._is_batch, "This function should only be used when in batched mode"
         if not self._is_image_set:
@@ -222,6 +313,7 @@ class SAM2ImagePredictor:
                 multimask_output,
                 return_logits=return_logits,
                 img_idx=img_idx,
+                output_hw=output_hw,
             )
             masks_np = masks.squeeze(0).float().detach().cpu().numpy()
             iou_predictions_np = (
@@ -243,6 +335,7 @@ class SAM2ImagePredictor:
         multimask_output: bool = True,
         return_logits: bool = False,
         normalize_coords=True,
+        output_hw: Optional[Tuple[int, int]] = None,
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Predict masks for the given input prompts, using the currently set image.
@@ -267,10 +360,15 @@ class SAM2ImagePredictor:
           return_logits (bool): If true, returns un-thresholded masks logits
             instead of a binary mask.
           normalize_coords (bool): If true, the point coordinates will be normalized to the range [0,1] and point_coords is expected to be wrt. image dimensions.
+          output_hw (tuple(int, int) or None): If given, the low resolution
+            logits are upsampled directly to this (H, W) instead of the
+            original image size, e.g. the size the mask is displayed at.
+            Prompts are still given in original image coordinates.
 
         Returns:
           (np.ndarray): The output masks in CxHxW format, where C is the
-            number of masks, and (H, W) is the original image size.
+            number of masks, and (H, W) is the original image size (or
+            output_hw if given).
           (np.ndarray): An array of length C containing the model's
             predictions for the quality of each mask.
           (np.ndarray): An array of shape CxHxW, where C is the number
@@ -295,6 +393,7 @@ class SAM2ImagePredictor:
             mask_input,
             multimask_output,
             return_logits=return_logits,
+            output_hw=output_hw,
         )
 
         masks_np = masks.squeeze(0).float().detach().cpu().numpy()
@@ -343,6 +442,7 @@ class SAM2ImagePredictor:
         multimask_output: bool = True,
         return_logits: bool = False,
         img_idx: int = -1,
+        output_hw: Optional[Tuple[int, int]] = None,
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """
         Predict masks for the given input prompts, using the currently set image.
@@ -369,10 +469,13 @@ class SAM2ImagePredictor:
             input prompts, multimask_output=False can give better results.
           return_logits (bool): If true, returns un-thresholded masks logits
             instead of a binary mask.
+          output_hw (tuple(int, int) or None): The (H, W) to upsample the masks
+            to. Defaults to the original image size.
 
         Returns:
           (torch.Tensor): The output masks in BxCxHxW format, where C is the
-            number of masks, and (H, W) is the original image size.
+            number of masks, and (H, W) is the original image size (or
+            output_hw if given).
           (torch.Tensor): An array of shape BxC containing the model's
             predictions for the quality of each mask.
           (torch.Tensor): An array of shape BxCxHxW, where C is the number
@@ -427,10 +530,11 @@ class SAM2ImagePredictor:
             high_res_features=high_res_features,
         )
 
-        # Upscale the masks to the original image resolution
-        masks = self._transforms.postprocess_masks(
-            low_res_masks, self._orig_hw[img_idx]
-        )
+        # Upscale the masks to the original image resolution (or the requested
+        # output size, which skips materializing a full-resolution tensor)
+        if output_hw is None:
+            output_hw = self._orig_hw[img_idx]
+        masks = self._transforms.postprocess_masks(low_res_masks, tuple(output_hw))
         low_res_masks = torch.clamp(low_res_masks, -32.0, 32.0)
         if not return_logits:
             masks = masks > self.mask_threshold
@@ -4,16 +4,36 @@
 # This source code is licensed under the license found in the
 # LICENSE file in the root directory of this source tree.
 
+import os
+import shutil
 import warnings
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
 import torch.nn.functional as F
 
+import numpy as np
 from tqdm import tqdm
 
 from sam2.modeling.sam2_base import NO_OBJ_SCORE, SAM2Base
-from sam2.utils.misc import concat_points, fill_holes_in_mask_scores, load_video_frames
+from sam2.utils.amg import mask_to_rle_pytorch, rle_to_mask
+from sam2.utils.misc import (
+    _map_tensors,
+    concat_points,
+    FeatureCache,
+    fill_holes_in_mask_scores,
+    load_video_frames,
+    MaskLogitsDiskStore,
+)
+
+# mask logit used for foreground pixels when restoring masks pruned as RLE
+PRUNED_MASK_LOGIT = 10.0
+
+# on-disk format of a saved inference state (see `save_inference_state`)
+STATE_FORMAT_VERSION = 1
+STATE_FILE_NAME = "state.pt"
+PRUNED_MASKS_FILE_NAME = "pruned_masks.bin"
 
 
 class SAM2VideoPredictor(SAM2Base):
@@ -45,8 +65,44 @@ class SAM2VideoPredictor(SAM2Base):
         offload_video_to_cpu=False,
         offload_state_to_cpu=False,
         async_loading_frames=False,
+        max_cached_feature_bytes=256 * 1024**2,
+        offload_cached_features_to_cpu=False,
+        stream_video_frames=False,
+        max_buffered_frames=32,
+        memory_pruning=None,
+        pruned_mask_storage="rle",
+        pruned_mask_path=None,
     ):
-        """Initialize an inference state."""
+        """
+        Initialize an inference state.
+
+        The backbone features of recently visited frames are kept in an LRU cache of
+        at most `max_cached_feature_bytes` bytes (on the compute device). If
+        `offload_cached_features_to_cpu` is True, frames evicted from the device are
+        kept in CPU memory instead of being dropped.
+
+        If `stream_video_frames` is True, the video frames are decoded on demand into
+        a ring buffer of at most `max_buffered_frames` uint8 frames (with a prefetch
+        thread ahead of the current frame) instead of being loaded all at once, so
+        that memory usage does not grow with the video length.
+
+        If `memory_pruning` is set, the non-conditioning outputs of frames that fall
+        out of the memory window (the last `num_maskmem` frames at the memory stride)
+        during tracking are pruned: their memory features are dropped ("evict") or
+        moved to CPU memory ("offload"), and their predicted mask logits are kept as
+        binary RLE masks (`pruned_mask_storage="rle"`) or as float16 logits in a file
+        on disk (`pruned_mask_storage="disk"`, at `pruned_mask_path` or a temporary
+        file that is deleted by `close_state`). Both are lossy: RLE keeps only the
+        binary mask, and the disk store rounds the logits to float16 (they are read
+        back as float32). The object pointers are kept since they are tiny.
+
+        Call `close_state` once the state is no longer needed to release the frame
+        loader (and its prefetch thread) and the other resources held by the state.
+        """
+        if memory_pruning not in (None, "evict", "offload"):
+            raise ValueError(f"unknown memory_pruning mode: {memory_pruning}")
+        if pruned_mask_storage not in ("rle", "disk"):
+            raise ValueError(f"unknown pruned_mask_storage: {pruned_mask_storage}")
         compute_device = self.device  # device of the model
         images, video_height, video_width = load_video_frames(
             video_path=video_path,
@@ -54,9 +110,49 @@ class SAM2VideoPredictor(SAM2Base):
             offload_video_to_cpu=offload_video_to_cpu,
             async_loading_frames=async_loading_frames,
             compute_device=compute_device,
+            stream_frames=stream_video_frames,
+            max_buffered_frames=max_buffered_frames,
+        )
+        inference_state = self._new_inference_state(
+            images,
+            video_height,
+            video_width,
+            video_path=video_path,
+            offload_video_to_cpu=offload_video_to_cpu,
+            offload_state_to_cpu=offload_state_to_cpu,
+            max_cached_feature_bytes=max_cached_feature_bytes,
+            offload_cached_features_to_cpu=offload_cached_features_to_cpu,
+            memory_pruning=memory_pruning,
+            pruned_mask_storage=pruned_mask_storage,
+            pruned_mask_path=pruned_mask_path,
         )
+        # Warm up the visual backbone and cache the image feature on frame 0
+        self._get_image_feature(inference_state, frame_idx=0, batch_size=1)
+        return inference_state
+
+    def _new_inference_state(
+        self,
+        images,
+        video_height,
+        video_width,
+        video_path,
+        offload_video_to_cpu,
+        offload_state_to_cpu,
+        max_cached_feature_bytes,
+        offload_cached_features_to_cpu,
+        memory_pruning,
+        pruned_mask_storage,
+        pruned_mask_path,
+        truncate_pruned_masks=True,
+    ):
+        """Create an empty inference state on the loaded video frames."""
+        compute_device = self.device  # device of the model
         inference_state = {}
         inference_state["images"] = images
+        # the video source (if it's a path), so that a saved state can re-read the frames
+        inference_state["video_path"] = (
+            video_path if isinstance(video_path, str) else None
+        )
         inference_state["num_frames"] = len(images)
         # whether to offload the video frames to CPU memory
         # turning on this option saves the GPU memory with only a very small overhead
@@ -78,7 +174,10 @@ class SAM2VideoPredictor(SAM2Base):
         inference_state["point_inputs_per_obj"] = {}
         inference_state["mask_inputs_per_obj"] = {}
         # visual features on a small number of recently visited frames for quick interactions
-        inference_state["cached_features"] = {}
+        inference_state["cached_features"] = FeatureCache(
+            max_bytes=max_cached_feature_bytes,
+            offload_to_cpu=offload_cached_features_to_cpu,
+        )
         # values that don't change across frames (so we only need to hold one copy of them)
         inference_state["constants"] = {}
         # mapping between client-side object id and model-side object index
@@ -94,8 +193,14 @@ class SAM2VideoPredictor(SAM2Base):
         # (we directly use their consolidated outputs during tracking)
         # metadata for each tracking frame (e.g. which direction it's tracked)
         inference_state["frames_tracked_per_obj"] = {}
-        # Warm up the visual backbone and cache the image feature on frame 0
-        self._get_image_feature(inference_state, frame_idx=0, batch_size=1)
+        # how to prune non-conditioning outputs outside the memory window
+        inference_state["memory_pruning"] = memory_pruning
+        inference_state["pruned_mask_storage"] = pruned_mask_storage
+        inference_state["pruned_mask_store"] = (
+            MaskLogitsDiskStore(pruned_mask_path, truncate=truncate_pruned_masks)
+            if memory_pruning is not None and pruned_mask_storage == "disk"
+            else None
+        )
         return inference_state
 
     @classmethod
@@ -115,6 +220,225 @@ class SAM2VideoPredictor(SAM2Base):
         sam_model = build_sam2_video_predictor_hf(model_id, **kwargs)
         return sam_model
 
+    @torch.inference_mode()
+    def save_inference_state(self, inference_state, path, include_features=False):
+        """
+        Save an inference state into the directory `path`, so that the session can be
+        resumed later with `load_inference_state` without re-encoding or re-tracking.
+
+        The state is saved with `torch.save` (and loaded back with memory mapping),
+        including the prompts, the compact per-frame outputs, the object id mappings
+        and the tracking metadata. Masks pruned to disk are copied along. The video
+        frames are not saved; they are re-read from `video_path` when loading. The
+        cached backbone features are only saved if `include_features` is True.
+        """
+        os.makedirs(path, exist_ok=True)
+
+        def _to_cpu(x):
+            return _map_tensors(x, lambda t: t.to("cpu"))
+
+        def _save_outputs(output_dict_per_obj):
+            return {
+                obj_idx: {
+                    storage_key: {
+                        t: self._output_to_saved(out) for t, out in outputs.items()
+                    }
+                    for storage_key, outputs in obj_output_dict.items()
+                }
+                for obj_idx, obj_output_dict in output_dict_per_obj.items()
+            }
+
+        payload = {
+            "format_version": STATE_FORMAT_VERSION,
+            "meta": {
+                "video_path": inference_state["video_path"],
+                "num_frames": inference_state["num_frames"],
+                "video_height": inference_state["video_height"],
+                "video_width": inference_state["video_width"],
+                "image_size": self.image_size,
+                "memory_pruning": inference_state["memory_pruning"],
+                "pruned_mask_storage": inference_state["pruned_mask_storage"],
+            },
+            "obj_ids": list(inference_state["obj_id_to_idx"].items()),
+            "point_inputs_per_obj": _to_cpu(inference_state["point_inputs_per_obj"]),
+            "mask_inputs_per_obj": _to_cpu(inference_state["mask_inputs_per_obj"]),
+            "output_dict_per_obj": _save_outputs(
+                inference_state["output_dict_per_obj"]
+            ),
+            "temp_output_dict_per_obj": _save_outputs(
+                inference_state["temp_output_dict_per_obj"]
+            ),
+            "frames_tracked_per_obj": inference_state["frames_tracked_per_obj"],
+            "constants": _to_cpu(inference_state["constants"]),
+            "cached_features": (
+                _to_cpu(inference_state["cached_features"].items())
+                if include_features
+                else []
+            ),
+        }
+        # write to a temporary file first, so that a failed save keeps the old file
+        state_file = os.path.join(path, STATE_FILE_NAME)
+        torch.save(payload, state_file + ".tmp")
+        os.replace(state_file + ".tmp", state_file)
+
+        store = inference_state["pruned_mask_store"]
+        if store is not None:
+            store.flush()
+            dst = os.path.join(path, PRUNED_MASKS_FILE_NAME)
+            # (the store of a loaded state is the saved file itself)
+            if not (os.path.exists(dst) and os.path.samefile(store.path, dst)):
+                shutil.copyfile(store.path, dst)
+
+    @torch.inference_mode()
+    def load_inference_state(
+        self,
+        path,
+        video_path=None,
+        offload_video_to_cpu=False,
+        offload_state_to_cpu=False,
+        max_cached_feature_bytes=256 * 1024**2,
+        offload_cached_features_to_cpu=False,
+        stream_video_frames=True,
+        max_buffered_frames=32,
+    ):
+        """
+        Load an inference state saved by `save_inference_state` from the directory
+        `path`. The saved file is memory-mapped while loading, and every tensor is
+        copied out of it (onto its device), so the file is not in use afterwards and
+        the state can be saved back into the same directory (a memory-mapped file
+        can't be replaced on Windows). The video frames are re-read from `video_path`
+        (by default, the path the state was created with), streaming them on demand
+        unless `stream_video_frames` is False. See `init_state` for the other options.
+        """
+        payload = torch.load(
+            os.path.join(path, STATE_FILE_NAME),
+            map_location="cpu",
+            mmap=True,
+            weights_only=True,
+        )
+        if payload["format_version"] != STATE_FORMAT_VERSION:
+            raise RuntimeError(
+                f"Unsupported inference state format {payload['format_version']} "
+                f"(expected {STATE_FORMAT_VERSION})"
+            )
+        meta = payload["meta"]
+        if meta["image_size"] != self.image_size:
+            raise ValueError(
+                f"The state was saved with image size {meta['image_size']}, "
+                f"but the model uses {self.image_size}"
+            )
+        video_path = video_path if video_path is not None else meta["video_path"]
+        if video_path is None:
+            raise ValueError(
+                "The saved state has no video path; please provide `video_path`"
+            )
+        images, video_height, video_width = load_video_frames(
+            video_path=video_path,
+            image_size=self.image_size,
+            offload_video_to_cpu=offload_video_to_cpu,
+            compute_device=self.device,
+            stream_frames=stream_video_frames,
+            max_buffered_frames=max_buffered_frames,
+        )
+        if len(images) != meta["num_frames"]:
+            raise ValueError(
+                f"The video has {len(images)} frames, but the saved state has "
+                f"{meta['num_frames']}"
+            )
+        pruned_mask_path = os.path.join(path, PRUNED_MASKS_FILE_NAME)
+        inference_state = self._new_inference_state(
+            images,
+            video_height,
+            video_width,
+            video_path=video_path,
+            offload_video_to_cpu=offload_video_to_cpu,
+            offload_state_to_cpu=offload_state_to_cpu,
+            max_cached_feature_bytes=max_cached_feature_bytes,
+            offload_cached_features_to_cpu=offload_cached_features_to_cpu,
+            memory_pruning=meta["memory_pruning"],
+            pruned_mask_storage=meta["pruned_mask_storage"],
+            pruned_mask_path=(
+                pruned_mask_path if os.path.exists(pruned_mask_path) else None
+            ),
+            truncate_pruned_masks=False,
+        )
+        device = inference_state["device"]
+
+        def _to_device(x):
+            return _map_tensors(
+                x, lambda t: t.to(device, non_blocking=True, copy=True)
+            )
+
+        inference_state["constants"] = _to_device(payload["constants"])
+        obj_ids = payload["obj_ids"]
+        inference_state["obj_id_to_idx"] = OrderedDict(obj_ids)
+        inference_state["obj_idx_to_id"] = OrderedDict(
+            (obj_idx, obj_id) for obj_id, obj_idx in obj_ids
+        )
+        inference_state["obj_ids"] = [obj_id for obj_id, _ in obj_ids]
+        inference_state["point_inputs_per_obj"] = _to_device(
+            payload["point_inputs_per_obj"]
+        )
+        inference_state["mask_inputs_per_obj"] = _to_device(
+            payload["mask_inputs_per_obj"]
+        )
+        for key in ["output_dict_per_obj", "temp_output_dict_per_obj"]:
+            inference_state[key] = {
+                obj_idx: {
+                    storage_key: {
+                        t: self._output_from_saved(inference_state, out)
+                        for t, out in outputs.items()
+                    }
+                    for storage_key, outputs in obj_output_dict.items()
+                }
+                for obj_idx, obj_output_dict in payload[key].items()
+            }
+        inference_state["frames_tracked_per_obj"] = payload["frames_tracked_per_obj"]
+        for frame_idx, entry in payload["cached_features"]:
+            inference_state["cached_features"].put(frame_idx, _to_device(entry))
+        return inference_state
+
+    @staticmethod
+    def _output_to_saved(out):
+        """
+        Prepare a compact output for saving: tensors go to CPU and `maskmem_pos_enc`
+        (a view of the constants in the inference state) is replaced by a flag.
+        """
+        saved = _map_tensors(out, lambda t: t.to("cpu"))
+        saved["maskmem_pos_enc"] = out["maskmem_pos_enc"] is not None
+        return saved
+
+    def _output_from_saved(self, inference_state, saved):
+        """
+        Restore a compact output saved by `_output_to_saved` onto the devices. All
+        tensors are copied, so that none of them stays memory-mapped from the file.
+        """
+        device = inference_state["device"]
+        storage_device = inference_state["storage_device"]
+        out = {
+            k: _map_tensors(v, lambda t: t.clone()) for k, v in saved.items()
+            if k not in ("maskmem_features", "pred_masks", "obj_ptr", "object_score_logits")
+        }
+        for k in ["maskmem_features", "pred_masks"]:
+            if saved.get(k) is not None:
+                out[k] = saved[k].to(storage_device, non_blocking=True, copy=True)
+            elif k in saved:
+                out[k] = None
+        # object pointers and scores are always kept on the compute device
+        out["obj_ptr"] = saved["obj_ptr"].to(device, non_blocking=True, copy=True)
+        out["object_score_logits"] = saved["object_score_logits"].to(
+            device, non_blocking=True, copy=True
+        )
+        if out["maskmem_pos_enc"]:
+            batch_size = out["obj_ptr"].size(0)
+            out["maskmem_pos_enc"] = [
+                x.expand(batch_size, -1, -1, -1)
+                for x in inference_state["constants"]["maskmem_pos_enc"]
+            ]
+        else:
+            out["maskmem_pos_enc"] = None
+        return out
+
     def _obj_id_to_idx(self, inference_state, obj_id):
         """Map client-side object id to model-side object index."""
         obj_idx = inference_state["obj_id_to_idx"].get(obj_id, None)
@@ -255,9 +579,12 @@ class SAM2VideoPredictor(SAM2Base):
             if prev_out is None:
                 prev_out = obj_output_dict["non_cond_frame_outputs"].get(frame_idx)
 
-        if prev_out is not None and prev_out["pred_masks"] is not None:
+        prev_pred_masks = None
+        if prev_out is not None:
+            prev_pred_masks = self._get_pred_masks(inference_state, prev_out)
+        if prev_pred_masks is not None:
             device = inference_state["device"]
-            prev_sam_mask_logits = prev_out["pred_masks"].to(device, non_blocking=True)
+            prev_sam_mask_logits = prev_pred_masks.to(device, non_blocking=True)
             # Clamp the scale of prev_sam_mask_logits to avoid rare numerical issues.
             prev_sam_mask_logits = torch.clamp(prev_sam_mask_logits, -32.0, 32.0)
         current_out, _ = self._run_single_frame_inference(
@@ -460,7 +787,8 @@ class SAM2VideoPredictor(SAM2Base):
             if out is None:
                 continue
             # Add the temporary object output mask to consolidated output mask
-            obj_mask = out["pred_masks"]
+            obj_mask = self._get_pred_masks(inference_state, out)
+            obj_mask = obj_mask.to(inference_state["storage_device"])
             consolidated_pred_masks = consolidated_out[consolidated_mask_key]
             if obj_mask.shape[-2:] == consolidated_pred_masks.shape[-2:]:
                 consolidated_pred_masks[obj_idx : obj_idx + 1] = obj_mask
@@ -549,8 +877,32 @@ class SAM2VideoPredictor(SAM2Base):
         start_frame_idx=None,
         max_frame_num_to_track=None,
         reverse=False,
+        lookahead_frames=0,
+        batch_objects=True,
     ):
-        """Propagate the input points across frames to track in the entire video."""
+        """
+        Propagate the input points across frames to track in the entire video.
+
+        If `batch_objects` is True, objects whose memories come from the same frames
+        (e.g. objects prompted on the same frames and tracked together) are run through
+        memory attention and the mask decoder as one batch on each frame, instead of
+        one object at a time.
+
+        If `lookahead_frames` is K > 0, the backbone features of the next K frames
+        are computed in one batched forward pass in a background thread (and a side
+        CUDA stream on GPU), while the memory-dependent part of tracking runs on the
+        current frames. This overlaps frame loading and the image encoder with memory
+        attention. The precomputed features of up to 2K frames (the current and the
+        next chunk) are held outside the feature cache budget and only added to the
+        cache when their frame is tracked. With `stream_video_frames`, the background
+        thread reads frames with `peek`, so it doesn't move the prefetch cursor of the
+        frame loader (the loader's own prefetching then doesn't cover those frames).
+
+        With `memory_pruning` (see `init_state`), the masks of frames that have been
+        pruned are restored from their pruned storage when they are needed again
+        (e.g. when propagating over them once more): with `pruned_mask_storage="disk"`
+        these are the float16-rounded logits as float32, not the original logits.
+        """
         self.propagate_in_video_preflight(inference_state)
 
         obj_ids = inference_state["obj_ids"]
@@ -580,8 +932,17 @@ class SAM2VideoPredictor(SAM2Base):
             )
             processing_order = range(start_frame_idx, end_frame_idx + 1)
 
-        for frame_idx in tqdm(processing_order, desc="propagate in video"):
+        if lookahead_frames > 0:
+            frames = self._iter_frames_with_lookahead(
+                inference_state, processing_order, lookahead_frames
+            )
+        else:
+            frames = processing_order
+        for frame_idx in tqdm(
+            frames, desc="propagate in video", total=len(processing_order)
+        ):
             pred_masks_per_obj = [None] * batch_size
+            objs_to_track = []
             for obj_idx in range(batch_size):
                 obj_output_dict = inference_state["output_dict_per_obj"][obj_idx]
                 # We skip those frames already in consolidated outputs (these are frames
@@ -598,25 +959,55 @@ class SAM2VideoPredictor(SAM2Base):
                         self._clear_obj_non_cond_mem_around_input(
                             inference_state, frame_idx, obj_idx
                         )
+                    pred_masks_per_obj[obj_idx] = pred_masks
                 else:
-                    storage_key = "non_cond_frame_outputs"
-                    current_out, pred_masks = self._run_single_frame_inference(
-                        inference_state=inference_state,
-                        output_dict=obj_output_dict,
-                        frame_idx=frame_idx,
-                        batch_size=1,  # run on the slice of a single object
-                        is_init_cond_frame=False,
-                        point_inputs=None,
-                        mask_inputs=None,
-                        reverse=reverse,
-                        run_mem_encoder=True,
-                    )
-                    obj_output_dict[storage_key][frame_idx] = current_out
+                    objs_to_track.append(obj_idx)
 
                 inference_state["frames_tracked_per_obj"][obj_idx][frame_idx] = {
                     "reverse": reverse
                 }
-                pred_masks_per_obj[obj_idx] = pred_masks
+
+            # Track the remaining objects on this frame, running objects whose memories
+            # are laid out on the same frames together in one batch
+            if batch_objects and not self.non_overlap_masks_for_mem_enc:
+                obj_groups = self._group_objs_by_memory_frames(
+                    inference_state, objs_to_track, frame_idx
+                )
+            else:
+                obj_groups = [[obj_idx] for obj_idx in objs_to_track]
+            storage_key = "non_cond_frame_outputs"
+            for obj_inds in obj_groups:
+                if len(obj_inds) == 1:
+                    obj_output_dict = inference_state["output_dict_per_obj"][obj_inds[0]]
+                else:
+                    obj_output_dict = self._stack_obj_output_dicts(
+                        inference_state, obj_inds, frame_idx
+                    )
+                current_out, pred_masks = self._run_single_frame_inference(
+                    inference_state=inference_state,
+                    output_dict=obj_output_dict,
+                    frame_idx=frame_idx,
+                    batch_size=len(obj_inds),
+                    is_init_cond_frame=False,
+                    point_inputs=None,
+                    mask_inputs=None,
+                    reverse=reverse,
+                    run_mem_encoder=True,
+                )
+                # scatter the outputs back to the slice of each object
+                for i, obj_idx in enumerate(obj_inds):
+                    obj_output_dict = inference_state["output_dict_per_obj"][obj_idx]
+                    obj_output_dict[storage_key][frame_idx] = (
+                        current_out
+                        if len(obj_inds) == 1
+                        else self._slice_obj_output(current_out, i)
+                    )
+                    pred_masks_per_obj[obj_idx] = pred_masks[i : i + 1]
+
+            if inference_state["memory_pruning"] is not None:
+                self._prune_outputs_out_of_memory_window(
+                    inference_state, frame_idx, reverse
+                )
 
             # Resize the output mask to the original video resolution (we directly use
             # the mask scores on GPU for output to avoid any CPU conversion in between)
@@ -629,6 +1020,230 @@ class SAM2VideoPredictor(SAM2Base):
             )
             yield frame_idx, obj_ids, video_res_masks
 
+    def _group_objs_by_memory_frames(self, inference_state, obj_inds, frame_idx):
+        """
+        Group the objects that can be tracked together in one batch on `frame_idx`,
+        i.e. those whose conditioning frames and non-conditioning outputs around
+        `frame_idx` are on the same frames, so that memory attention sees the same
+        memory layout (and length) for every object in the batch.
+        """
+        window = self._memory_window()
+        groups = {}
+        for obj_idx in obj_inds:
+            obj_output_dict = inference_state["output_dict_per_obj"][obj_idx]
+            non_cond_outputs = obj_output_dict["non_cond_frame_outputs"]
+            key = (
+                tuple(sorted(obj_output_dict["cond_frame_outputs"])),
+                tuple(
+                    t
+                    for t in range(frame_idx - window, frame_idx + window + 1)
+                    if t in non_cond_outputs
+                ),
+            )
+            groups.setdefault(key, []).append(obj_idx)
+        return list(groups.values())
+
+    def _memory_window(self):
+        """Max frame distance of a memory or object pointer to the current frame."""
+        return max(
+            self.memory_temporal_stride_for_eval * self.num_maskmem,
+            self.max_obj_ptrs_in_encoder,
+        )
+
+    def _stack_obj_output_dicts(self, inference_state, obj_inds, frame_idx):
+        """
+        Build an output dict for a batch of objects by concatenating their per-object
+        outputs (on the frames in their shared memory layout) along the batch dim.
+        """
+        batch_size = len(obj_inds)
+        obj_output_dicts = [
+            inference_state["output_dict_per_obj"][obj_idx] for obj_idx in obj_inds
+        ]
+
+        def _stack(outs):
+            maskmem_pos_enc = outs[0]["maskmem_pos_enc"]
+            if maskmem_pos_enc is not None:
+                maskmem_pos_enc = [
+                    x.expand(batch_size, -1, -1, -1) for x in maskmem_pos_enc
+                ]
+            maskmem_features = [out["maskmem_features"] for out in outs]
+            if any(x is None for x in maskmem_features):
+                maskmem_features = None  # pruned memory (see `memory_pruning`)
+            else:
+                maskmem_features = torch.cat(maskmem_features, dim=0)
+            return {
+                "maskmem_features": maskmem_features,
+                "maskmem_pos_enc": maskmem_pos_enc,
+                "obj_ptr": torch.cat([out["obj_ptr"] for out in outs], dim=0),
+                "object_score_logits": torch.cat(
+                    [out["object_score_logits"] for out in outs], dim=0
+                ),
+            }
+
+        # all objects in the batch have outputs on the same frames (see
+        # `_group_objs_by_memory_frames`), so we can use the first one as reference
+        window = self._memory_window()
+        cond_frame_inds = obj_output_dicts[0]["cond_frame_outputs"]
+        non_cond_outputs = obj_output_dicts[0]["non_cond_frame_outputs"]
+        non_cond_frame_inds = [
+            t
+            for t in range(frame_idx - window, frame_idx + window + 1)
+            if t in non_cond_outputs
+        ]
+        return {
+            "cond_frame_outputs": {
+                t: _stack([d["cond_frame_outputs"][t] for d in obj_output_dicts])
+                for t in cond_frame_inds
+            },
+            "non_cond_frame_outputs": {
+                t: _stack([d["non_cond_frame_outputs"][t] for d in obj_output_dicts])
+                for t in non_cond_frame_inds
+            },
+        }
+
+    @staticmethod
+    def _slice_obj_output(current_out, i):
+        """Take the output of the i-th object out of a batched (compact) output."""
+        obj_out = {}
+        for k, v in current_out.items():
+            if v is None:
+                obj_out[k] = None
+            elif isinstance(v, list):
+                obj_out[k] = [x[i : i + 1] for x in v]
+            else:
+                obj_out[k] = v[i : i + 1]
+        return obj_out
+
+    def _prune_outputs_out_of_memory_window(self, inference_state, frame_idx, reverse):
+        """
+        Prune the non-conditioning outputs on the frame that just left the memory
+        window (i.e. is too far behind `frame_idx` in the tracking direction to be
+        used as a memory frame again in this propagation).
+        """
+        window = self.memory_temporal_stride_for_eval * self.num_maskmem
+        t = frame_idx + (window + 1) * (1 if reverse else -1)
+        for obj_output_dict in inference_state["output_dict_per_obj"].values():
+            out = obj_output_dict["non_cond_frame_outputs"].get(t)
+            if out is not None:
+                self._prune_output(inference_state, out)
+
+    def _prune_output(self, inference_state, out):
+        """
+        Prune a compact output in place: drop or offload its memory features, and
+        move its mask logits to RLE or to the disk store (see `_get_pred_masks`).
+        """
+        if out["maskmem_features"] is not None:
+            if inference_state["memory_pruning"] == "offload":
+                out["maskmem_features"] = out["maskmem_features"].to("cpu")
+            else:
+                out["maskmem_features"] = None
+        pred_masks = out["pred_masks"]
+        if pred_masks is None:
+            return  # already pruned
+        if inference_state["pruned_mask_storage"] == "disk":
+            store = inference_state["pruned_mask_store"]
+            out["pruned_pred_masks"] = ("disk", store.put(pred_masks))
+        else:
+            rles = mask_to_rle_pytorch(pred_masks[:, 0] > 0)
+            out["pruned_pred_masks"] = ("rle", rles)
+        out["pred_masks"] = None
+
+    def _get_pred_masks(self, inference_state, out):
+        """
+        Get the mask logits of a compact output, restoring them if they have been
+        pruned. Masks kept as RLE come back as +/-PRUNED_MASK_LOGIT logits.
+        """
+        if out["pred_masks"] is not None or "pruned_pred_masks" not in out:
+            return out["pred_masks"]
+        kind, data = out["pruned_pred_masks"]
+        if kind == "disk":
+            pred_masks = inference_state["pruned_mask_store"].get(data)
+        else:
+            masks = np.stack([rle_to_mask(rle) for rle in data], axis=0)
+            masks = torch.from_numpy(masks)[:, None]
+            pred_masks = torch.where(masks, PRUNED_MASK_LOGIT, -PRUNED_MASK_LOGIT)
+        return pred_masks.to(inference_state["storage_device"])
+
+    @torch.inference_mode()
+    def get_frame_masks(self, inference_state, frame_idx):
+        """
+        Get the current masks of all objects on a frame at the original video
+        resolution, including frames whose outputs have been pruned. Returns
+        `(obj_ids, video_res_masks)`; objects without output on the frame get
+        NO_OBJ_SCORE.
+        """
+        consolidated_out = self._consolidate_temp_output_across_obj(
+            inference_state,
+            frame_idx,
+            is_cond=False,
+            consolidate_at_video_res=True,
+        )
+        _, video_res_masks = self._get_orig_video_res_output(
+            inference_state, consolidated_out["pred_masks_video_res"]
+        )
+        return inference_state["obj_ids"], video_res_masks
+
+    def _iter_frames_with_lookahead(self, inference_state, processing_order, k):
+        """
+        Yield the frames in `processing_order`, making sure the backbone features of
+        each frame are in the feature cache when it is yielded. The frames are encoded
+        in chunks of `k`, and the next chunk is encoded in a background thread while
+        the caller tracks the current one. The encoded features are held in a pending
+        dict (outside the cache budget) until their frame is yielded, so that they
+        can't be evicted from the cache before they are used.
+        """
+        cache = inference_state["cached_features"]
+        device = inference_state["device"]
+        streams = None
+        if device.type == "cuda":
+            # one long-lived side stream for the lookahead encoding, handing its
+            # results over to the stream the caller tracks on
+            streams = (torch.cuda.Stream(device=device), torch.cuda.current_stream(device))
+        output_dicts = inference_state["output_dict_per_obj"].values()
+
+        def _frames_to_encode(chunk):
+            # skip frames that are already cached, and frames where every object has
+            # a conditioning output (since no tracking is run on them)
+            return [
+                t
+                for t in chunk
+                if t not in cache
+                and not all(t in d["cond_frame_outputs"] for d in output_dicts)
+            ]
+
+        processing_order = list(processing_order)
+        chunks = [
+            processing_order[i : i + k] for i in range(0, len(processing_order), k)
+        ]
+        if len(chunks) == 0:
+            return
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(
+                self._encode_frames_async,
+                inference_state,
+                _frames_to_encode(chunks[0]),
+                streams,
+            )
+            for i, chunk in enumerate(chunks):
+                pending.update(future.result())
+                if i + 1 < len(chunks):
+                    # start encoding the next chunk while this one is being tracked
+                    future = executor.submit(
+                        self._encode_frames_async,
+                        inference_state,
+                        _frames_to_encode(chunks[i + 1]),
+                        streams,
+                    )
+                for t in chunk:
+                    entry = pending.pop(t, None)
+                    if entry is not None:
+                        cache.put(t, entry)
+                    yield t
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     @torch.inference_mode()
     def clear_all_prompts_in_frame(
         self, inference_state, frame_idx, obj_id, need_output=True
@@ -685,6 +1300,27 @@ class SAM2VideoPredictor(SAM2Base):
         inference_state["output_dict_per_obj"].clear()
         inference_state["temp_output_dict_per_obj"].clear()
         inference_state["frames_tracked_per_obj"].clear()
+        # the pruned masks of the removed outputs are no longer referenced; a temporary
+        # store is emptied (a store at `pruned_mask_path` is left to its owner)
+        store = inference_state["pruned_mask_store"]
+        if store is not None and store.is_temp:
+            store.clear()
+
+    def close_state(self, inference_state):
+        """
+        Release the resources held by an inference state that is no longer needed:
+        the frame loader's prefetch thread and buffered frames (when streaming video
+        frames), the cached backbone features and the pruned mask file (a temporary
+        file is deleted; a file at `pruned_mask_path` is only closed, since it belongs
+        to the caller). The state can't be used afterwards.
+        """
+        images = inference_state["images"]
+        if hasattr(images, "close"):
+            images.close()
+        inference_state["cached_features"].clear()
+        store = inference_state["pruned_mask_store"]
+        if store is not None:
+            store.close()
 
     def _reset_tracking_results(self, inference_state):
         """Reset all tracking inputs and results across the videos."""
@@ -701,20 +1337,117 @@ class SAM2VideoPredictor(SAM2Base):
         for v in inference_state["frames_tracked_per_obj"].values():
             v.clear()
 
+    @torch.inference_mode()
+    def prefill_feature_cache(
+        self, inference_state, start_frame_idx=0, end_frame_idx=None, batch_size=4
+    ):
+        """
+        Compute the backbone features on frames [start_frame_idx, end_frame_idx]
+        (inclusive) in batches of `batch_size` frames and add them to the feature
+        cache, so that later interactions and propagation on these frames skip the
+        image encoder. Prefilling stops early once the cache budget is reached (i.e.
+        when a frame prefilled in this call would be evicted again).
+
+        Returns the list of frame indices that are now in the cache.
+        """
+        cache = inference_state["cached_features"]
+        num_frames = inference_state["num_frames"]
+        if end_frame_idx is None:
+            end_frame_idx = num_frames - 1
+        end_frame_idx = min(end_frame_idx, num_frames - 1)
+        frame_inds = [
+            t for t in range(start_frame_idx, end_frame_idx + 1) if t not in cache
+        ]
+        prefilled = []
+        for i in range(0, len(frame_inds), batch_size):
+            batch_inds = frame_inds[i : i + batch_size]
+            for t, entry in self._encode_frames(inference_state, batch_inds):
+                cache.put(t, entry)
+                prefilled.append(t)
+            if any(t not in cache for t in prefilled):
+                warnings.warn(
+                    f"Feature cache budget reached after {len(cache)} frames; "
+                    f"stopped prefilling at frame {batch_inds[-1]}.",
+                    category=UserWarning,
+                    stacklevel=2,
+                )
+                break
+        return [t for t in prefilled if t in cache]
+
+    def _encode_frames(self, inference_state, frame_inds, peek=False):
+        """
+        Run the backbone on `frame_inds` in one batch and return a list of
+        `(frame_idx, (image, backbone_out))` cache entries. With `peek`, a streaming
+        frame loader is read without moving its prefetch cursor (for readers that are
+        not on the main thread, see `StreamingVideoFrameLoader.peek`).
+        """
+        if len(frame_inds) == 0:
+            return []
+        device = inference_state["device"]
+        frames = inference_state["images"]
+        get_frame = frames.peek if peek and hasattr(frames, "peek") else frames.__getitem__
+        images = torch.stack([get_frame(t) for t in frame_inds], dim=0)
+        images = images.to(device).float()
+        backbone_out = self.forward_image(images)
+        return [
+            (t, self._slice_backbone_out(images, backbone_out, b))
+            for b, t in enumerate(frame_inds)
+        ]
+
+    def _encode_frames_async(self, inference_state, frame_inds, streams=None):
+        """
+        Same as `_encode_frames`, but meant to run in a worker thread: it enters
+        inference mode (which is thread-local) and, on CUDA, runs the backbone on the
+        side stream of `streams = (side_stream, main_stream)` so that it overlaps
+        with the memory-dependent part of tracking on the main stream. The results
+        are synchronized and recorded on the main stream (so that the caching
+        allocator doesn't reuse their memory while the main stream still reads
+        them) before being returned. Frames are read with `peek=True`, so that this
+        thread and the main thread don't both move the frame loader's prefetch cursor.
+        """
+        with torch.inference_mode():
+            if streams is None:
+                return self._encode_frames(inference_state, frame_inds, peek=True)
+            side_stream, main_stream = streams
+            # the frames might have been written on the main stream
+            side_stream.wait_stream(main_stream)
+            with torch.cuda.stream(side_stream):
+                entries = self._encode_frames(inference_state, frame_inds, peek=True)
+            side_stream.synchronize()
+            _map_tensors(entries, lambda t: t.record_stream(main_stream))
+            return entries
+
+    @staticmethod
+    def _slice_backbone_out(images, backbone_out, b):
+        """
+        Take the `(image, backbone_out)` cache entry of the b-th frame out of a batched
+        backbone output. The features are copied so that each frame can be evicted
+        independently; the positional encodings are shared across frames and kept as
+        views.
+        """
+        fpn = [x[b : b + 1].clone() for x in backbone_out["backbone_fpn"]]
+        pos = [x[b : b + 1] for x in backbone_out["vision_pos_enc"]]
+        frame_backbone_out = {
+            "vision_features": fpn[-1],
+            "vision_pos_enc": pos,
+            "backbone_fpn": fpn,
+        }
+        return images[b : b + 1].clone(), frame_backbone_out
+
     def _get_image_feature(self, inference_state, frame_idx, batch_size):
         """Compute the image features on a given frame."""
         # Look up in the cache first
+        device = inference_state["device"]
         image, backbone_out = inference_state["cached_features"].get(
-            frame_idx, (None, None)
+            frame_idx, (None, None), device=device
         )
         if backbone_out is None:
             # Cache miss -- we will run inference on a single image
-            device = inference_state["device"]
             image = inference_state["images"][frame_idx].to(device).float().unsqueeze(0)
             backbone_out = self.forward_image(image)
-            # Cache the most recent frame's feature (for repeated interactions with
-            # a frame; we can use an LRU cache for more frames in the future).
-            inference_state["cached_features"] = {frame_idx: (image, backbone_out)}
+            # Cache the frame's feature (for repeated interactions with a frame); the
+            # least recently used frames are evicted once the cache is over budget.
+            inference_state["cached_features"].put(frame_idx, (image, backbone_out))
 
         # expand the features to have the same dimension as the number of objects
         expanded_image = image.expand(batch_size, -1, -1, -1)
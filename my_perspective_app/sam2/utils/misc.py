@@ -5,8 +5,11 @@
 # LICENSE file in the root directory of this source tree.
 
 import os
+import tempfile
 import warnings
-from threading import Thread
+import weakref
+from collections import OrderedDict
+from threading import Condition, Lock, Thread
 
 import numpy as np
 import torch
@@ -169,6 +172,435 @@ class AsyncVideoFrameLoader:
         return len(self.images)
 
 
+class StreamingVideoFrameLoader:
+    """
+    A list of video frames that are decoded on demand into a bounded ring buffer.
+
+    Unlike `AsyncVideoFrameLoader` (which eventually holds every frame), at most
+    `max_buffered_frames` frames are kept in memory, stored as uint8 at the model's
+    image size and normalized on the fly when accessed. A prefetch thread decodes
+    up to `max_buffered_frames // 2` frames ahead of the last accessed frame (in the
+    direction of access), so sequential access during tracking rarely waits on
+    decoding. Memory usage therefore does not depend on the video length.
+
+    The prefetch thread only holds a weak reference to the loader, so it exits once
+    the loader is closed (see `close`) or garbage collected.
+
+    Indexing moves the access cursor that the prefetch thread follows, so it should
+    only be done by one (sequential) reader. Other threads should use `peek`.
+
+    `read_frame(index)` should return the frame as a uint8 HxWx3 numpy array
+    resized to `image_size` x `image_size`, along with the original video height
+    and width.
+    """
+
+    def __init__(
+        self,
+        read_frame,
+        num_frames,
+        offload_video_to_cpu,
+        img_mean,
+        img_std,
+        compute_device,
+        max_buffered_frames=32,
+    ):
+        self.read_frame = read_frame
+        self.num_frames = num_frames
+        self.offload_video_to_cpu = offload_video_to_cpu
+        self.compute_device = compute_device
+        device = torch.device("cpu") if offload_video_to_cpu else compute_device
+        self.device = device
+        self.img_mean = img_mean.to(device)
+        self.img_std = img_std.to(device)
+        self.max_buffered_frames = max(2, max_buffered_frames)
+        self.prefetch_frames = self.max_buffered_frames // 2
+        # frame index -> uint8 tensor of shape (3, image_size, image_size)
+        self._buffer = OrderedDict()
+        self._cond = Condition()
+        # `read_frame` might not be thread-safe (e.g. for video file readers)
+        self._read_lock = Lock()
+        self._last_index = 0
+        self._direction = 1
+        self._closed = False
+        # catch and raise any exceptions in the prefetch thread
+        self.exception = None
+        self.video_height = None
+        self.video_width = None
+
+        # load the first frame to fill video_height and video_width
+        self._put(0, self._read(0))
+
+        self.thread = Thread(
+            target=self._prefetch_frames, args=(weakref.ref(self),), daemon=True
+        )
+        self.thread.start()
+
+    def _read(self, index):
+        with self._read_lock:
+            img_np, video_height, video_width = self.read_frame(index)
+        self.video_height = video_height
+        self.video_width = video_width
+        return torch.from_numpy(np.ascontiguousarray(img_np)).permute(2, 0, 1)
+
+    def _put(self, index, img):
+        with self._cond:
+            self._buffer[index] = img
+            self._buffer.move_to_end(index)
+            while len(self._buffer) > self.max_buffered_frames:
+                self._buffer.popitem(last=False)
+            self._cond.notify_all()
+
+    def _next_index_to_prefetch(self):
+        # called with `self._cond` held
+        for k in range(1, self.prefetch_frames + 1):
+            index = self._last_index + k * self._direction
+            if index < 0 or index >= self.num_frames:
+                return None
+            if index not in self._buffer:
+                return index
+        return None
+
+    @staticmethod
+    def _prefetch_frames(loader_ref, idle_timeout=0.5):
+        # only hold a strong reference to the loader while prefetching one frame (or
+        # waiting for at most `idle_timeout` seconds), so that it can be collected
+        while True:
+            loader = loader_ref()
+            if loader is None:
+                return
+            try:
+                if not loader._prefetch_one(idle_timeout):
+                    return
+            except Exception as e:
+                loader.exception = e
+                return
+            del loader
+
+    def _prefetch_one(self, timeout):
+        """Prefetch the next missing frame, if any. Returns False once closed."""
+        with self._cond:
+            index = self._next_index_to_prefetch()
+            if not self._closed and index is None:
+                self._cond.wait(timeout)
+                index = self._next_index_to_prefetch()
+            if self._closed:
+                return False
+            if index is None:
+                return True
+        img = self._read(index)
+        with self._cond:
+            # skip it if the access moved on while we were decoding this frame
+            if not self._closed and abs(index - self._last_index) <= self.prefetch_frames:
+                self._buffer[index] = img
+                while len(self._buffer) > self.max_buffered_frames:
+                    self._buffer.popitem(last=False)
+        return True
+
+    def _check_index(self, index):
+        if self.exception is not None:
+            raise RuntimeError("Failure in frame loading thread") from self.exception
+        if index < 0:
+            index += self.num_frames
+        if not 0 <= index < self.num_frames:
+            raise IndexError(f"frame index {index} out of range")
+        return index
+
+    def _normalize(self, img):
+        # normalize by mean and std
+        img = img.to(self.device, non_blocking=True).float() / 255.0
+        img -= self.img_mean
+        img /= self.img_std
+        return img
+
+    def peek(self, index):
+        """
+        Get frame `index` without moving the access cursor. A buffered frame is used
+        as is; otherwise the frame is decoded but not added to the buffer, so it can't
+        evict frames around the cursor. This is for readers other than the main one
+        (e.g. the lookahead encoding thread in `propagate_in_video`), which would
+        otherwise pull the prefetch thread back and forth between two positions.
+        """
+        index = self._check_index(index)
+        with self._cond:
+            img = self._buffer.get(index)
+        if img is None:
+            img = self._read(index)
+        return self._normalize(img)
+
+    def __getitem__(self, index):
+        index = self._check_index(index)
+
+        with self._cond:
+            if index != self._last_index:
+                self._direction = 1 if index > self._last_index else -1
+                self._last_index = index
+                self._cond.notify_all()
+            img = self._buffer.get(index)
+            if img is not None:
+                self._buffer.move_to_end(index)
+        if img is None:
+            img = self._read(index)
+            self._put(index, img)
+        return self._normalize(img)
+
+    def __len__(self):
+        return self.num_frames
+
+    def close(self):
+        """Stop the prefetch thread and release the buffered frames."""
+        with self._cond:
+            self._closed = True
+            self._buffer.clear()
+            self._cond.notify_all()
+
+    def __del__(self):
+        if hasattr(self, "_cond"):  # (not if __init__ failed early)
+            self.close()
+
+
+def _read_img_as_uint8(img_path, image_size):
+    img_pil = Image.open(img_path)
+    img_np = np.array(img_pil.convert("RGB").resize((image_size, image_size)))
+    if img_np.dtype != np.uint8:  # np.uint8 is expected for JPEG images
+        raise RuntimeError(f"Unknown image dtype: {img_np.dtype} on {img_path}")
+    video_width, video_height = img_pil.size  # the original video size
+    return img_np, video_height, video_width
+
+
+def _iter_tensors(obj):
+    """Yield all tensors in a (nested) tuple/list/dict structure."""
+    if isinstance(obj, torch.Tensor):
+        yield obj
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from _iter_tensors(v)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            yield from _iter_tensors(v)
+
+
+def _map_tensors(obj, fn, memo=None):
+    """
+    Apply `fn` to all tensors in a (nested) tuple/list/dict structure. A tensor that
+    appears several times in the structure is only mapped once (so aliasing is kept).
+    """
+    memo = {} if memo is None else memo
+    if isinstance(obj, torch.Tensor):
+        if id(obj) not in memo:
+            memo[id(obj)] = fn(obj)
+        return memo[id(obj)]
+    elif isinstance(obj, dict):
+        return {k: _map_tensors(v, fn, memo) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_map_tensors(v, fn, memo) for v in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_map_tensors(v, fn, memo) for v in obj)
+    return obj
+
+
+class FeatureCache:
+    """
+    An LRU cache of per-frame backbone outputs `{frame_idx: (image, backbone_out)}`
+    bounded by a byte budget.
+
+    Memory is accounted per underlying storage, so tensors shared between entries
+    (e.g. the positional encodings, which are the same on every frame) are only
+    counted once. The most recently added entry is always kept, even if it alone
+    exceeds the budget. If `offload_to_cpu` is True (and the features live on an
+    accelerator), entries evicted from the device are moved to a second LRU tier in
+    CPU memory (bounded by `offload_max_bytes`) and moved back on the next access.
+    """
+
+    def __init__(
+        self,
+        max_bytes=256 * 1024**2,
+        offload_to_cpu=False,
+        offload_max_bytes=1024**3,
+    ):
+        self.max_bytes = max_bytes
+        self.offload_to_cpu = offload_to_cpu
+        self.offload_max_bytes = offload_max_bytes
+        self._entries = OrderedDict()  # entries on the original (compute) device
+        self._offloaded = OrderedDict()  # entries offloaded to CPU memory
+        # storage pointer -> [reference count, nbytes], one dict per tier
+        self._storages = {}
+        self._offloaded_storages = {}
+
+    @staticmethod
+    def _storage_keys(value):
+        keys = {}
+        for t in _iter_tensors(value):
+            storage = t.untyped_storage()
+            keys[storage.data_ptr()] = storage.nbytes()
+        return keys
+
+    @staticmethod
+    def _add_refs(storages, value):
+        for ptr, nbytes in FeatureCache._storage_keys(value).items():
+            ref = storages.setdefault(ptr, [0, nbytes])
+            ref[0] += 1
+
+    @staticmethod
+    def _remove_refs(storages, value):
+        for ptr in FeatureCache._storage_keys(value):
+            ref = storages[ptr]
+            ref[0] -= 1
+            if ref[0] == 0:
+                del storages[ptr]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the entries on the compute device."""
+        return sum(nbytes for _, nbytes in self._storages.values())
+
+    @property
+    def offloaded_nbytes(self):
+        """Bytes held by the entries offloaded to CPU memory."""
+        return sum(nbytes for _, nbytes in self._offloaded_storages.values())
+
+    def __len__(self):
+        return len(self._entries) + len(self._offloaded)
+
+    def __contains__(self, frame_idx):
+        return frame_idx in self._entries or frame_idx in self._offloaded
+
+    def keys(self):
+        return list(self._entries) + list(self._offloaded)
+
+    def items(self):
+        """All `(frame_idx, value)` pairs (without changing the LRU order)."""
+        return list(self._entries.items()) + list(self._offloaded.items())
+
+    def get(self, frame_idx, default=None, device=None):
+        """
+        Look up a frame and mark it as most recently used. Entries offloaded to CPU
+        are moved back to `device` (and into the device tier) before returning.
+        """
+        value = self._entries.get(frame_idx)
+        if value is not None:
+            self._entries.move_to_end(frame_idx)
+            return value
+        value = self._offloaded.pop(frame_idx, None)
+        if value is None:
+            return default
+        self._remove_refs(self._offloaded_storages, value)
+        if device is not None:
+            value = _map_tensors(value, lambda t: t.to(device, non_blocking=True))
+        self.put(frame_idx, value)
+        return value
+
+    def put(self, frame_idx, value):
+        """Add (or replace) a frame's entry and evict the least recently used ones."""
+        self.pop(frame_idx)
+        self._entries[frame_idx] = value
+        self._add_refs(self._storages, value)
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            old_idx, old_value = self._entries.popitem(last=False)
+            self._remove_refs(self._storages, old_value)
+            self._offload(old_idx, old_value)
+
+    def pop(self, frame_idx, default=None):
+        value = self._entries.pop(frame_idx, None)
+        if value is not None:
+            self._remove_refs(self._storages, value)
+            return value
+        value = self._offloaded.pop(frame_idx, None)
+        if value is not None:
+            self._remove_refs(self._offloaded_storages, value)
+            return value
+        return default
+
+    def clear(self):
+        self._entries.clear()
+        self._offloaded.clear()
+        self._storages.clear()
+        self._offloaded_storages.clear()
+
+    def _offload(self, frame_idx, value):
+        if not self.offload_to_cpu or self.offload_max_bytes <= 0:
+            return
+        # only move the storages that are private to this entry; storages still
+        # referenced by other entries on the device (e.g. the positional encodings)
+        # are constants that we keep in place instead of copying them once per frame
+        shared = self._storages
+        value = _map_tensors(
+            value,
+            lambda t: (
+                t
+                if t.device.type == "cpu" or t.untyped_storage().data_ptr() in shared
+                else t.to("cpu")
+            ),
+        )
+        self._offloaded[frame_idx] = value
+        self._add_refs(self._offloaded_storages, value)
+        while len(self._offloaded) > 1 and self.offloaded_nbytes > self.offload_max_bytes:
+            _, old_value = self._offloaded.popitem(last=False)
+            self._remove_refs(self._offloaded_storages, old_value)
+
+
+class MaskLogitsDiskStore:
+    """
+    An append-only file of float16 mask logits, used to keep the predicted masks of
+    frames that were pruned from the in-memory inference state. `put` returns a key
+    that `get` uses to read the masks back. With `truncate=False`, an existing file
+    is opened for reading and appending (e.g. when resuming a saved inference state).
+
+    The storage is lossy: masks are rounded to float16 by `put` (about 3 significant
+    digits, with magnitudes below ~6e-8 flushed to zero) and `get` returns them as
+    float32, so read-back logits are not bit-identical to the ones that were stored.
+
+    If `path` is None, the store owns a temporary file: it is deleted on `close` (or
+    when the store is garbage collected). A file at a given `path` belongs to the
+    caller and is never deleted by the store.
+    """
+
+    def __init__(self, path=None, truncate=True):
+        self.is_temp = path is None
+        if self.is_temp:
+            fd, path = tempfile.mkstemp(prefix="sam2_masks_", suffix=".bin")
+            os.close(fd)
+        self.path = path
+        self._file = open(path, "w+b" if truncate else "r+b")
+        # whether there are buffered writes that `get` has to flush before reading
+        self._dirty = False
+
+    def put(self, mask_logits):
+        arr = mask_logits.detach().to("cpu", torch.float16).numpy()
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(arr.tobytes())
+        self._dirty = True
+        return offset, tuple(arr.shape)
+
+    def flush(self):
+        if self._dirty:
+            self._file.flush()
+            self._dirty = False
+
+    def get(self, key):
+        offset, shape = key
+        self.flush()  # only flushes once after a batch of `put`s
+        self._file.seek(offset)
+        count = int(np.prod(shape))
+        buf = self._file.read(count * np.dtype(np.float16).itemsize)
+        arr = np.frombuffer(buf, dtype=np.float16, count=count).reshape(shape)
+        return torch.from_numpy(arr.astype(np.float32))
+
+    def clear(self):
+        """Drop all stored masks (the keys returned so far become invalid)."""
+        self._file.seek(0)
+        self._file.truncate()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            if self.is_temp and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __del__(self):
+        if hasattr(self, "_file"):  # (not if __init__ failed early)
+            self.close()
+
+
 def load_video_frames(
     video_path,
     image_size,
@@ -177,10 +609,16 @@ def load_video_frames(
     img_std=(0.229, 0.224, 0.225),
     async_loading_frames=False,
     compute_device=torch.device("cuda"),
+    stream_frames=False,
+    max_buffered_frames=32,
 ):
     """
     Load the video frames from video_path. The frames are resized to image_size as in
     the model and are loaded to GPU if offload_video_to_cpu=False. This is used by the demo.
+
+    If `stream_frames` is True, the frames are decoded on demand into a ring buffer
+    of `max_buffered_frames` frames (see `StreamingVideoFrameLoader`) instead of
+    being loaded all at once.
     """
     is_bytes = isinstance(video_path, bytes)
     is_str = isinstance(video_path, str)
@@ -193,6 +631,8 @@ def load_video_frames(
             img_mean=img_mean,
             img_std=img_std,
             compute_device=compute_device,
+            stream_frames=stream_frames,
+            max_buffered_frames=max_buffered_frames,
         )
     elif is_str and os.path.isdir(video_path):
         return load_video_frames_from_jpg_images(
@@ -203,6 +643,8 @@ def load_video_frames(
             img_std=img_std,
             async_loading_frames=async_loading_frames,
             compute_device=compute_device,
+            stream_frames=stream_frames,
+            max_buffered_frames=max_buffered_frames,
         )
     else:
         raise NotImplementedError(
@@ -218,6 +660,8 @@ def load_video_frames_from_jpg_images(
     img_std=(0.229, 0.224, 0.225),
     async_loading_frames=False,
     compute_device=torch.device("cuda"),
+    stream_frames=False,
+    max_buffered_frames=32,
 ):
     """
     Load the video frames from a directory of JPEG files ("<frame_index>.jpg" format).
@@ -225,7 +669,9 @@ def load_video_frames_from_jpg_images(
     The frames are resized to image_size x image_size and are loaded to GPU if
     `offload_video_to_cpu` is `False` and to CPU if `offload_video_to_cpu` is `True`.
 
-    You can load a frame asynchronously by setting `async_loading_frames` to `True`.
+    You can load a frame asynchronously by setting `async_loading_frames` to `True`,
+    or decode frames on demand into a bounded buffer by setting `stream_frames` to
+    `True`.
     """
     if isinstance(video_path, str) and os.path.isdir(video_path):
         jpg_folder = video_path
@@ -253,6 +699,18 @@ def load_video_frames_from_jpg_images(
     img_mean = torch.tensor(img_mean, dtype=torch.float32)[:, None, None]
     img_std = torch.tensor(img_std, dtype=torch.float32)[:, None, None]
 
+    if stream_frames:
+        lazy_images = StreamingVideoFrameLoader(
+            lambda index: _read_img_as_uint8(img_paths[index], image_size),
+            num_frames,
+            offload_video_to_cpu,
+            img_mean,
+            img_std,
+            compute_device,
+            max_buffered_frames=max_buffered_frames,
+        )
+        return lazy_images, lazy_images.video_height, lazy_images.video_width
+
     if async_loading_frames:
         lazy_images = AsyncVideoFrameLoader(
             img_paths,
@@ -284,6 +742,8 @@ def load_video_frames_from_video_file(
     img_mean=(0.485, 0.456, 0.406),
     img_std=(0.229, 0.224, 0.225),
     compute_device=torch.device("cuda"),
+    stream_frames=False,
+    max_buffered_frames=32,
 ):
     """Load the video frames from a video file."""
     import decord
@@ -293,6 +753,19 @@ def load_video_frames_from_video_file(
     # Get the original video height and width
     decord.bridge.set_bridge("torch")
     video_height, video_width, _ = decord.VideoReader(video_path).next().shape
+    if stream_frames:
+        # decode the frames by random access into a bounded buffer
+        reader = decord.VideoReader(video_path, width=image_size, height=image_size)
+        lazy_images = StreamingVideoFrameLoader(
+            lambda index: (reader[index].numpy(), video_height, video_width),
+            len(reader),
+            offload_video_to_cpu,
+            img_mean,
+            img_std,
+            compute_device,
+            max_buffered_frames=max_buffered_frames,
+        )
+        return lazy_images, video_height, video_width
     # Iterate over all frames in the video
     images = []
     for frame in decord.VideoReader(video_path, width=image_size, height=image_size):
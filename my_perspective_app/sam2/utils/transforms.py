@@ -4,22 +4,39 @@
 # This source code is licensed under the license found in the
 # LICENSE file in the root directory of this source tree.
 
+import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from PIL import Image
 from torchvision.transforms import Normalize, Resize, ToTensor
 
 
 class SAM2Transforms(nn.Module):
     def __init__(
-        self, resolution, mask_threshold, max_hole_area=0.0, max_sprinkle_area=0.0
+        self,
+        resolution,
+        mask_threshold,
+        max_hole_area=0.0,
+        max_sprinkle_area=0.0,
+        fast_uint8_preprocess=False,
     ):
         """
         Transforms for SAM2.
+
+        If `fast_uint8_preprocess` is True, 8-bit RGB images are resized in uint8 with
+        PIL before being normalized (see `_resize_uint8`), instead of being converted
+        to a full resolution float tensor first. This is faster and uses less memory,
+        but the model input is not bit-identical to the default path (PIL's bilinear
+        filter and the uint8 rounding differ slightly from the torchvision resize);
+        see `other/check_sam2_transforms.py` for a comparison on real images.
         """
         super().__init__()
+        self.fast_uint8_preprocess = fast_uint8_preprocess
         self.resolution = resolution
         self.mask_threshold = mask_threshold
         self.max_hole_area = max_hole_area
@@ -33,15 +50,61 @@ class SAM2Transforms(nn.Module):
                 Normalize(self.mean, self.std),
             )
         )
+        # mean/std on the [0, 255] scale, to normalize uint8 images in one op
+        self._mean_255 = torch.tensor(self.mean).view(3, 1, 1) * 255.0
+        self._std_255 = torch.tensor(self.std).view(3, 1, 1) * 255.0
 
     def __call__(self, x):
+        if self.fast_uint8_preprocess and self._is_uint8_rgb(x):
+            return self._normalize_uint8(self._resize_uint8(x)[None])[0]
         x = self.to_tensor(x)
         return self.transforms(x)
 
-    def forward_batch(self, img_list):
-        img_batch = [self.transforms(self.to_tensor(img)) for img in img_list]
-        img_batch = torch.stack(img_batch, dim=0)
-        return img_batch
+    def forward_batch(self, img_list, num_workers=None):
+        """
+        Transform a list of images into a Bx3xHxW batch. With `fast_uint8_preprocess`,
+        8-bit RGB images are resized in uint8 (in `num_workers` threads, by default one
+        per image up to the CPU count) and then normalized together in one op;
+        otherwise (or for other images) they go through the float path of `__call__`
+        one by one.
+        """
+        if not (
+            self.fast_uint8_preprocess
+            and all(self._is_uint8_rgb(img) for img in img_list)
+        ):
+            img_batch = [self.transforms(self.to_tensor(img)) for img in img_list]
+            return torch.stack(img_batch, dim=0)
+
+        if num_workers is None:
+            num_workers = min(len(img_list), os.cpu_count() or 1)
+        if num_workers > 1:
+            # PIL releases the GIL while resizing, so the threads run in parallel
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                resized = list(executor.map(self._resize_uint8, img_list))
+        else:
+            resized = [self._resize_uint8(img) for img in img_list]
+        return self._normalize_uint8(np.stack(resized, axis=0))
+
+    @staticmethod
+    def _is_uint8_rgb(img):
+        if isinstance(img, np.ndarray):
+            return img.dtype == np.uint8 and img.ndim == 3 and img.shape[2] == 3
+        return isinstance(img, Image.Image) and img.mode == "RGB"
+
+    def _resize_uint8(self, img):
+        """
+        Resize an 8-bit RGB image to the model resolution before converting it to
+        float, so that a full resolution float copy of the image is never made.
+        """
+        if isinstance(img, np.ndarray):
+            img = Image.fromarray(img)
+        img = img.resize((self.resolution, self.resolution), Image.BILINEAR)
+        return np.array(img)
+
+    def _normalize_uint8(self, img_batch):
+        """Normalize a BxHxWx3 uint8 array into a Bx3xHxW float tensor."""
+        img_batch = torch.from_numpy(img_batch).permute(0, 3, 1, 2)
+        return (img_batch.float() - self._mean_255) / self._std_255
 
     def transform_coords(
         self, coords: torch.Tensor, normalize=False, orig_hw=None
@@ -76,6 +139,10 @@ class SAM2Transforms(nn.Module):
     def postprocess_masks(self, masks: torch.Tensor, orig_hw) -> torch.Tensor:
         """
         Perform PostProcessing on output masks.
+
+        Hole/sprinkle removal runs on the low resolution logits; the result is
+        then bilinearly upsampled to `orig_hw`, which may be any (H, W) with
+        the original image's aspect ratio (e.g. a display size).
         """
         from sam2.utils.misc import get_connected_components
 
@@ -9,46 +9,102 @@ from PySide6.QtCore import Qt
 
 from sam2.build_sam import build_sam2
 from sam2.sam2_image_predictor import SAM2ImagePredictor
+from sam2.sam2_exported_predictor import SAM2ExportedPredictor
 
 
 # ----- 全局变量：SAM2 模型 & 预测器 -----
 _sam2_predictor = None
 _sam2_inited = False
 
+def _env_int(name, default):
+    """
+    读取整数环境变量；未设置或格式不对时返回 default（格式不对会打印警告）。
+    在用到时才读，不在 import 时解析。
+    """
+    val_str = os.environ.get(name, "").strip()
+    if not val_str:
+        return default
+    try:
+        return int(val_str)
+    except ValueError:
+        print(f"[WARNING] invalid {name}={val_str!r}, expected an integer; using {default}.")
+        return default
+
 def _init_sam2_model(
     checkpoint_path: str = "sam2/checkpoints/sam2.1_hiera_large.pt",
     config_path: str = "sam2/checkpoints/sam2.1_hiera_large.yaml",
-    device_str: str = "cuda"
+    device_str: str = "cuda",
+    compile_model: bool = None,
+    compile_cache_dir: str = "sam2/compile_cache",
+    exported_model_dir: str = None,
+    num_threads: int = None,
 ):
     """
     只在第一次需要时加载SAM2模型。
     checkpoint_path, config_path 根据你实际路径做调整。
+
+    compile_model: 是否用 torch.compile 编译编码器 / 解码器（默认关闭，可用环境变量 SAM2_COMPILE=1 打开）。
+      首次编译较慢（会在加载时用固定尺寸的假图预热），编译结果缓存在 compile_cache_dir，之后启动可复用。
+    exported_model_dir: other/export_sam2.py 导出的目录（TorchScript / ONNX）。
+      给出且存在时，改用 SAM2ExportedPredictor 在 CPU 上推理，不再构建 PyTorch 模型、不加载 checkpoint。
+      也可用环境变量 SAM2_EXPORTED_DIR 指定。
+    num_threads: 导出模型推理用的 CPU 线程数（0 = 运行时默认），也可用环境变量 SAM2_NUM_THREADS 指定。
     """
     global _sam2_predictor, _sam2_inited
 
     if _sam2_inited:
         return  # 已经加载过，直接返回
 
+    # 未显式给出的参数取环境变量（调用时才读取）
+    if compile_model is None:
+        compile_model = _env_int("SAM2_COMPILE", 0) == 1
+    if exported_model_dir is None:
+        exported_model_dir = os.environ.get("SAM2_EXPORTED_DIR", "")
+    if num_threads is None:
+        num_threads = _env_int("SAM2_NUM_THREADS", 0)
+
     if build_sam2 is None or SAM2ImagePredictor is None:
         print("[WARNING] sam2 not installed or import failed. Will use fallback logic.")
         _sam2_inited = True
         return
     
+    # 导出模型后端：直接加载导出的图，跳过 hydra 构建 + checkpoint 加载
+    if exported_model_dir and os.path.isdir(exported_model_dir):
+        print(f"[INFO] Loading exported SAM2 model from {exported_model_dir} ...")
+        _sam2_predictor = SAM2ExportedPredictor(exported_model_dir, num_threads=num_threads or None)
+        _sam2_inited = True
+        print("[INFO] Exported SAM2 model loaded successfully.")
+        return
+
     # 根据官方示例加载
     print("[INFO] Initializing SAM2 model ...")
     import torch
 
-    sam2_model = build_sam2(config_path, checkpoint_path, device=torch.device(device_str))
+    # fast_load: meta device 上构建 + mmap 加载 checkpoint，省掉随机初始化和整份权重的拷贝
+    timings = {}
+    sam2_model = build_sam2(config_path, checkpoint_path, device=torch.device(device_str),
+                            fast_load=True, timings=timings)
+    print("[INFO] SAM2 build timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
     _sam2_predictor = SAM2ImagePredictor(sam2_model)
+    if compile_model:
+        print("[INFO] Compiling SAM2 model (first run may take a few minutes) ...")
+        _sam2_predictor.compile_model(cache_dir=compile_cache_dir)
     _sam2_inited = True
     print("[INFO] SAM2 model initialized successfully.")
 
-def fake_mask_generator(image_item):
+def fake_mask_generator(image_item, output_size=None):
     """
     供外部调用的统一函数：
       - 若尚未加载SAM2模型，则先调用 _init_sam2_model()
       - 从 image_item.image_path 中读图 => 解析 image_item.sam2_marks => 生成 mask => 转成 QPixmap
       - 返回 QPixmap (若sam2不可用，就返回一个随机半透明覆盖)
+
+    output_size: (w, h) 或 None。
+      给出(且小于原图)时，低分辨率 logits 直接上采样到该尺寸，RGBA 也只按该尺寸构建，
+      只用于预览显示；之后缩放可用 rescale_mask_pixmap() 按新尺寸重建。
+      None => 原图分辨率。任何要保存 / 导出的 mask 都必须用 None 生成。
+
+    同时把最佳 mask 的低分辨率 logits 记到 image_item.mask_logits。
     """
 
     # 0) 确保SAM2已经初始化
@@ -63,6 +119,8 @@ def fake_mask_generator(image_item):
     pil_img = Image.open(image_item.image_path).convert("RGB")
     image_np = np.array(pil_img)
     h, w, _ = image_np.shape
+    out_w, out_h = _capped_output_size(output_size, w, h)
+    image_item.mask_logits = None
 
     # 2) 解析 image_item.sam2_marks => 构造 SAM2 的 point_coords, point_labels, boxes
     #    我们只演示 pos/neg 点，框暂不详细处理(若你要可自行添加).
@@ -91,31 +149,67 @@ def fake_mask_generator(image_item):
     _sam2_predictor.set_image(image_np)
     if len(point_coords) == 0:
         # 若没有点 => 直接返回空pixmap
-        return _make_transparent_mask(w,h)
+        return _make_transparent_mask(out_w, out_h)
 
-    masks, scores, _ = _sam2_predictor.predict(
+    masks, scores, low_res = _sam2_predictor.predict(
         point_coords=point_coords,
         point_labels=point_labels,
         # box=xxx, # 如果你还想传 box
-        multimask_output=False
+        multimask_output=False,
+        output_hw=(out_h, out_w),
     )
     # masks.shape => (#masks, h, w)
     # scores.shape => (#masks,)
 
     if len(masks) == 0:
         # 没预测到 => return a transparent
-        return _make_transparent_mask(w,h)
+        return _make_transparent_mask(out_w, out_h)
 
     # 4) 选score最高的
     best_idx = np.argmax(scores)
     best_mask = masks[best_idx]  # (h,w) bool/float
+    image_item.mask_logits = (low_res[best_idx], (h, w))
 
     # 5) 转成 QPixmap (RGBA)
     color_mask_rgba = _build_rgba_mask(best_mask)
-    qimg = QImage(color_mask_rgba.data, w, h, QImage.Format_RGBA8888)
+    qimg = QImage(color_mask_rgba.data, out_w, out_h, QImage.Format_RGBA8888)
     qpix = QPixmap.fromImage(qimg)
     return qpix
 
+def rescale_mask_pixmap(image_item, output_size=None):
+    """
+    用 image_item.mask_logits（fake_mask_generator 记下的低分辨率 logits）按新尺寸重建 mask QPixmap，
+    只做上采样 + 阈值，不重新读图、不跑编码器 / 解码器，缩放预览时足够快。
+
+    output_size: (w, h) 或 None，规则同 fake_mask_generator（不超过原图；None => 原图分辨率）。
+    没有 logits（还没生成过 / SAM2 不可用）时返回 None。
+    logits 在预测时被截断到 ±32，个别边缘像素可能与直接预测的结果略有不同。
+    """
+    if image_item.mask_logits is None or _sam2_predictor is None:
+        return None
+    import torch
+
+    logits, (h, w) = image_item.mask_logits
+    out_w, out_h = _capped_output_size(output_size, w, h)
+    masks = _sam2_predictor._transforms.postprocess_masks(
+        torch.as_tensor(logits)[None, None], (out_h, out_w)
+    )
+    best_mask = (masks[0, 0] > _sam2_predictor.mask_threshold).numpy()
+
+    color_mask_rgba = _build_rgba_mask(best_mask)
+    qimg = QImage(color_mask_rgba.data, out_w, out_h, QImage.Format_RGBA8888)
+    return QPixmap.fromImage(qimg)
+
+def _capped_output_size(output_size, w, h):
+    """
+    输出尺寸：只在比原图小时才缩小，放大显示时仍用原图分辨率
+    """
+    if output_size is not None:
+        req_w, req_h = max(1, int(output_size[0])), max(1, int(output_size[1]))
+        if req_w < w and req_h < h:
+            return req_w, req_h
+    return w, h
+
 # ---------------------------------------------------------------------------
 # 内部辅助：若sam2不可用，就返回一个随机半透明覆盖
 # ---------------------------------------------------------------------------
@@ -47,6 +47,10 @@ class MainWindow(QWidget):
         file_menu.addAction(self.action_save_to_folder)
         file_menu.addAction(self.action_force_sync_folder)
 
+        # 批量导出透视矫正后的图片
+        self.action_export_rectified = QAction("导出透视矫正图片", self)
+        file_menu.addAction(self.action_export_rectified)
+
         file_menu.addSeparator()
 
         # === 新增：加载配置文件 ===
@@ -5,7 +5,7 @@ from PySide6.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
     QScrollArea, QComboBox,QMessageBox
 )
-from PySide6.QtCore import Signal, Qt, QMimeData, QPoint
+from PySide6.QtCore import Signal, Qt, QMimeData, QPoint, QRect
 from PySide6.QtGui import (
     QPixmap, QPainter, QPen, QColor,
     QDragEnterEvent, QDropEvent, QWheelEvent, QMouseEvent
@@ -13,9 +13,11 @@ from PySide6.QtGui import (
 from models.transform_params import TransformParams
 from controllers.shape_transform_controller import ShapeTransformController
 from .thumbnail_bar import ThumbnailBar
+from .rectified_preview import RectifiedPreviewPane
 from overlays.perspective_overlay import PerspectiveOverlay
 from overlays.sam2_overlay import Sam2Overlay
-from sam2_mask_generator import fake_mask_generator
+from overlays.base_overlay import draw_scaled_pixmap
+from sam2_mask_generator import fake_mask_generator, rescale_mask_pixmap
 
 
 class PreviewLabel(QLabel):
@@ -24,6 +26,8 @@ class PreviewLabel(QLabel):
       - 显示图像(可滚轮缩放)
       - 若有 current_overlay，则将 paintEvent / mouseEvent 代理给它
     """
+    # 用户缩放(滚轮 / 重置)后发出
+    scale_changed = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -41,6 +45,10 @@ class PreviewLabel(QLabel):
 
         self.current_overlay = None  # 可以设置成PerspectiveOverlay()等
 
+        # 缩小显示时的缩放图缓存：(pixmap.cacheKey(), w, h) => QPixmap
+        self._scaled_cache_key = None
+        self._scaled_cache = None
+
     def set_overlay(self, overlay):
         """切换当前使用的Overlay对象(None表示不加载任何标记)"""
         self.current_overlay = overlay
@@ -72,36 +80,57 @@ class PreviewLabel(QLabel):
 
         self.resize(scaled_w, scaled_h)
 
+    def scaled_size(self):
+        """
+        图像实际绘制的尺寸 (scaled_w, scaled_h)。
+        label 有最小尺寸，图很小时 label 会比图大，overlay 的绘制坐标以这个尺寸为准。
+        """
+        return int(self.original_width * self.scale_factor), int(self.original_height * self.scale_factor)
+
     # -------------- 核心绘制 --------------
     def paintEvent(self, event):
         """
         先手动绘制 scaled_pixmap，然后(若 overlay_visible)再叠加四点和连线。
+        只重绘脏区域：overlay 拖动时只 update 变化的区域(可能由多个矩形组成)。
         """
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing, True)
+        dirty_rect = event.rect()
 
         if self.original_pixmap:
             # 1) 根据 scale_factor 计算图像的绘制尺寸
-            scaled_w = int(self.original_width * self.scale_factor)
-            scaled_h = int(self.original_height * self.scale_factor)
-
-            # 2) 将原图缩放成 scaled_pixmap
-            scaled_pixmap = self.original_pixmap.scaled(
-                scaled_w, scaled_h,
-                Qt.KeepAspectRatio,     # 保持宽高比
-                Qt.SmoothTransformation # 平滑缩放
-            )
-            # 3) 画到左上角(0,0)，或你可居中也行
-            painter.drawPixmap(0, 0, scaled_pixmap)
-
-            # 4) 如果有 Overlay，就让它绘制
+            scaled_w, scaled_h = self.scaled_size()
+
+            # 2) 只画脏区域内的图像(逐个矩形)，画到左上角(0,0)
+            for rect in event.region():
+                if self.scale_factor < 1.0:
+                    # 缩小：缩放图不比原图大，缓存一份(平滑缩放)，按脏区域 1:1 拷贝
+                    target = rect.intersected(QRect(0, 0, scaled_w, scaled_h))
+                    painter.drawPixmap(target, self._get_scaled_pixmap(scaled_w, scaled_h), target)
+                else:
+                    # 放大：缩放图可能有上万像素宽，直接从原图插值出脏区域
+                    draw_scaled_pixmap(painter, self.original_pixmap, scaled_w, scaled_h, rect)
+
+            # 3) 如果有 Overlay，就让它绘制
             if self.current_overlay:
-                self.current_overlay.paint_overlay(painter, scaled_w, scaled_h)
+                self.current_overlay.paint_overlay(painter, scaled_w, scaled_h, dirty_rect)
         else:
             painter.drawText(self.rect(), Qt.AlignCenter, "无图片")
 
         painter.end()
 
+    def _get_scaled_pixmap(self, scaled_w, scaled_h):
+        """缩小显示用的缩放图；原图或尺寸变化时才重新生成"""
+        key = (self.original_pixmap.cacheKey(), scaled_w, scaled_h)
+        if key != self._scaled_cache_key:
+            self._scaled_cache = self.original_pixmap.scaled(
+                scaled_w, scaled_h,
+                Qt.KeepAspectRatio,     # 保持宽高比
+                Qt.SmoothTransformation # 平滑缩放
+            )
+            self._scaled_cache_key = key
+        return self._scaled_cache
+
     # -------------- 鼠标事件 --------------
     def mousePressEvent(self, event):
         if self.current_overlay:
@@ -136,12 +165,14 @@ class PreviewLabel(QLabel):
         # 每次滚轮都更新 label 大小
         self._update_size()
         self.update()
+        self.scale_changed.emit()
         event.accept()
 
     def reset_scale_factor(self):
         self.scale_factor = 1.0
         self._update_size()
         self.update()
+        self.scale_changed.emit()
 
 class PreviewWidget(QWidget):
     """
@@ -181,6 +212,7 @@ class PreviewWidget(QWidget):
 
         self.preview_label = PreviewLabel(self.scroll_area)
         self.scroll_area.setWidget(self.preview_label)
+        self.preview_label.scale_changed.connect(self._upsample_mask_for_display)
 
         # 2) 按钮区域
         self.btn_prev = QPushButton("上一张")
@@ -234,7 +266,13 @@ class PreviewWidget(QWidget):
         self.setLayout(main_layout)
 
         # 放入 scroll_area 而不是直接放 preview_label
-        main_layout.addWidget(self.scroll_area, stretch=1)
+        # 右侧是透视模式下的矫正预览(其它模式隐藏)
+        self.rectified_preview = RectifiedPreviewPane(self)
+        self.rectified_preview.hide()
+        view_layout = QHBoxLayout()
+        view_layout.addWidget(self.scroll_area, stretch=1)
+        view_layout.addWidget(self.rectified_preview, stretch=0)
+        main_layout.addLayout(view_layout, stretch=1)
 
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.btn_prev)
@@ -265,6 +303,9 @@ class PreviewWidget(QWidget):
         # 根据模式，决定是否启用“保存”按钮
         # self.btn_actions.setEnabled(new_mode == "perspective")
 
+        # 矫正预览只在透视模式下显示
+        self.rectified_preview.setVisible(new_mode == "perspective")
+
         # 动态切换 PreviewLabel 的 overlay 对象
         if new_mode == "none":
             self.preview_label.set_overlay(None)
@@ -278,7 +319,13 @@ class PreviewWidget(QWidget):
                 self.perspective_overlay.overlay_params_changed_signal.connect(
                     self._on_overlay_params_changed
                 )
+                self.perspective_overlay.corners_moved_signal.connect(
+                    self.rectified_preview.schedule_update
+                )
             self.preview_label.set_overlay(self.perspective_overlay)
+            self.rectified_preview.set_image_item(
+                getattr(self, "current_image", None), self.preview_label.original_pixmap
+            )
 
         elif new_mode == "sam2":
             if not self.sam2_overlay:
@@ -299,6 +346,9 @@ class PreviewWidget(QWidget):
         来自某个overlay的参数变化。如 overlay_type="perspective", data=[(x1,y1),...].
         我们再往外发射
         """
+        if overlay_type == "perspective":
+            # 松开鼠标后立即按最终角点刷新一次预览
+            self.rectified_preview.refresh_now()
         self.overlay_params_changed_signal.emit(overlay_type, data)
 
     # ------------------- 对外方法 -------------------
@@ -312,6 +362,7 @@ class PreviewWidget(QWidget):
             # 若有 perspective_overlay，需要 set_image_item(None)
             if self.perspective_overlay:
                 self.perspective_overlay.set_image_item(None)
+            self.rectified_preview.set_image_item(None)
             return
 
         # 加载原图
@@ -332,9 +383,14 @@ class PreviewWidget(QWidget):
                 self.perspective_overlay.overlay_params_changed_signal.connect(
                     self._on_overlay_params_changed
                 )
+                self.perspective_overlay.corners_moved_signal.connect(
+                    self.rectified_preview.schedule_update
+                )
                 self.preview_label.set_overlay(self.perspective_overlay)
             else:
                 self.perspective_overlay.set_image_item(image_item)
+            # 复用刚加载的原图生成代理图，不再读盘
+            self.rectified_preview.set_image_item(image_item, self.preview_label.original_pixmap)
 
         elif self.current_overlay_mode == "sam2":
             if not self.sam2_overlay:
@@ -348,6 +404,7 @@ class PreviewWidget(QWidget):
                 self.sam2_overlay.set_image_item(image_item)
 
         self.current_image = image_item  # 记住当前图
+        self._upsample_mask_for_display()
         self.preview_label.update()
 
     # ------------------- 保存 -------------------
@@ -380,6 +437,7 @@ class PreviewWidget(QWidget):
             self._refresh_mask_for_image_item(image_item)
         else:
             image_item.mask_visible = True
+            self._upsample_mask_for_display()
 
         self.preview_label.update()  # 重绘
     
@@ -411,14 +469,35 @@ class PreviewWidget(QWidget):
         """
         这里调用“mask generator”占位逻辑:
          - 传入 image_item (包括sam2_marks)
-         - 生成一个与原图相同大小, 并随机颜色的 QPixmap
-         - 赋给 image_item.mask_pixmap
+         - 生成一个与当前显示尺寸相同(不超过原图)的 QPixmap，
+           预览刷新时不必构建原图分辨率的 mask；之后放大由 _upsample_mask_for_display 重建
+         - 赋给 image_item.mask_pixmap（仅供显示，要保存的 mask 需用 output_size=None 另行生成）
          - set mask_visible = True
         """
-        pix = fake_mask_generator(image_item)
+        pix = fake_mask_generator(image_item, output_size=self.preview_label.scaled_size())
         image_item.mask_pixmap = pix
         image_item.mask_visible = True
         QMessageBox.information(self, "提示", "mask已更新完成")
+
+    def _upsample_mask_for_display(self):
+        """
+        缩放 / 切图后，若当前显示的 mask 分辨率低于显示尺寸(不超过原图)，
+        就用 image_item.mask_logits 按新尺寸重建，避免放大后 mask 发糊。
+        缩小时沿用原来的 pixmap，绘制时会缩小。
+        """
+        image_item = getattr(self, "current_image", None)
+        if self.current_overlay_mode != "sam2" or not image_item:
+            return
+        if not image_item.mask_visible or image_item.mask_pixmap is None:
+            return
+
+        display_size = self.preview_label.scaled_size()
+        if image_item.mask_pixmap.width() >= min(display_size[0], self.preview_label.original_width):
+            return
+        pix = rescale_mask_pixmap(image_item, display_size)
+        if pix is not None:
+            image_item.mask_pixmap = pix
+            self.preview_label.update()
         
     def _get_current_image_item(self):
         """
@@ -0,0 +1,189 @@
+# my_perspective_app/views/rectified_preview.py
+
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+from PySide6.QtWidgets import (
+    QWidget, QLabel, QPushButton, QVBoxLayout, QDialog, QScrollArea, QApplication
+)
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QImage, QPixmap
+
+from models.perspective_export import warp_image, auto_output_size
+
+
+def qimage_to_pil(qimage):
+    """QImage => PIL RGB 图像（拷贝一份，不引用 Qt 的内存）"""
+    qimage = qimage.convertToFormat(QImage.Format_RGB888)
+    w, h = qimage.width(), qimage.height()
+    buf = np.frombuffer(qimage.constBits(), dtype=np.uint8, count=qimage.sizeInBytes())
+    arr = buf.reshape(h, qimage.bytesPerLine())[:, :w * 3].reshape(h, w, 3)
+    return Image.fromarray(arr.copy(), "RGB")
+
+
+def pil_to_qpixmap(img):
+    """PIL 图像 => QPixmap"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    data = img.tobytes()
+    qimage = QImage(data, img.width, img.height, img.width * 3, QImage.Format_RGB888)
+    return QPixmap.fromImage(qimage.copy())
+
+
+class RectifiedPreviewPane(QWidget):
+    """
+    透视模式下的“矫正结果”小预览：
+      - 每张图只做一次降采样，得到长边 PROXY_SIDE 的代理图并缓存(LRU)
+      - 拖动角点时 schedule_update() 只记下“需要刷新”，由节流定时器
+        每 THROTTLE_MS 最多做一次“代理图 => 固定大小”的小透视变换
+      - 全分辨率矫正只在点击按钮时进行
+    """
+    PROXY_SIDE = 512
+    PREVIEW_SIDE = 240
+    THROTTLE_MS = 40
+    PROXY_CACHE_SIZE = 8
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedWidth(self.PREVIEW_SIDE + 20)
+
+        self.image_item = None
+        # image_path => PIL 代理图
+        self._proxy_cache = OrderedDict()
+        self._pending = False
+
+        self.title = QLabel("矫正预览")
+        self.view = QLabel()
+        self.view.setAlignment(Qt.AlignCenter)
+        self.view.setFixedSize(self.PREVIEW_SIDE, self.PREVIEW_SIDE)
+        self.view.setStyleSheet("background-color: #333; color: white;")
+
+        self.btn_full = QPushButton("全分辨率矫正")
+        self.btn_full.clicked.connect(self.show_full_resolution)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 0, 4, 0)
+        layout.addWidget(self.title)
+        layout.addWidget(self.view)
+        layout.addWidget(self.btn_full)
+        layout.addStretch()
+
+        # 节流：拖动期间最多每 THROTTLE_MS 刷新一次
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.THROTTLE_MS)
+        self._timer.timeout.connect(self._on_timer)
+
+    # ------------------- 对外方法 -------------------
+    def set_image_item(self, image_item, pixmap=None):
+        """
+        切换图片。pixmap 若给出(PreviewLabel 已加载的原图)，直接用它生成代理图，不再读盘。
+        """
+        self.image_item = image_item
+        if image_item is not None and image_item.image_path not in self._proxy_cache:
+            self._build_proxy(image_item.image_path, pixmap)
+        self.refresh_now()
+
+    def schedule_update(self):
+        """
+        角点变化时调用；已有刷新排队时什么都不做
+        """
+        self._pending = True
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def refresh_now(self):
+        self._timer.stop()
+        self._pending = False
+        self._render_proxy()
+
+    def clear_cache(self):
+        self._proxy_cache.clear()
+
+    # ------------------- 内部 -------------------
+    def _on_timer(self):
+        if self._pending:
+            self._pending = False
+            self._render_proxy()
+
+    def _build_proxy(self, image_path, pixmap=None):
+        if pixmap is not None and not pixmap.isNull():
+            small = pixmap.scaled(self.PROXY_SIDE, self.PROXY_SIDE,
+                                  Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            proxy = qimage_to_pil(small.toImage())
+        else:
+            with Image.open(image_path) as img:
+                img.draft("RGB", (self.PROXY_SIDE, self.PROXY_SIDE))
+                proxy = img.convert("RGB")
+                proxy.thumbnail((self.PROXY_SIDE, self.PROXY_SIDE))
+        self._proxy_cache[image_path] = proxy
+        while len(self._proxy_cache) > self.PROXY_CACHE_SIZE:
+            self._proxy_cache.popitem(last=False)
+
+    def _get_proxy(self):
+        if self.image_item is None:
+            return None
+        path = self.image_item.image_path
+        proxy = self._proxy_cache.get(path)
+        if proxy is None:
+            try:
+                self._build_proxy(path)
+            except OSError:
+                return None
+            proxy = self._proxy_cache[path]
+        self._proxy_cache.move_to_end(path)
+        return proxy
+
+    def _render_proxy(self):
+        proxy = self._get_proxy()
+        if proxy is None:
+            self.view.clear()
+            self.view.setText("无图片")
+            return
+
+        coords = self.image_item.get_coords_in_label_order()
+        # 输出固定落在 PREVIEW_SIDE 的方框内，只保留矫正后的宽高比
+        corners_px = [(x * proxy.width, y * proxy.height) for (x, y) in coords]
+        out_w, out_h = auto_output_size(corners_px)
+        scale = self.PREVIEW_SIDE / max(out_w, out_h)
+        out_size = (max(1, int(out_w * scale)), max(1, int(out_h * scale)))
+        try:
+            warped = warp_image(proxy, coords, out_size, resample="bilinear")
+        except np.linalg.LinAlgError:
+            # 角点退化(共线/重合)时没有单应矩阵
+            self.view.clear()
+            self.view.setText("角点无效")
+            return
+        self.view.setPixmap(pil_to_qpixmap(warped))
+
+    def show_full_resolution(self):
+        """
+        用原图做一次全分辨率透视矫正，在对话框中按 1:1 显示
+        """
+        if self.image_item is None:
+            return
+        coords = self.image_item.get_coords_in_label_order()
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with Image.open(self.image_item.image_path) as img:
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                warped = warp_image(img, coords, tile_size=4096)
+            pixmap = pil_to_qpixmap(warped)
+        except (OSError, np.linalg.LinAlgError) as e:
+            QApplication.restoreOverrideCursor()
+            self.view.setText(f"矫正失败：{e}")
+            return
+        QApplication.restoreOverrideCursor()
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"全分辨率矫正 {pixmap.width()} x {pixmap.height()}")
+        label = QLabel()
+        label.setPixmap(pixmap)
+        scroll = QScrollArea(dialog)
+        scroll.setWidget(label)
+        dialog_layout = QVBoxLayout(dialog)
+        dialog_layout.addWidget(scroll)
+        dialog.resize(900, 700)
+        dialog.exec()